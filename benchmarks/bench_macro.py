@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Macro benchmarks: FastAPI endpoints called in-process against a stubbed upstream"""
+import asyncio
+import json
+import os
+import tempfile
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+API_KEY = "bench-key"
+
+
+class StubDownloads:
+    """Download list of one device: packages of 20 links each"""
+
+    def __init__(self, device_id: str, links: int):
+        self.links = [
+            {"uuid": i, "packageUUID": i // 20, "name": f"file-{i}.bin", "host": f"host{i % 7}.com",
+             "url": f"https://host{i % 7}.com/{device_id}/{i}", "bytesTotal": 100_000_000,
+             "bytesLoaded": (i * 7919) % 100_000_000, "running": i % 10 == 0, "speed": 1_000_000 + i,
+             "finished": i % 3 == 0, "enabled": True, "status": "Downloading" if i % 10 == 0 else None}
+            for i in range(links)
+        ]
+        self.packages = [
+            {"uuid": p, "name": f"package-{p}", "childCount": 20, "bytesTotal": 2_000_000_000,
+             "bytesLoaded": 0, "saveTo": "/downloads", "hosts": ["host0.com"], "finished": False}
+            for p in range(links // 20)
+        ]
+
+    @staticmethod
+    def _page(items: List[Dict], query: Dict) -> List[Dict]:
+        start, count = query.get("startAt", 0), query.get("maxResults", -1)
+        selected = items[start:] if count < 0 else items[start:start + count]
+        uuids = query.get("packageUUIDs")
+        if uuids is not None:
+            wanted = set(uuids)
+            selected = [i for i in selected if i.get("packageUUID", i["uuid"]) in wanted]
+        return selected
+
+    def query_packages(self, params):
+        return self._page(self.packages, params[0])
+
+    def query_links(self, params):
+        return self._page(self.links, params[0])
+
+
+class StubDevice:
+    def __init__(self, device_id: str, links: int):
+        self.device_id = device_id
+        self.name = device_id
+        self.downloads = StubDownloads(device_id, links)
+
+
+def stub_request_api(self, path, http_method="GET", params=None, action=None, api=None):
+    """Stands in for the MyJDownloader servers: login and device listing"""
+    if path == "/my/connect":
+        return {"sessiontoken": "ab" * 32, "regaintoken": "cd" * 32, "rid": 0}
+    if path == "/my/listdevices":
+        return {"list": [{"name": "bench-node", "id": "0" * 32, "type": "jd", "status": "ONLINE"}], "rid": 0}
+    return {"data": None, "rid": 0}
+
+
+def benchmarks(options, stack: ExitStack) -> List[Tuple[str, Callable[[], object], float]]:
+    """(name, callable, regression threshold %) for every endpoint benchmark"""
+    workdir = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+    jd_home = workdir / "jd2"
+    (jd_home / "cfg").mkdir(parents=True)
+    with open(jd_home / "cfg" / "org.jdownloader.api.myjdownloader.MyJDownloaderSettings.json", "w") as f:
+        json.dump({"email": "bench@example.com", "password": "secret", "devicename": "bench-node"}, f)
+
+    # Settings are read at import time; nothing may reach the network or start loops
+    os.environ.update({
+        "DATA_DIR": str(workdir / "data"),
+        "JDOWNLOADER_HOME": str(jd_home),
+        "API_KEY": API_KEY,
+        "CLOUD_RATE": "1000000000",
+        "CLOUD_BURST": "1000000000",
+        "CONFIG_WATCH": "false",
+        "CONTROL_SOCKET": "off",
+        "LINK_INDEX_SYNC_INTERVAL": "0",
+        "MIRROR_SYNC_INTERVAL": "0",
+        "AUTOPROCESS_INTERVAL": "0",
+        "ADMISSION_INTERVAL": "0"
+    })
+    import myjdapi
+    from src.api import api
+    from src.utils.asgi_call import call_asgi
+
+    original = myjdapi.Myjdapi.request_api
+    myjdapi.Myjdapi.request_api = stub_request_api
+    stack.callback(setattr, myjdapi.Myjdapi, "request_api", original)
+    devices = [StubDevice(f"device-{n}", options.links) for n in range(2)]
+    api.cloud_session.get_devices = lambda refresh=False: devices
+
+    loop = asyncio.new_event_loop()
+    stack.callback(loop.close)
+    headers = [(b"x-api-key", API_KEY.encode())]
+
+    def endpoint(method: str, path: str, params: Dict = None) -> Callable[[], object]:
+        def call():
+            status, _, body = loop.run_until_complete(call_asgi(api.app, method, path, params, headers))
+            if status >= 400:
+                raise RuntimeError(f"{method} {path} returned HTTP {status}: {body[:200]!r}")
+            return body
+        return call
+
+    return [
+        ("api.health", endpoint("GET", "/health"), 25),
+        ("api.config", endpoint("GET", "/config"), 25),
+        ("api.cli_verify", endpoint("POST", "/cli/verify"), 25),
+        (f"api.export_downloads_{options.links * 2}links", endpoint(
+            "GET", "/export/downloads", {"format": "ndjson"}
+        ), 25),
+        (f"api.mirror_sync_{options.links * 2}links", endpoint("POST", "/mirror/sync"), 25)
+    ]
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Microbenchmarks: connector signing, config I/O, process detection and log tailing"""
+import os
+import tempfile
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from src.jdownloader.jd_auth_config import JDownloaderConfig
+from src.jdownloader.jd_cloud_connector import JDownloaderService, MyJDownloaderAPI
+from src.utils.status_collector import find_pids, log_probe
+from src.utils.tracing import run
+
+
+LOG_LINE = b"--ID:123TS:1700000000000-11/14/23 10:00:00 AM - [jd.controlling.downloadcontroller] Download started\n"
+
+
+def log_file(size_mb: int) -> Path:
+    """A JD-style log of size_mb MiB, cached in the temp dir between runs"""
+    path = Path(tempfile.gettempdir()) / f"jdctl-bench-{size_mb}mb.log"
+    size = size_mb * 1024 * 1024
+    if path.exists() and path.stat().st_size == size:
+        return path
+    block = LOG_LINE * (1024 * 1024 // len(LOG_LINE))
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        written = 0
+        while written < size:
+            chunk = block[:size - written]
+            f.write(chunk)
+            written += len(chunk)
+    tmp.replace(path)
+    return path
+
+
+def tail_lines(path: Path, lines: int, block: int = 64 * 1024) -> List[str]:
+    """Last lines of a file read backwards from the end (the in-process alternative to tail)"""
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        data = b""
+        while end > 0 and data.count(b"\n") <= lines:
+            start = max(end - block, 0)
+            f.seek(start)
+            data = f.read(end - start) + data
+            end = start
+    return data.decode("utf-8", errors="replace").splitlines()[-lines:]
+
+
+def benchmarks(options, stack: ExitStack) -> List[Tuple[str, Callable[[], object], float]]:
+    """(name, callable, regression threshold %) for every microbenchmark"""
+    workdir = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+
+    # Connector: login secret, HMAC signature and query string of a /my/connect call
+    connector = MyJDownloaderAPI("bench@example.com", "correct horse battery staple")
+    params = {"email": connector.email, "appkey": connector.APP_KEY, "rid": 1700000000000}
+    secret = connector._create_secret(connector.email, connector.password, "server")
+    query = connector._create_query_string(params)
+
+    # Config: a realistic MyJDownloaderSettings.json
+    jd = JDownloaderConfig(str(workdir / "jd2"))
+    jd.config_dir.mkdir(parents=True)
+    config = {**jd._get_default_config(), "email": "bench@example.com", "password": "secret",
+              "devicename": "bench-node", "uniquedeviceidv2": "0" * 32}
+    jd.save_config(config)
+
+    # Logs
+    log = log_file(options.log_mb)
+    probe = log_probe(str(log))
+    service = JDownloaderService(str(workdir / "jd2"))
+
+    return [
+        ("connector.create_secret", lambda: connector._create_secret(connector.email, connector.password, "server"), 25),
+        ("connector.sign_request", lambda: connector._sign_request(secret, query), 25),
+        ("connector.query_string", lambda: connector._create_query_string(params), 25),
+        ("config.read_config", jd.read_config, 20),
+        ("config.save_config", lambda: jd.save_config(config), 30),
+        ("process.find_pids", lambda: find_pids("JDownloader.jar"), 25),
+        ("process.pgrep", service.is_running, 30),
+        (f"log.tail_subprocess_{options.log_mb}mb", lambda: run(
+            ["/usr/bin/tail", "-50", str(log)], capture_output=True, text=True
+        ), 30),
+        (f"log.tail_python_{options.log_mb}mb", lambda: tail_lines(log, 50), 20),
+        (f"log.probe_{options.log_mb}mb", probe, 20)
+    ]
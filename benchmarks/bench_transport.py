@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Compare API request latency over TCP and over the Unix socket
+
+By default an API instance is started in-process on a temporary port and
+socket (with an API key set, so TCP requests pay for the key check).
+Point it at a running server with --url and --socket instead.
+
+Usage:
+  python benchmarks/bench_transport.py
+  python benchmarks/bench_transport.py --endpoint /config/files -n 5000
+  python benchmarks/bench_transport.py --url http://127.0.0.1:8001 --socket data/api.sock --api-key KEY
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP over a Unix domain socket"""
+
+    def __init__(self, path, timeout=10):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def measure(make_connection, endpoint, headers, count, keepalive):
+    """Issue count GETs and return per-request latencies in microseconds"""
+    latencies = []
+    conn = make_connection()
+    for _ in range(count):
+        started = time.perf_counter()
+        conn.request("GET", endpoint, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        if response.status >= 400:
+            raise RuntimeError(f"{endpoint} returned HTTP {response.status}")
+        if not keepalive:
+            conn.close()
+            conn = make_connection()
+        latencies.append((time.perf_counter() - started) * 1e6)
+    conn.close()
+    return latencies
+
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "mean_us": round(statistics.fmean(ordered), 1),
+        "p50_us": round(ordered[len(ordered) // 2], 1),
+        "p95_us": round(ordered[int(len(ordered) * 0.95) - 1], 1),
+        "p99_us": round(ordered[int(len(ordered) * 0.99) - 1], 1),
+        "req_per_s": round(len(ordered) / (sum(ordered) / 1e6), 1)
+    }
+
+
+def start_local_server(workdir):
+    """Run the API in a background thread on a free port and a temp socket"""
+    os.environ.update({
+        "DATA_DIR": str(Path(workdir) / "data"),
+        "API_KEY": "bench-key",
+        "CONFIG_WATCH": "false",
+        "CONTROL_SOCKET": "off",
+        "LINK_INDEX_SYNC_INTERVAL": "0"
+    })
+    import uvicorn
+    from src.main import bind_unix_socket
+
+    socket_path = str(Path(workdir) / "api.sock")
+    config = uvicorn.Config("src.api.api:app", host="127.0.0.1", port=0, log_level="error")
+    sockets = [config.bind_socket(), bind_unix_socket(socket_path)]
+    port = sockets[0].getsockname()[1]
+
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, kwargs={"sockets": sockets}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}", socket_path, "bench-key"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API latency: TCP vs Unix socket")
+    parser.add_argument("--endpoint", default="/health", help="GET endpoint to call (default: /health)")
+    parser.add_argument("-n", "--requests", type=int, default=2000, help="Requests per run (default: 2000)")
+    parser.add_argument("--warmup", type=int, default=200, help="Warm-up requests per run")
+    parser.add_argument("--url", help="Base URL of a running API (default: start one in-process)")
+    parser.add_argument("--socket", help="Unix socket of the running API")
+    parser.add_argument("--api-key", default=os.getenv("API_KEY"), help="API key for TCP requests")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    server = None
+    workdir = None
+    if args.url:
+        if not args.socket:
+            parser.error("--socket is required with --url")
+        base_url, socket_path, api_key = args.url, args.socket, args.api_key
+    else:
+        workdir = tempfile.TemporaryDirectory()
+        server, base_url, socket_path, api_key = start_local_server(workdir.name)
+
+    host_port = base_url.split("://", 1)[1].rstrip("/")
+    tcp_headers = {"X-API-Key": api_key} if api_key else {}
+    transports = {
+        "tcp": (lambda: http.client.HTTPConnection(host_port, timeout=10), tcp_headers),
+        "unix": (lambda: UnixHTTPConnection(socket_path), {})
+    }
+
+    results = {}
+    try:
+        for keepalive in (True, False):
+            for name, (make_connection, headers) in transports.items():
+                measure(make_connection, args.endpoint, headers, args.warmup, keepalive)
+                latencies = measure(make_connection, args.endpoint, headers, args.requests, keepalive)
+                results[f"{name}/{'keepalive' if keepalive else 'new-conn'}"] = summarize(latencies)
+    finally:
+        if server is not None:
+            server.should_exit = True
+            time.sleep(0.2)
+            workdir.cleanup()
+
+    if args.json:
+        print(json.dumps({"endpoint": args.endpoint, "results": results}, indent=2))
+        return
+
+    print(f"\n📊 GET {args.endpoint} ({args.requests} requests per run)\n")
+    print(f"{'transport':<20}{'mean µs':>10}{'p50 µs':>10}{'p95 µs':>10}{'p99 µs':>10}{'req/s':>10}")
+    for name, r in results.items():
+        print(f"{name:<20}{r['mean_us']:>10}{r['p50_us']:>10}{r['p95_us']:>10}{r['p99_us']:>10}{r['req_per_s']:>10}")
+    print()
+    for mode in ("keepalive", "new-conn"):
+        tcp, unix = results[f"tcp/{mode}"], results[f"unix/{mode}"]
+        print(f"⚡ {mode}: unix p50 is {(1 - unix['p50_us'] / tcp['p50_us']) * 100:.0f}% lower than tcp")
+
+
+if __name__ == "__main__":
+    main()
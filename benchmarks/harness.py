@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Timing loop and JSON baseline comparison shared by the benchmark suites"""
+import gc
+import json
+import platform
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+def measure(fn: Callable[[], object], rounds: int = 7, min_round_time: float = 0.1,
+            max_number: int = 100_000) -> Dict:
+    """Time fn: calibrate calls per round to last min_round_time, then run rounds
+
+    Reports per-call microseconds. Baselines compare the best round: noise
+    from other processes only ever adds time, so the minimum is the most
+    repeatable figure.
+    """
+    fn()  # warm up caches, imports and the page cache
+    number = 1
+    while number < max_number:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - started >= min_round_time:
+            break
+        number *= 2
+
+    per_call: List[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for _ in range(number):
+                fn()
+            per_call.append((time.perf_counter() - started) / number * 1e6)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {
+        "best_us": round(min(per_call), 3),
+        "median_us": round(statistics.median(per_call), 3),
+        "max_us": round(max(per_call), 3),
+        "stdev_pct": round(statistics.pstdev(per_call) / statistics.fmean(per_call) * 100, 1),
+        "rounds": rounds,
+        "calls_per_round": number
+    }
+
+
+def environment() -> Dict:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "node": platform.node(),
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+
+
+def load_baseline(path: Path) -> Dict:
+    if not path.exists():
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_baseline(path: Path, results: Dict[str, Dict], previous: Dict, default_threshold: float) -> None:
+    """Write results as the new baseline, keeping hand-tuned per-benchmark thresholds"""
+    old = previous.get("benchmarks", {})
+    baseline = {
+        "environment": environment(),
+        "benchmarks": {
+            name: {
+                "best_us": result["best_us"],
+                "threshold_pct": old.get(name, {}).get("threshold_pct", result.get("threshold_pct", default_threshold))
+            }
+            for name, result in sorted(results.items())
+        }
+    }
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
+    tmp.replace(path)
+
+
+def compare(results: Dict[str, Dict], baseline: Dict, default_threshold: float,
+            override_threshold: Optional[float] = None) -> List[Dict]:
+    """Per-benchmark change against the baseline; regressed when slower than its threshold"""
+    rows = []
+    known = baseline.get("benchmarks", {})
+    for name, result in results.items():
+        base = known.get(name)
+        row = {"name": name, "best_us": result["best_us"], "baseline_us": None,
+               "change_pct": None, "threshold_pct": None, "regressed": False}
+        if base:
+            threshold = override_threshold if override_threshold is not None else \
+                base.get("threshold_pct", default_threshold)
+            change = (result["best_us"] - base["best_us"]) / base["best_us"] * 100
+            row.update(baseline_us=base["best_us"], change_pct=round(change, 1),
+                       threshold_pct=threshold, regressed=change > threshold)
+        rows.append(row)
+    return rows
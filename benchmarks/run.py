@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Run the micro and macro benchmark suites and gate on regressions
+
+Microbenchmarks cover connector signing and query building, config
+read/save, process detection and log tailing on a large log (1 GiB by
+default, cached in the temp dir). Macro benchmarks call FastAPI endpoints
+in-process with the MyJDownloader servers and devices stubbed out, so
+everything runs offline.
+
+Results are compared with a JSON baseline (benchmarks/baseline.json by
+default). A benchmark regresses when its best per-call time is more than
+its threshold_pct slower than the baseline; the exit status is then 1.
+Baselines are machine-specific: record one on the machine that runs the
+gate, and edit threshold_pct per benchmark as needed (kept on update). On
+shared or virtual hosts pin the run to a core (taskset -c 2 ...) or widen
+thresholds; run-to-run noise there can exceed the defaults.
+
+Usage:
+  python benchmarks/run.py                       # run all, compare with the baseline
+  python benchmarks/run.py --save-baseline       # run all, record a new baseline
+  python benchmarks/run.py --suite micro -k log  # only micro benchmarks matching "log"
+  python benchmarks/run.py --quick --json results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+from contextlib import ExitStack
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from harness import compare, environment, load_baseline, measure, save_baseline  # noqa: E402
+
+SUITES = ("micro", "macro")
+
+
+def collect(suite: str, options, stack: ExitStack):
+    if suite == "micro":
+        import bench_micro
+        return bench_micro.benchmarks(options, stack)
+    import bench_macro
+    return bench_macro.benchmarks(options, stack)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite with regression gates")
+    parser.add_argument("--suite", choices=SUITES + ("all",), default="all")
+    parser.add_argument("-k", "--filter", help="Only benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=str(Path(__file__).with_name("baseline.json")),
+                        help="Baseline JSON file (default: benchmarks/baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Record results as the new baseline")
+    parser.add_argument("--threshold", type=float, help="Override every benchmark's regression threshold (%%)")
+    parser.add_argument("--default-threshold", type=float, default=20.0,
+                        help="Threshold for benchmarks without one (default: 20%%)")
+    parser.add_argument("--rounds", type=int, default=7, help="Timed rounds per benchmark (default: 7)")
+    parser.add_argument("--log-mb", type=int, default=1024, help="Log file size for tailing benchmarks (MiB)")
+    parser.add_argument("--links", type=int, default=5000, help="Links per stubbed device (macro)")
+    parser.add_argument("--quick", action="store_true", help="Fewer rounds, 64 MiB log, 500 links")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+    if args.quick:
+        args.rounds, args.log_mb, args.links = 3, 64, 500
+
+    baseline_path = Path(args.baseline)
+    baseline = load_baseline(baseline_path)
+    results = {}
+    suites = SUITES if args.suite == "all" else (args.suite,)
+    for suite in suites:
+        with ExitStack() as stack:
+            print(f"⏱️  {suite} benchmarks...", flush=True)
+            # Keep the code under test (and its prints) out of the report
+            with contextlib.redirect_stdout(io.StringIO()):
+                entries = collect(suite, args, stack)
+            for name, fn, threshold in entries:
+                if args.filter and args.filter not in name:
+                    continue
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = measure(fn, rounds=args.rounds)
+                results[name] = {**result, "suite": suite, "threshold_pct": threshold}
+                print(f"   {name:<40}{result['best_us']:>14,.1f} µs  ±{result['stdev_pct']}%", flush=True)
+
+    if not results:
+        print("❌ No benchmarks matched")
+        return 2
+
+    rows = compare(results, baseline, args.default_threshold, args.threshold)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"environment": environment(), "results": results, "comparison": rows}, f, indent=2)
+
+    if args.save_baseline:
+        # Benchmarks not run this time keep their recorded values
+        save_baseline(baseline_path, {**baseline.get("benchmarks", {}), **results}, baseline,
+                      args.default_threshold)
+        print(f"\n✓ Baseline saved to {baseline_path} ({len(results)} benchmark(s) updated)")
+        return 0
+
+    if not baseline:
+        print(f"\n⚠️  No baseline at {baseline_path}; record one with --save-baseline")
+        return 0
+
+    print(f"\n{'benchmark':<40}{'baseline µs':>14}{'now µs':>14}{'change':>10}{'limit':>8}")
+    for row in rows:
+        if row["baseline_us"] is None:
+            print(f"{row['name']:<40}{'-':>14}{row['best_us']:>14,.1f}{'new':>10}{'':>8}")
+            continue
+        mark = "❌" if row["regressed"] else ("⚡" if row["change_pct"] < -row["threshold_pct"] else "  ")
+        print(f"{row['name']:<40}{row['baseline_us']:>14,.1f}{row['best_us']:>14,.1f}"
+              f"{row['change_pct']:>+9.1f}%{row['threshold_pct']:>7.0f}% {mark}")
+
+    regressed = [row["name"] for row in rows if row["regressed"]]
+    if regressed:
+        print(f"\n❌ {len(regressed)} regression(s): {', '.join(regressed)}")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
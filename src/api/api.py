@@ -2,22 +2,63 @@
 """FastAPI RESTful API for JDownloader Authentication Management"""
 import os
 import time
-import subprocess
+import uuid
+import logging
+import asyncio
 import json
-from typing import Optional
+import math
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
 from pathlib import Path
-from fastapi import FastAPI, HTTPException, Depends, Security, status
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Security, status
+from fastapi.exception_handlers import http_exception_handler
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.security import APIKeyHeader
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from dotenv import load_dotenv
+from dotenv import dotenv_values, load_dotenv
 from src.jdownloader.jd_auth_config import JDownloaderConfig
+from src.jdownloader.jd_config_store import JDConfigStore, ConfigConflictError
 from src.jdownloader.jd_cloud_connector import MyJDownloaderAPI, JDownloaderService
+from src.jdownloader.jd_cloud_session import CloudSession, RateLimitedMyjdapi
+from src.jdownloader.jd_scheduler import BandwidthScheduler
+from src.jdownloader.jd_dispatcher import DispatchRefused, HostAffinityPolicy, LinkDispatcher, parse_host_pins
+from src.jdownloader.jd_link_index import LinkIndex, normalize_url
+from src.jdownloader.jd_mirror import DownloadMirror
+from src.jdownloader.jd_analytics import HosterAnalytics
+from src.jdownloader.jd_autoprocess import LinkgrabberPipeline
+from src.jdownloader.jd_admission import AdmissionController
+from src.jdownloader.jd_checksum import ChecksumVerifier
+from src.jdownloader.jd_organizer import FileOrganizer
+from src.jdownloader.jd_events import PACKAGE_FINISHED, ProcessWatcher, PackagePoller
+from src.jdownloader.jd_lifecycle import JDLifecycle
+from src.jdownloader.jd_export import DOWNLOAD_COLUMNS, HISTORY_COLUMNS, iter_download_rows, iter_history_rows
+from src.utils.event_bus import EventBus
+from src.utils.file_watcher import FileWatcher
+from src.utils.control_socket import ControlServer
+from src.utils.status_collector import StatusCollector, default_probes
+from src.utils.asgi_call import call_asgi
+from src.utils.rate_limiter import (PRIORITIES, RateLimitTimeout, account_limiter, priority, upstream_priority,
+                                    upstream_usage)
+from src.utils.file_hash import ALGORITHMS, HEX_LENGTHS, find_expected
+from src.utils.export_stream import MEDIA_TYPES, export_response
+from src.utils.http_cache import compute_etag, etag_matches, file_version, not_modified, vary_on_encoding
+from src.utils.tracing import Tracer, run, span
+from src.utils.structured_log import LogPipeline, request_id
+from src.utils.jobs import IdempotencyConflict, JobContext, JobQueue
+from src.utils.sampling_profiler import ProfilerBusy, collapsed, profile, top_functions
 import myjdapi
 
 # Load environment variables
 load_dotenv()
 
+# Repository root (where jdctl lives)
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
 
 def sync_env_to_jd_config():
     """Sync .env credentials to JDownloader config file if they exist"""
@@ -59,7 +100,7 @@ def sync_env_to_jd_config():
         
         return False
     except Exception as e:
-        print(f"⚠️  Warning: Could not sync .env to JDownloader config: {str(e)}")
+        logger.warning(f"⚠️  Warning: Could not sync .env to JDownloader config: {str(e)}")
         return False
 
 
@@ -95,6 +136,51 @@ class Settings(BaseSettings):
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     api_key: Optional[str] = None
+    api_socket: str = ""
+    api_socket_mode: str = "660"
+    api_socket_require_key: bool = False
+    data_dir: str = "data"
+    schedule_interval: int = 60
+    dispatch_policy: str = "least-remaining-bytes"
+    dispatch_host_pins: str = ""
+    dispatch_min_free_mb: int = 1024
+    dispatch_shared_storage: bool = False
+    rebalance_threshold: float = 0.5
+    rebalance_interval: int = 0
+    admission_interval: float = 15.0
+    admission_pause_free_mb: int = 2048
+    admission_resume_free_mb: int = 4096
+    admission_reserve_mb: int = 1024
+    admission_bulk_links: int = 20
+    link_index_capacity: int = 10_000_000
+    link_index_max_mb: int = 64
+    link_index_sync_interval: int = 600
+    event_poll_interval: float = 2.0
+    event_socket: str = ""
+    mirror_sync_interval: float = 5.0
+    analytics_max_samples: int = 2_000_000
+    autoprocess_interval: float = 10.0
+    checksum_workers: int = 0
+    checksum_per_disk: int = 2
+    checksum_algorithm: str = "sha256"
+    checksum_auto: bool = True
+    compress_min_bytes: int = 1024
+    cloud_rate: float = 2.0
+    cloud_burst: int = 10
+    cloud_max_wait: float = 30.0
+    config_watch: bool = True
+    config_poll_interval: float = 2.0
+    control_socket: str = ""
+    trace_capacity: int = 1000
+    trace_file: str = ""
+    trace_file_max_mb: int = 10
+    trace_min_ms: float = 0.0
+    log_format: str = "json"
+    log_level: str = "INFO"
+    log_queue_size: int = 10000
+    log_debug_sample_rate: float = 0.01
+    job_workers: int = 2
+    job_retention_days: float = 7.0
     
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -106,12 +192,151 @@ class Settings(BaseSettings):
 # Initialize settings
 settings = Settings()
 
+
+class TracedJSONResponse(JSONResponse):
+    """JSONResponse whose serialisation shows up as a span in request traces"""
+
+    def render(self, content: Any) -> bytes:
+        with span("json.render"):
+            return super().render(content)
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="JDownloader Auth API",
     description="RESTful API for managing JDownloader MyJDownloader authentication",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=TracedJSONResponse
+)
+
+# Request traces (slowest are served at /debug/traces)
+tracer = Tracer(
+    settings.trace_capacity,
+    settings.trace_file or None,
+    max_bytes=settings.trace_file_max_mb * 1024 * 1024,
+    min_ms=settings.trace_min_ms
+)
+
+# Structured logging: records are queued and written by one thread, so a slow
+# stdout never stalls a handler (started with the app)
+log_pipeline = LogPipeline(
+    level=settings.log_level,
+    fmt=settings.log_format,
+    debug_sample_rate=settings.log_debug_sample_rate,
+    queue_size=settings.log_queue_size
 )
+logger = logging.getLogger(__name__)
+
+# Client-supplied request ids are echoed and logged, so only short tokens are kept
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._:-]{1,64}")
+
+# Compress large responses (brotli when brotli-asgi is installed, else gzip)
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, minimum_size=settings.compress_min_bytes, gzip_fallback=True)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.compress_min_bytes)
+
+# Per-account MyJDownloader call budget shared by every cloud call path
+account_limiter.configure(settings.cloud_rate, settings.cloud_burst, settings.cloud_max_wait or None)
+
+
+def rate_limit_cause(exc: BaseException) -> Optional[RateLimitTimeout]:
+    """The RateLimitTimeout an endpoint's error was raised from, if any"""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        if isinstance(exc, RateLimitTimeout):
+            return exc
+        seen.add(id(exc))
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+def rate_limited_response(exc: RateLimitTimeout) -> JSONResponse:
+    return JSONResponse(
+        {"detail": str(exc)},
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": str(math.ceil(exc.retry_after))}
+    )
+
+
+@app.exception_handler(RateLimitTimeout)
+async def upstream_rate_limited(request: Request, exc: RateLimitTimeout):
+    return rate_limited_response(exc)
+
+
+@app.exception_handler(StarletteHTTPException)
+async def http_error(request: Request, exc: StarletteHTTPException):
+    """Endpoints wrap unexpected errors in a 500; a rate limiter timeout underneath becomes 429"""
+    limited = rate_limit_cause(exc) if exc.status_code >= 500 else None
+    if limited is not None:
+        return rate_limited_response(limited)
+    return await http_exception_handler(request, exc)
+
+
+@app.middleware("http")
+async def cache_validation(request: Request, call_next):
+    """Mark ETagged responses as varying by encoding (runs outside compression)"""
+    response = await call_next(request)
+    vary_on_encoding(response.headers)
+    return response
+
+
+@app.middleware("http")
+async def upstream_accounting(request: Request, call_next):
+    """Set the cloud call priority and report rate limiter queue wait per response
+    
+    Mutating requests are interactive, reads are normal; pollers can send
+    X-Priority: background to yield to everything else.
+    """
+    requested = request.headers.get("x-priority", "").lower()
+    if requested not in PRIORITIES:
+        requested = "normal" if request.method in ("GET", "HEAD") else "interactive"
+    usage = {"calls": 0, "wait": 0.0}
+    priority_token = upstream_priority.set(requested)
+    usage_token = upstream_usage.set(usage)
+    try:
+        response = await call_next(request)
+    finally:
+        upstream_priority.reset(priority_token)
+        upstream_usage.reset(usage_token)
+    if usage["calls"]:
+        response.headers["X-Upstream-Calls"] = str(usage["calls"])
+        response.headers["X-Upstream-Wait-Ms"] = f"{usage['wait'] * 1000:.1f}"
+    return response
+
+
+@app.middleware("http")
+async def request_tracing(request: Request, call_next):
+    """Assign the request id and open a root span per request
+    
+    The id comes from X-Request-ID when it is a short token (else the
+    enclosing /batch request, else a new one), is attached to every log record the request emits and is
+    echoed in the response. Config, cloud, subprocess and log work nest
+    under the root span.
+    """
+    rid = request.headers.get("x-request-id", "")
+    if not REQUEST_ID_PATTERN.fullmatch(rid):
+        rid = request_id.get() or uuid.uuid4().hex[:16]
+    token = request_id.set(rid)
+    try:
+        if request.url.path.startswith("/debug/"):
+            response = await call_next(request)
+        else:
+            started = time.perf_counter()
+            with tracer.trace(f"{request.method} {request.url.path}", request_id=rid) as root:
+                response = await call_next(request)
+                root.attrs["status"] = response.status_code
+            logger.debug("request", extra={
+                "method": request.method,
+                "path": request.url.path,
+                "status": response.status_code,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+            })
+    finally:
+        request_id.reset(token)
+    response.headers["X-Request-ID"] = rid
+    return response
 
 
 # Global connection state
@@ -122,13 +347,686 @@ cloud_connection = {
     "email": None
 }
 
+# Event bus for lifecycle and download events
+event_bus = EventBus(settings.data_dir)
+
+# Shared cloud session for background components
+cloud_session = CloudSession(get_credentials, events=event_bus)
+
+# Serialized start/stop/restart of the local JD process
+lifecycle = JDLifecycle(lambda: JDownloaderService(settings.jdownloader_home, events=event_bus))
+
+# Indexed access to all JD cfg/*.json files
+config_store = JDConfigStore(settings.jdownloader_home)
+
+# Time-of-day bandwidth/concurrency scheduler
+scheduler = BandwidthScheduler(
+    settings.jdownloader_home,
+    str(Path(settings.data_dir) / "schedule.json"),
+    config_store=config_store
+)
+
+# Fleet dispatcher for new links
+dispatcher = LinkDispatcher(
+    cloud_session,
+    policy=settings.dispatch_policy,
+    host_pins=parse_host_pins(settings.dispatch_host_pins),
+    min_free_bytes=settings.dispatch_min_free_mb * 1024 * 1024,
+    shared_storage=settings.dispatch_shared_storage,
+    admission_check=lambda target, links: admission_refusal(target, links)
+)
+
+# Post-download checksum verification (opened on first use)
+checksum_verifier: Optional[ChecksumVerifier] = None
+
+
+def is_local_device(name: Optional[str]) -> bool:
+    """True if a cloud device name is this node's JD (the configured device name)"""
+    _, _, device_name = get_credentials()
+    return bool(device_name) and (name or "").lower() == device_name.lower()
+
+
+def is_local_package(package: Dict) -> bool:
+    """True if the package was downloaded by this node's JD"""
+    return is_local_device(package.get("device_name"))
+
+
+def finished_package_files(package: Dict) -> List[str]:
+    """Local paths of a finished package's files, from the local device's link list"""
+    if not is_local_package(package):
+        raise ValueError(f"{package.get('name')} is on device {package.get('device_name')}, not this node")
+    with priority("background"):
+        device = cloud_session.get_device(device_name=package["device_name"])
+        links = device.downloads.query_links([{
+            "finished": True,
+            "packageUUIDs": [package["package_uuid"]],
+            "maxResults": -1,
+            "startAt": 0
+        }]) or []
+    return [os.path.join(package["save_to"], link["name"]) for link in links if link.get("finished")]
+
+
+def get_checksum_verifier() -> ChecksumVerifier:
+    """Open the checksum store and worker pool on first use"""
+    global checksum_verifier
+    if checksum_verifier is None:
+        checksum_verifier = ChecksumVerifier(
+            str(Path(settings.data_dir) / "checksums.db"),
+            workers=settings.checksum_workers,
+            per_disk=settings.checksum_per_disk,
+            algorithm=settings.checksum_algorithm,
+            resolver=finished_package_files
+        )
+    return checksum_verifier
+
+
+def on_package_event(event: Dict) -> None:
+    # saveTo of another device's package names a path on that host, not this one
+    if event["type"] == PACKAGE_FINISHED and not is_local_package(event["data"]):
+        return
+    if settings.checksum_auto:
+        get_checksum_verifier().on_event(event)
+    organizer.on_event(event)
+
+
+def checksum_pending(path: str) -> bool:
+    return checksum_verifier is not None and checksum_verifier.is_pending(path)
+
+
+# Finished-file organiser (moves files into the library tree)
+organizer = FileOrganizer(
+    str(Path(settings.data_dir) / "organizer.json"),
+    str(Path(settings.data_dir) / "organizer.manifest.jsonl"),
+    resolver=finished_package_files,
+    busy=checksum_pending
+)
+
+
+# Disk-space admission control for the local JD node
+admission = AdmissionController(
+    settings.jdownloader_home,
+    config_store=config_store,
+    pause_free_mb=settings.admission_pause_free_mb,
+    resume_free_mb=settings.admission_resume_free_mb,
+    reserve_mb=settings.admission_reserve_mb,
+    bulk_links=settings.admission_bulk_links
+)
+
+
+def local_device():
+    """The cloud device of this node's JD (by configured device name), if connected"""
+    _, _, device_name = get_credentials()
+    if not device_name or not cloud_session.connected:
+        return None
+    try:
+        return cloud_session.get_device(device_name=device_name)
+    except Exception:
+        return None
+
+
+def run_admission() -> Dict:
+    return admission.tick(local_device())
+
+
+def admission_refusal(target: Dict, links: List[str]) -> Optional[str]:
+    """Disk admission only knows this node's volumes, so it only vets the local device"""
+    if not is_local_device(target["name"]):
+        return None
+    admitted, reason = admission.admit(len(links))
+    return None if admitted else reason
+
+
+# Fleet-wide duplicate link index (opened on first use)
+link_index: Optional[LinkIndex] = None
+
+
+def get_link_index() -> LinkIndex:
+    """Open the duplicate link index on first use"""
+    global link_index
+    if link_index is None:
+        link_index = LinkIndex(
+            str(Path(settings.data_dir) / "link_index.db"),
+            capacity=settings.link_index_capacity,
+            max_memory_mb=settings.link_index_max_mb
+        )
+    return link_index
+
+
+def split_known_links(links: List[str], allow_duplicates: bool) -> Tuple[List[str], List[Dict]]:
+    """Links not yet known in the fleet (each once), and the duplicates that were dropped
+
+    Blocking: may open the link index and rebuild its Bloom filter.
+    """
+    unique, duplicates, seen = [], [], set()
+    for link in links:
+        key = normalize_url(link)
+        if key in seen:
+            duplicates.append({"url": link, "match": "request"})
+            continue
+        seen.add(key)
+        unique.append(link)
+    if allow_duplicates:
+        return unique, duplicates
+    known_links = get_link_index().check([{"url": link} for link in unique])
+    known = {d["url"] for d in known_links}
+    return [link for link in unique if link not in known], duplicates + known_links
+
+
+def dispatch_and_index(links: List[str], package_name: Optional[str], destination_folder: Optional[str],
+                       autostart: bool, policy: Optional[str]) -> Dict:
+    """Send a package to the policy's device and record its links in the index
+
+    Without autostart the links wait in the device's linkgrabber and are
+    indexed as such, so autoprocess does not take them for duplicates.
+    """
+    result = dispatcher.dispatch(links, package_name, destination_folder, autostart, policy)
+    get_link_index().add([{"url": link} for link in links], device_id=result["device_id"],
+                         state="queued" if autostart else "linkgrabber")
+    return result
+
+
+# Durable jobs for operations that outlive a request (start/restart, bulk imports)
+jobs = JobQueue(
+    str(Path(settings.data_dir) / "jobs.db"),
+    workers=settings.job_workers,
+    retention_days=settings.job_retention_days
+)
+
+
+def run_lifecycle(ctx: JobContext, action: str) -> str:
+    """Run a lifecycle transition from a job, noting when it joined one in flight"""
+    result = lifecycle.request_threadsafe(action)
+    if result["joined"]:
+        ctx.log(f"Joined the {action} already in progress")
+    if not result["success"]:
+        raise RuntimeError(result["message"])
+    return result["message"]
+
+
+def start_jd_job(ctx: JobContext, wait: float = 3.0) -> Dict:
+    """Start JDownloader and report its status once it had time to initialize"""
+    service = JDownloaderService(settings.jdownloader_home, events=event_bus)
+    ctx.progress(0.1, "Starting JDownloader")
+    message = run_lifecycle(ctx, "start")
+    ctx.progress(0.5, message)
+    ctx.sleep(wait)
+    status_info = service.status()
+    return {"message": message, "running": status_info["running"], "pid": status_info["pid"]}
+
+
+def restart_jd_job(ctx: JobContext, wait: float = 2.0) -> Dict:
+    """Restart JDownloader; a restart interrupted by an API restart is not repeated if JD is up"""
+    service = JDownloaderService(settings.jdownloader_home, events=event_bus)
+    if ctx.resumed and service.status()["running"]:
+        ctx.log("JDownloader is already running after the interrupted restart")
+        message = "JDownloader restarted"
+    else:
+        ctx.progress(0.1, "Restarting JDownloader")
+        message = run_lifecycle(ctx, "restart")
+        ctx.progress(0.5, message)
+    ctx.sleep(wait)
+    status_info = service.status()
+    return {"message": message, "running": status_info["running"], "pid": status_info["pid"]}
+
+
+def dispatch_links_job(ctx: JobContext, links: List[str], package_name: Optional[str] = None,
+                       destination_folder: Optional[str] = None, autostart: bool = True,
+                       policy: Optional[str] = None, allow_duplicates: bool = False) -> Dict:
+    """Bulk link import: dedupe, dispatch and index one package"""
+    if ctx.resumed and allow_duplicates:
+        # The interrupted attempt may already have added some of them
+        ctx.log("Resumed: skipping links indexed by the interrupted attempt")
+        allow_duplicates = False
+    ctx.progress(0.05, f"Checking {len(links)} link(s) against the link index")
+    todo, duplicates = split_known_links(links, allow_duplicates)
+    if not todo:
+        return {"message": "All links are already known in the fleet", "link_count": 0,
+                "duplicate_count": len(duplicates), "duplicates": duplicates}
+    ctx.check()
+    ctx.progress(0.2, f"Dispatching {len(todo)} link(s)")
+    result = dispatch_and_index(todo, package_name, destination_folder, autostart, policy)
+    return {
+        "message": f"Sent {result['link_count']} link(s) to {result['device_name']}",
+        **result,
+        "duplicate_count": len(duplicates),
+        "duplicates": duplicates
+    }
+
+
+jobs.register("jd.start", start_jd_job)
+jobs.register("jd.restart", restart_jd_job)
+jobs.register("dispatch.links", dispatch_links_job)
+
+
+def submit_job(kind: str, params: Dict, idempotency_key: Optional[str]) -> JSONResponse:
+    """Queue a job and answer 202 Accepted pointing at it (Location: /jobs/{id})"""
+    try:
+        job, created = jobs.submit(kind, params, idempotency_key)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    url = f"/jobs/{job['id']}"
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        headers={"Location": url},
+        content={"status": "accepted", "job_id": job["id"], "job_url": url, "created": created, "job": job}
+    )
+
+
+# Incrementally synced copy of every device's download list
+download_mirror = DownloadMirror()
+
+# Per-hoster speed/outcome history, fed from mirror syncs
+hoster_analytics = HosterAnalytics(settings.analytics_max_samples)
+
+
+def sync_download_mirror() -> Dict:
+    """Sync the mirror and record its link changes as hoster samples"""
+    result = download_mirror.sync(cloud_session)
+    result["analytics_samples"] = hoster_analytics.observe_mirror(download_mirror)
+    return result
+
+# Rules-driven linkgrabber processing
+autoprocess = LinkgrabberPipeline(str(Path(settings.data_dir) / "autoprocess.json"))
+
+
+def run_autoprocess() -> Dict:
+    """One pipeline pass; duplicate removal uses the fleet link index"""
+    if autoprocess.options["remove_duplicates"]:
+        autoprocess.link_index = get_link_index()
+    return autoprocess.run(cloud_session)
+
+
+# Hot reload of .env and JD cfg/*.json
+CREDENTIAL_ENV_VARS = ("JDOWNLOADER_EMAIL", "JDOWNLOADER_PASSWORD", "JDOWNLOADER_DEVICE_NAME")
+MYJD_SETTINGS_FILE = "org.jdownloader.api.myjdownloader.MyJDownloaderSettings.json"
+
+env_file = Path(".env")
+env_snapshot: Dict[str, Optional[str]] = dotenv_values(env_file) if env_file.exists() else {}
+known_credentials = get_credentials()
+config_watch_task: Optional[asyncio.Task] = None
+
+
+def reload_env() -> Dict:
+    """Re-read .env into the environment and the running settings"""
+    global env_snapshot
+    values = dotenv_values(env_file) if env_file.exists() else {}
+    changed_vars = sorted(
+        key for key in set(values) | set(env_snapshot)
+        if values.get(key) != env_snapshot.get(key)
+    )
+    for key in changed_vars:
+        if values.get(key) is None:
+            os.environ.pop(key, None)
+        else:
+            os.environ[key] = values[key]
+    env_snapshot = values
+
+    fresh = Settings()
+    changed_settings = []
+    for name in Settings.model_fields:
+        if getattr(fresh, name) != getattr(settings, name):
+            setattr(settings, name, getattr(fresh, name))
+            changed_settings.append(name)
+    return {"variables": changed_vars, "settings": changed_settings}
+
+
+def apply_settings_changes(changed: List[str]) -> List[str]:
+    """Point long-lived components at changed settings; returns actions taken
+
+    Loop intervals and thresholds are read on every cycle and need nothing here.
+    """
+    actions = []
+    if "jdownloader_home" in changed:
+        scheduler.relocate(settings.jdownloader_home)
+        actions.append(f"cfg store moved to {config_store.config_dir}")
+    if "dispatch_policy" in changed:
+        if settings.dispatch_policy in dispatcher.policies:
+            dispatcher.default_policy = settings.dispatch_policy
+            actions.append(f"dispatch policy set to {settings.dispatch_policy}")
+        else:
+            logger.warning(f"⚠️  Ignoring unknown dispatch policy: {settings.dispatch_policy}")
+    if "dispatch_host_pins" in changed:
+        dispatcher.register_policy(HostAffinityPolicy(parse_host_pins(settings.dispatch_host_pins)))
+        actions.append("host pins reloaded")
+    if "dispatch_min_free_mb" in changed:
+        dispatcher.min_free_bytes = settings.dispatch_min_free_mb * 1024 * 1024
+        actions.append("dispatch free space floor updated")
+    if "dispatch_shared_storage" in changed:
+        dispatcher.shared_storage = settings.dispatch_shared_storage
+        actions.append("dispatch shared storage updated")
+    if {"admission_pause_free_mb", "admission_resume_free_mb",
+            "admission_reserve_mb", "admission_bulk_links"} & set(changed):
+        admission.configure(
+            settings.admission_pause_free_mb,
+            settings.admission_resume_free_mb,
+            settings.admission_reserve_mb,
+            settings.admission_bulk_links
+        )
+        actions.append("admission watermarks updated")
+    if {"cloud_rate", "cloud_burst", "cloud_max_wait"} & set(changed):
+        account_limiter.configure(settings.cloud_rate, settings.cloud_burst, settings.cloud_max_wait or None)
+        actions.append("cloud rate limits updated")
+    return actions
+
+
+def refresh_credentials(sync: bool) -> List[str]:
+    """Re-sync .env credentials to JD and drop the cloud session if they changed"""
+    global known_credentials
+    actions = []
+    if sync and sync_env_to_jd_config():
+        config_store.invalidate(MYJD_SETTINGS_FILE)
+        actions.append("synced .env credentials to JDownloader config")
+
+    credentials = get_credentials()
+    if credentials != known_credentials:
+        known_credentials = credentials
+        cloud_session.invalidate()
+        dispatcher.invalidate_metrics()
+        cloud_connection.update({"connected": False, "devices": [], "last_check": None, "email": None})
+        actions.append("credentials changed, cloud session reset")
+    return actions
+
+
+def reload_config(paths: Optional[Set[str]] = None) -> Dict:
+    """Apply changes to .env and/or cfg files (everything when paths is None)"""
+    changed_paths = {Path(p).resolve() for p in paths} if paths is not None else None
+    result = {"variables": [], "settings": [], "cfg_files": [], "actions": []}
+
+    sync = False
+    if changed_paths is None or env_file.resolve() in changed_paths:
+        result.update(reload_env())
+        result["actions"] += apply_settings_changes(result["settings"])
+        sync = (any(var in result["variables"] for var in CREDENTIAL_ENV_VARS)
+                or "jdownloader_home" in result["settings"])
+
+    if changed_paths is None:
+        config_store.invalidate()
+        result["cfg_files"] = ["*"]
+    else:
+        cfg_dir = config_store.config_dir.resolve()
+        for path in sorted(changed_paths):
+            if path.parent == cfg_dir:
+                config_store.invalidate(path.name)
+                result["cfg_files"].append(path.name)
+
+    result["actions"] += refresh_credentials(sync)
+    return result
+
+
+async def on_config_change(paths: Set[str]) -> None:
+    """Config watcher callback"""
+    result = await asyncio.to_thread(reload_config, paths)
+    if result["settings"] or result["actions"]:
+        logger.info(f"🔄 Reloaded config: {', '.join(result['settings'] + result['actions'])}")
+
+
+async def config_watch_loop():
+    """Watch .env and JD's cfg directory; restart when JDOWNLOADER_HOME moves"""
+    while True:
+        watched_dir = config_store.config_dir
+        watcher = FileWatcher(
+            [str(env_file)],
+            [str(watched_dir)],
+            on_config_change,
+            poll_interval=settings.config_poll_interval
+        )
+        async def follow_relocation():
+            while config_store.config_dir == watched_dir:
+                await asyncio.sleep(1)
+            watcher.stop()
+        follower = asyncio.create_task(follow_relocation())
+        try:
+            await watcher.run()
+        finally:
+            follower.cancel()
+            watcher.stop()
+
+
+async def schedule_loop():
+    """Periodically push scheduled limits to JDownloader"""
+    upstream_priority.set("background")
+    while True:
+        service = JDownloaderService(settings.jdownloader_home, events=event_bus)
+        if scheduler.active:
+            try:
+                result = await asyncio.to_thread(scheduler.tick, service, cloud_session)
+                if result["applied"]:
+                    logger.info(f"⏱️  Applied schedule limits {result['limits']} to: {', '.join(result['applied'])}")
+                for error in result["errors"]:
+                    logger.warning(f"⚠️  Schedule apply failed: {error}")
+            except Exception as e:
+                logger.warning(f"⚠️  Schedule loop error: {str(e)}")
+        await asyncio.sleep(settings.schedule_interval)
+
+
+async def event_loop():
+    """Watch the JD process and poll download lists for package events"""
+    upstream_priority.set("background")
+    watcher = ProcessWatcher(JDownloaderService(settings.jdownloader_home, events=event_bus), event_bus)
+    poller = PackagePoller(event_bus)
+    while True:
+        try:
+            if watcher.service.jd_home != Path(settings.jdownloader_home):
+                watcher.service = JDownloaderService(settings.jdownloader_home, events=event_bus)
+            await asyncio.to_thread(watcher.check)
+            if cloud_session.connected:
+                result = await asyncio.to_thread(poller.poll, cloud_session)
+                for error in result["errors"]:
+                    logger.warning(f"⚠️  Package poll failed: {error}")
+        except Exception as e:
+            logger.warning(f"⚠️  Event loop error: {str(e)}")
+        await asyncio.sleep(settings.event_poll_interval)
+
+
+async def rebalance_loop():
+    """Periodically move queued packages off overloaded devices"""
+    upstream_priority.set("background")
+    while True:
+        await asyncio.sleep(settings.rebalance_interval)
+        try:
+            result = await asyncio.to_thread(dispatcher.rebalance, settings.rebalance_threshold)
+            if result["moved"]:
+                logger.info(f"⚖️  Rebalanced {len(result['moved'])} package(s) (imbalance {result['imbalance']})")
+            for error in result["errors"]:
+                logger.warning(f"⚠️  Rebalance failed: {error}")
+        except Exception as e:
+            logger.warning(f"⚠️  Rebalance loop error: {str(e)}")
+
+
+async def admission_loop():
+    """Watch download volumes and pause/resume the local JD on low space"""
+    upstream_priority.set("background")
+    while True:
+        try:
+            result = await asyncio.to_thread(run_admission)
+            if result["action"] == "pause":
+                logger.info(f"💾 Paused downloads: {result['reason']}")
+            elif result["action"] == "resume":
+                logger.info("💾 Resumed downloads: free space recovered")
+        except Exception as e:
+            logger.warning(f"⚠️  Admission loop error: {str(e)}")
+        await asyncio.sleep(settings.admission_interval)
+
+
+async def link_index_loop():
+    """Periodically index links from every device"""
+    upstream_priority.set("background")
+    while True:
+        try:
+            index = get_link_index()
+            result = await asyncio.to_thread(index.sync, cloud_session)
+            for error in result["errors"]:
+                logger.warning(f"⚠️  Link index sync failed: {error}")
+        except Exception as e:
+            logger.warning(f"⚠️  Link index loop error: {str(e)}")
+        await asyncio.sleep(settings.link_index_sync_interval)
+
+
+async def mirror_loop():
+    """Keep the local download-list mirror in sync"""
+    upstream_priority.set("background")
+    while True:
+        try:
+            if cloud_session.connected:
+                result = await asyncio.to_thread(sync_download_mirror)
+                for error in result["errors"]:
+                    logger.warning(f"⚠️  Mirror sync failed: {error}")
+        except Exception as e:
+            logger.warning(f"⚠️  Mirror loop error: {str(e)}")
+        await asyncio.sleep(settings.mirror_sync_interval)
+
+
+async def autoprocess_loop():
+    """Apply linkgrabber rules on every device"""
+    upstream_priority.set("background")
+    while True:
+        try:
+            if autoprocess.active and cloud_session.connected:
+                result = await asyncio.to_thread(run_autoprocess)
+                if result["moved"] or result["removed"]:
+                    logger.info(f"📥 Auto-processed linkgrabber: {result['moved']} package(s) started, "
+                                f"{result['removed']} removed")
+                for error in result["errors"]:
+                    logger.warning(f"⚠️  Linkgrabber processing failed: {error}")
+        except Exception as e:
+            logger.warning(f"⚠️  Autoprocess loop error: {str(e)}")
+        await asyncio.sleep(settings.autoprocess_interval)
+
+
+# Shared process/cloud/disk/log probes for /cli/status
+status_collector: Optional[StatusCollector] = None
+status_collector_home: Optional[str] = None
+
+
+def get_status_collector() -> StatusCollector:
+    """Build the status collector, rebuilding it if JDOWNLOADER_HOME moved"""
+    global status_collector, status_collector_home
+    if status_collector is None or status_collector_home != settings.jdownloader_home:
+        status_collector = StatusCollector(default_probes(
+            jd_home=settings.jdownloader_home,
+            data_dir=settings.data_dir,
+            session=cloud_session
+        ))
+        status_collector_home = settings.jdownloader_home
+    return status_collector
+
+
+# Local control socket for jdctl
+control_server: Optional[ControlServer] = None
+
+
+def control_socket_path() -> Optional[Path]:
+    """Control socket location; 'off' disables it
+
+    Relative paths resolve against the project root, as in jdctl, so both
+    agree whatever directory the API was started from.
+    """
+    if settings.control_socket.lower() == "off":
+        return None
+    path = Path(settings.control_socket or Path(settings.data_dir) / "control.sock")
+    return path if path.is_absolute() else PROJECT_ROOT / path
+
+
+async def control_status(args: Dict) -> Dict:
+    """jdctl status: process state plus the warm cloud session's view"""
+    report = await asyncio.to_thread(get_status_collector().collect, ["process", "log", "cloud"])
+    process = report["probes"]["process"].get("data", {})
+    log = report["probes"]["log"].get("data", {})
+    return {
+        "running": process.get("running", False),
+        "pids": [str(pid) for pid in process.get("pids", [])],
+        "process_info": process.get("process_info"),
+        "log_file": {"path": log["path"], "size_kb": log["size_kb"]} if log.get("exists") else None,
+        "cloud": {
+            "connected": cloud_session.connected,
+            "email": cloud_session.email,
+            "devices": cloud_session.cached_devices()
+        }
+    }
+
+
+async def control_verify(args: Dict) -> Dict:
+    """jdctl verify: refresh devices through the shared cloud session"""
+    upstream_priority.set("interactive")
+    _, _, device_name = get_credentials()
+    device_name = device_name or "Unknown"
+    devices = await asyncio.to_thread(cloud_session.list_devices, True)
+    device_list = [
+        {
+            "name": d.get("name", "Unknown"),
+            "id": d.get("id", "N/A"),
+            "type": d.get("type", "N/A"),
+            "status": d.get("status", "UNKNOWN"),
+            "is_expected": (d.get("name", "").lower() == device_name.lower() or
+                            device_name in d.get("name", "") or
+                            d.get("name", "") in device_name)
+        }
+        for d in devices
+    ]
+    return {
+        "connected": bool(devices),
+        "email": cloud_session.email,
+        "expected_device": device_name,
+        "found_expected_device": any(d["is_expected"] for d in device_list),
+        "devices": device_list
+    }
+
+
+def control_service_action(action: str):
+    """Build a handler running (or joining) a lifecycle transition"""
+    async def handler(args: Dict) -> Dict:
+        result = await lifecycle.request(action)
+        return {"success": result["success"], "message": result["message"],
+                "state": result["state"], "joined": result["joined"]}
+    return handler
+
+
+CONTROL_HANDLERS = {
+    "status": control_status,
+    "verify": control_verify,
+    "start": control_service_action("start"),
+    "stop": control_service_action("stop"),
+    "restart": control_service_action("restart")
+}
+
 
 @app.on_event("startup")
 async def startup_event():
     """Auto-connect to MyJDownloader cloud on startup if credentials exist"""
-    print("\n" + "="*70)
-    print("🚀 JDownloader Auth API Starting...".center(70))
-    print("="*70)
+    log_pipeline.start()
+    logger.info("🚀 JDownloader Auth API Starting...")
+    
+    global config_watch_task, control_server
+    
+    # Start event delivery
+    event_bus.start()
+    event_bus.subscribe(on_package_event)
+    if settings.event_socket:
+        event_bus.serve_socket(settings.event_socket)
+        logger.info(f"📡 Streaming events on unix:{settings.event_socket}")
+    
+    # Track the JD process state; jobs run transitions on this loop
+    lifecycle.attach(asyncio.get_running_loop())
+    event_bus.subscribe(lifecycle.on_event)
+    await lifecycle.refresh()
+    
+    # Resume background jobs interrupted by the last shutdown
+    recovered = jobs.start()
+    if recovered["queued"]:
+        logger.info(f"🧵 {recovered['queued']} job(s) queued ({recovered['resumed']} resumed after restart)")
+    if recovered["abandoned"]:
+        logger.warning(f"⚠️  {recovered['abandoned']} job(s) failed after repeated interruptions")
+    
+    # Start the jdctl control socket
+    socket_path = control_socket_path()
+    if socket_path is not None:
+        try:
+            control_server = ControlServer(str(socket_path), CONTROL_HANDLERS)
+            await control_server.start()
+            logger.info(f"🎛️  Control socket on unix:{socket_path}")
+        except OSError as e:
+            control_server = None
+            logger.warning(f"⚠️  Could not open control socket {socket_path}: {str(e)}")
     
     # Get credentials with priority: .env > JDownloader config
     email, password, device_name = get_credentials()
@@ -137,21 +1035,18 @@ async def startup_event():
     if email or password or device_name:
         synced = sync_env_to_jd_config()
         if synced:
-            print(f"🔄 Synced .env settings to JDownloader config")
+            config_store.invalidate(MYJD_SETTINGS_FILE)
+            logger.info(f"🔄 Synced .env settings to JDownloader config")
     
     if email and password:
-        print(f"📧 Using credentials from .env: {email}")
+        logger.info(f"📧 Using credentials from .env: {email}")
         if device_name:
-            print(f"🏷️  Device name: {device_name}")
-        print("🔌 Auto-connecting to MyJDownloader cloud...")
+            logger.info(f"🏷️  Device name: {device_name}")
+        logger.info("🔌 Auto-connecting to MyJDownloader cloud...")
         
         try:
-            # Try to connect using the myjdapi library
-            jd_api = myjdapi.Myjdapi()
-            jd_api.set_app_key("jd2controller")
-            jd_api.connect(email, password)
-            jd_api.update_devices()
-            devices = jd_api.list_devices()
+            # Connect the shared session used by background components
+            devices = cloud_session.list_devices(refresh=True)
             
             # Update global connection state
             cloud_connection["connected"] = True
@@ -159,42 +1054,101 @@ async def startup_event():
             cloud_connection["last_check"] = time.time()
             cloud_connection["email"] = email
             
-            print(f"✅ Successfully connected to MyJDownloader cloud")
-            print(f"📱 Found {len(devices)} device(s):")
+            logger.info(f"✅ Successfully connected to MyJDownloader cloud")
+            logger.info(f"📱 Found {len(devices)} device(s):")
             for i, device in enumerate(devices, 1):
                 device_name_found = device.get("name", "Unknown")
                 device_id = device.get("id", "")
                 device_type = device.get("type", "")
                 device_status = device.get("status", "UNKNOWN")
-                print(f"   {i}. {device_name_found}")
-                print(f"      ID: {device_id}")
-                print(f"      Type: {device_type}")
-                print(f"      Status: {device_status}")
+                logger.info(f"   {i}. {device_name_found} (ID: {device_id}, type: {device_type}, "
+                            f"status: {device_status})")
             
             if len(devices) == 0:
-                print(f"   ⚠️  No devices found. This means:")
-                print(f"      • JDownloader is not running, OR")
-                print(f"      • JDownloader is not connected to this MyJDownloader account")
-                if device_name:
-                    print(f"      • Expected device name: {device_name}")
+                logger.warning("⚠️  No devices found: JDownloader is not running or not connected to "
+                               "this MyJDownloader account" +
+                               (f" (expected device name: {device_name})" if device_name else ""))
             
         except myjdapi.exception.MYJDException as e:
-            print(f"⚠️  Failed to auto-connect: {str(e)}")
-            print(f"   You can still connect manually via /cloud/connect endpoint")
+            logger.warning(f"⚠️  Failed to auto-connect: {str(e)} (connect manually via /cloud/connect)")
         except Exception as e:
-            print(f"⚠️  Error during auto-connect: {str(e)}")
+            logger.warning(f"⚠️  Error during auto-connect: {str(e)}")
     else:
-        print("ℹ️  No credentials found in .env or JDownloader config")
-        print("   Set JDOWNLOADER_EMAIL and JDOWNLOADER_PASSWORD in .env to enable auto-connect")
+        logger.info("ℹ️  No credentials found in .env or JDownloader config; set JDOWNLOADER_EMAIL "
+                    "and JDOWNLOADER_PASSWORD in .env to enable auto-connect")
+    
+    # Start bandwidth scheduler
+    asyncio.create_task(schedule_loop())
+    if scheduler.active:
+        logger.info(f"⏱️  Bandwidth scheduler enabled with {len(scheduler.rules)} rule(s)")
+    
+    # Start automatic rebalancing
+    if settings.rebalance_interval > 0:
+        asyncio.create_task(rebalance_loop())
+        logger.info(f"⚖️  Rebalancing every {settings.rebalance_interval}s above {settings.rebalance_threshold:.0%} imbalance")
+    
+    # Start event sources
+    asyncio.create_task(event_loop())
+    
+    # Start .env / cfg hot reload
+    if settings.config_watch:
+        config_watch_task = asyncio.create_task(config_watch_loop())
+        logger.info(f"👀 Watching .env and {config_store.config_dir} for changes")
+    
+    # Start download-list mirror
+    if settings.mirror_sync_interval > 0:
+        asyncio.create_task(mirror_loop())
     
-    print("="*70 + "\n")
+    # Start disk admission control
+    if settings.admission_interval > 0:
+        asyncio.create_task(admission_loop())
+    
+    # Start linkgrabber auto-processing
+    if settings.autoprocess_interval > 0:
+        asyncio.create_task(autoprocess_loop())
+        if autoprocess.active:
+            logger.info(f"📥 Linkgrabber auto-processing enabled with {len(autoprocess.rules)} rule(s)")
+    
+    # Start duplicate link index sync
+    if settings.link_index_sync_interval > 0 and email and password:
+        asyncio.create_task(link_index_loop())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Persist in-memory state"""
+    if config_watch_task is not None:
+        config_watch_task.cancel()
+    if control_server is not None:
+        await control_server.stop()
+    if settings.api_socket:
+        Path(settings.api_socket).unlink(missing_ok=True)
+    event_bus.stop()
+    if link_index is not None:
+        link_index.close()
+    if checksum_verifier is not None:
+        await asyncio.to_thread(checksum_verifier.close)
+    jobs.close()
+    log_pipeline.stop()
 
 # API Key security (optional)
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 
-async def verify_api_key(api_key: str = Security(api_key_header)):
-    """Verify API key if configured"""
+def via_unix_socket(request: Request) -> bool:
+    """True for requests that arrived on the API's Unix socket"""
+    server = request.scope.get("server")
+    return bool(server) and server[1] is None
+
+
+async def verify_api_key(request: Request, api_key: str = Security(api_key_header)):
+    """Verify API key if configured
+    
+    Requests on the Unix socket are trusted: its file permissions decide who
+    can connect (unless API_SOCKET_REQUIRE_KEY is set).
+    """
+    if via_unix_socket(request) and not settings.api_socket_require_key:
+        return api_key
     if settings.api_key:
         if not api_key or api_key != settings.api_key:
             raise HTTPException(
@@ -226,6 +1180,162 @@ class StatusResponse(BaseModel):
     message: str
 
 
+class ConfigRead(BaseModel):
+    """Single (file, key) read"""
+    file: str = Field(..., description="Config file, e.g. org.jdownloader.settings.GeneralSettings")
+    key: str
+
+
+class ConfigWrite(ConfigRead):
+    """Single (file, key) write"""
+    value: object = Field(..., description="New JSON value")
+
+
+class ConfigBatch(BaseModel):
+    """Batched config reads and an atomic multi-file write set"""
+    reads: List[ConfigRead] = Field(default_factory=list)
+    writes: List[ConfigWrite] = Field(default_factory=list)
+
+
+class BatchOperation(BaseModel):
+    """One API call inside a batch"""
+    id: Optional[str] = Field(None, description="Client reference echoed in the result")
+    method: str = Field("GET", description="HTTP method")
+    path: str = Field(..., description="API path, e.g. /cli/status")
+    params: Dict[str, Any] = Field(default_factory=dict, description="Query parameters")
+    body: Optional[Any] = Field(None, description="JSON body")
+    headers: Dict[str, str] = Field(default_factory=dict, description="Extra request headers")
+
+
+class BatchRequest(BaseModel):
+    """Operations executed concurrently in one round trip"""
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=50)
+
+
+class DispatchRequest(BaseModel):
+    """Model for adding a package through the dispatcher"""
+    links: List[str] = Field(..., min_length=1, description="Links for one package")
+    package_name: Optional[str] = Field(None, description="Package name")
+    destination_folder: Optional[str] = Field(None, description="Download folder on the target device")
+    autostart: bool = Field(True, description="Start downloading without linkgrabber confirmation")
+    policy: Optional[str] = Field(None, description="Override the default dispatch policy")
+    allow_duplicates: bool = Field(False, description="Add links already known in the fleet")
+
+
+class WebhookCreate(BaseModel):
+    """Model for registering an event webhook"""
+    url: str = Field(..., pattern=r"^https?://", description="Endpoint receiving POSTed event batches")
+    event_types: List[str] = Field(default_factory=list, description="Event types or prefixes like 'package.*' (empty = all)")
+    secret: Optional[str] = Field(None, description="HMAC-SHA256 key for the X-JD-Signature header")
+    from_start: bool = Field(False, description="Also deliver events still in the outbox")
+
+
+class LinkCheckItem(BaseModel):
+    """Link to check against the duplicate index"""
+    url: str
+    name: Optional[str] = Field(None, description="File name, for content matching")
+    size: Optional[int] = Field(None, description="File size in bytes, for content matching")
+
+
+class LinkCheckRequest(BaseModel):
+    """Model for duplicate checks"""
+    links: List[LinkCheckItem] = Field(..., min_length=1)
+
+
+class RebalanceRequest(BaseModel):
+    """Model for a rebalance run"""
+    threshold: Optional[float] = Field(None, gt=0, lt=1, description="Imbalance threshold (0-1)")
+    dry_run: bool = Field(False, description="Only plan the moves")
+
+
+class ScheduleLimits(BaseModel):
+    """Limits enforced by the scheduler (None leaves JD's value unchanged)"""
+    speed_limit_kbps: Optional[int] = Field(None, ge=0, description="Global download speed limit in KiB/s, 0 = unlimited")
+    max_downloads: Optional[int] = Field(None, ge=1, description="Max simultaneous downloads")
+    max_chunks: Optional[int] = Field(None, ge=1, description="Max chunks per file")
+
+
+class ScheduleRule(ScheduleLimits):
+    """Weekday/time-window rule; windows ending before they start wrap past midnight"""
+    name: Optional[str] = Field(None, description="Rule name")
+    days: List[str] = Field(default_factory=lambda: ["mon", "tue", "wed", "thu", "fri", "sat", "sun"])
+    start: str = Field("00:00", pattern=r"^\d{1,2}:\d{2}$", description="Window start (HH:MM)")
+    end: str = Field("24:00", pattern=r"^\d{1,2}:\d{2}$", description="Window end (HH:MM)")
+
+
+class ScheduleUpdate(BaseModel):
+    """Model for replacing the schedule"""
+    defaults: ScheduleLimits = Field(default_factory=ScheduleLimits)
+    rules: List[ScheduleRule] = Field(default_factory=list)
+
+
+class ChecksumRequest(BaseModel):
+    """Files to hash, optionally with expected digests"""
+    paths: List[str] = Field(default_factory=list, description="Files to verify")
+    directory: Optional[str] = Field(None, description="Verify every file in this folder (uses its .sfv/.md5/.sha* files)")
+    expected: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Path -> expected digest, as 'algorithm:hex' or bare hex (algorithm from its length)"
+    )
+    force: bool = Field(False, description="Re-hash files whose size and mtime are unchanged")
+
+
+class OrganizerRule(BaseModel):
+    """Destination template for matching files; every condition set must hold"""
+    name: Optional[str] = Field(None, description="Rule name")
+    destination: str = Field(..., description="Absolute path template, e.g. /library/{category}/{package}")
+    extensions: List[str] = Field(default_factory=list, description="File extensions to match")
+    categories: List[str] = Field(default_factory=list, description="video, audio, image, archive, document or other")
+    name_pattern: Optional[str] = Field(None, description="Regex searched in the file name (case-insensitive)")
+    min_size_mb: Optional[float] = Field(None, ge=0, description="Minimum file size in MiB")
+
+
+class OrganizerOptions(BaseModel):
+    collision: str = Field("rename", pattern="^(rename|skip|overwrite)$", description="When the destination exists")
+    per_device: int = Field(2, ge=1, le=32, description="Parallel moves per source/destination filesystem pair")
+    settle_seconds: int = Field(5, ge=0, description="Wait after a package finishes before moving it")
+
+
+class OrganizerUpdate(BaseModel):
+    """Model for replacing the organiser rules (first match wins)"""
+    options: OrganizerOptions = Field(default_factory=OrganizerOptions)
+    rules: List[OrganizerRule] = Field(default_factory=list)
+
+
+class OrganizeRequest(BaseModel):
+    """Organise the files of one folder now"""
+    directory: str = Field(..., description="Folder whose files are moved")
+    package_name: Optional[str] = Field(None, description="Value for {package} (default: folder name)")
+    dry_run: bool = Field(False, description="Only return the planned destinations")
+
+
+class AutoprocessRule(BaseModel):
+    """Linkgrabber rule; every condition set must hold for a package to match"""
+    name: Optional[str] = Field(None, description="Rule name (used for hit counts)")
+    action: str = Field("download", pattern="^(download|remove|ignore)$", description="What to do with matching packages")
+    hosts: List[str] = Field(default_factory=list, description="Allowed hosters; every link must match one")
+    exclude_hosts: List[str] = Field(default_factory=list, description="Denied hosters; no link may match")
+    min_size_mb: Optional[float] = Field(None, ge=0, description="Minimum package size in MiB")
+    max_size_mb: Optional[float] = Field(None, ge=0, description="Maximum package size in MiB")
+    name_pattern: Optional[str] = Field(None, description="Regex searched in the package name (case-insensitive)")
+    save_to: Optional[str] = Field(None, description="Target download folder")
+    priority: Optional[str] = Field(None, description="HIGHEST, HIGHER, HIGH, DEFAULT, LOW, LOWER or LOWEST")
+
+
+class AutoprocessOptions(BaseModel):
+    """Pipeline-wide cleanup and batching options"""
+    remove_offline: bool = Field(False, description="Remove links JD reports offline")
+    remove_duplicates: bool = Field(False, description="Remove links already queued or finished in the fleet")
+    settle_seconds: int = Field(30, ge=0, description="Max wait for the link check before rules apply")
+    batch_size: int = Field(50, ge=1, le=1000, description="Packages moved per upstream call")
+
+
+class AutoprocessUpdate(BaseModel):
+    """Model for replacing the linkgrabber rules (first match wins)"""
+    options: AutoprocessOptions = Field(default_factory=AutoprocessOptions)
+    rules: List[AutoprocessRule] = Field(default_factory=list)
+
+
 # API Endpoints
 @app.get("/", tags=["Root"])
 async def root():
@@ -244,18 +1354,85 @@ async def root():
                 "verify": "/cli/verify",
                 "logs": "/cli/logs"
             },
-            "config": "/config",
+            "config": {
+                "current": "/config",
+                "files": "/config/files",
+                "search": "/config/search",
+                "batch": "/config/batch",
+                "reload": "/config/reload"
+            },
             "cloud": {
                 "connect": "/cloud/connect",
                 "devices": "/cloud/devices",
-                "verify": "/cloud/verify"
+                "verify": "/cloud/verify",
+                "rate_limit": "/cloud/rate-limit"
             },
             "service": {
                 "status": "/service/status",
+                "lifecycle": "/service/lifecycle",
                 "start": "/service/start",
                 "stop": "/service/stop",
                 "restart": "/service/restart"
-            }
+            },
+            "dispatch": {
+                "admission": "/dispatch/admission",
+                "metrics": "/dispatch/metrics",
+                "links": "/dispatch/links",
+                "rebalance": "/dispatch/rebalance"
+            },
+            "events": {
+                "status": "/events",
+                "webhooks": "/events/webhooks"
+            },
+            "links": {
+                "check": "/links/check",
+                "index": "/links/index",
+                "sync": "/links/index/sync"
+            },
+            "mirror": {
+                "changes": "/mirror",
+                "info": "/mirror/info",
+                "sync": "/mirror/sync"
+            },
+            "checksums": {
+                "results": "/checksums",
+                "verify": "/checksums/verify",
+                "metrics": "/checksums/metrics"
+            },
+            "organizer": {
+                "rules": "/organizer",
+                "run": "/organizer/run",
+                "manifest": "/organizer/manifest"
+            },
+            "analytics": {
+                "hosters": "/analytics/hosters"
+            },
+            "autoprocess": {
+                "rules": "/autoprocess",
+                "metrics": "/autoprocess/metrics",
+                "run": "/autoprocess/run"
+            },
+            "export": {
+                "downloads": "/export/downloads",
+                "history": "/export/history"
+            },
+            "schedule": {
+                "rules": "/schedule",
+                "preview": "/schedule/preview",
+                "apply": "/schedule/apply"
+            },
+            "jobs": {
+                "list": "/jobs",
+                "job": "/jobs/{job_id}",
+                "log": "/jobs/{job_id}/log",
+                "cancel": "/jobs/{job_id}/cancel"
+            },
+            "debug": {
+                "traces": "/debug/traces",
+                "profile": "/debug/profile",
+                "logging": "/debug/logging"
+            },
+            "batch": "/batch"
         }
     }
 
@@ -270,18 +1447,23 @@ async def health_check():
 
 
 @app.get("/config", response_model=ConfigResponse, tags=["Configuration"])
-async def get_config(api_key: str = Depends(verify_api_key)):
+async def get_config(request: Request, api_key: str = Depends(verify_api_key)):
     """Get current JDownloader configuration"""
     try:
         jd = JDownloaderConfig(settings.jdownloader_home)
+        etag = compute_etag("config", str(jd.config_file), file_version(jd.config_file))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        
         config = jd.read_config()
         
-        return ConfigResponse(
+        response = ConfigResponse(
             email=config.get("email"),
             device_name=config.get("devicename", "Not set"),
             auto_connect=config.get("autoconnectenabledv2", False),
             server_host=config.get("serverhost", "api.jdownloader.org")
         )
+        return JSONResponse(response.model_dump(), headers={"ETag": etag})
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -357,15 +1539,19 @@ async def clear_credentials(api_key: str = Depends(verify_api_key)):
 
 
 @app.get("/config/status", response_model=dict, tags=["Monitoring"])
-async def get_connection_status(api_key: str = Depends(verify_api_key)):
+async def get_connection_status(request: Request, api_key: str = Depends(verify_api_key)):
     """Get JDownloader connection status and monitoring info"""
     try:
         jd = JDownloaderConfig(settings.jdownloader_home)
+        etag = compute_etag("config-status", str(jd.config_file), file_version(jd.config_file))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        
         config = jd.read_config()
         
         has_credentials = bool(config.get("email") and config.get("password"))
         
-        return {
+        return JSONResponse({
             "configured": has_credentials,
             "email": config.get("email", "Not configured"),
             "device_name": config.get("devicename", "Not set"),
@@ -373,7 +1559,7 @@ async def get_connection_status(api_key: str = Depends(verify_api_key)):
             "server_host": config.get("serverhost", "api.jdownloader.org"),
             "config_file": str(jd.config_file),
             "config_exists": jd.config_file.exists()
-        }
+        }, headers={"ETag": etag})
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -381,6 +1567,92 @@ async def get_connection_status(api_key: str = Depends(verify_api_key)):
         )
 
 
+@app.get("/config/files", response_model=dict, tags=["Configuration"])
+async def list_config_files(api_key: str = Depends(verify_api_key)):
+    """List all JDownloader cfg/*.json files"""
+    files = config_store.files()
+    return {
+        "status": "success",
+        "config_dir": str(config_store.config_dir),
+        "file_count": len(files),
+        "files": files,
+        "cache": config_store.stats
+    }
+
+
+@app.get("/config/search", response_model=dict, tags=["Configuration"])
+async def search_config(
+    pattern: str,
+    limit: int = 500,
+    api_key: str = Depends(verify_api_key)
+):
+    """Find settings whose file or key matches a regex"""
+    try:
+        matches = await asyncio.to_thread(config_store.search, pattern, limit)
+        return {"status": "success", "match_count": len(matches), "matches": matches}
+    except re.error as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid pattern: {str(e)}"
+        )
+
+
+@app.post("/config/batch", response_model=dict, tags=["Configuration"])
+async def config_batch(
+    batch: ConfigBatch,
+    api_key: str = Depends(verify_api_key)
+):
+    """Read many settings and commit multi-file writes atomically
+    
+    Writes are applied first, all-or-nothing; reads see the committed state.
+    """
+    try:
+        committed = {"changed_files": [], "unchanged_files": []}
+        if batch.writes:
+            committed = await asyncio.to_thread(
+                config_store.commit,
+                [(w.file, w.key, w.value) for w in batch.writes]
+            )
+        values = config_store.get_many([(r.file, r.key) for r in batch.reads])
+        return {
+            "status": "success",
+            **committed,
+            "values": values
+        }
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except ConfigConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error in config batch: {str(e)}"
+        )
+
+
+@app.post("/config/reload", response_model=dict, tags=["Configuration"])
+async def reload_configuration(api_key: str = Depends(verify_api_key)):
+    """Re-read .env and all cfg files now (the watcher does this on change)"""
+    try:
+        result = await asyncio.to_thread(reload_config)
+        return {
+            "status": "success",
+            "watching": config_watch_task is not None and not config_watch_task.done(),
+            **result
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error reloading config: {str(e)}"
+        )
+
+
 # Cloud Connection Endpoints
 @app.post("/cloud/connect", response_model=dict, tags=["Cloud Connection"])
 async def connect_to_cloud(api_key: str = Depends(verify_api_key)):
@@ -396,9 +1668,9 @@ async def connect_to_cloud(api_key: str = Depends(verify_api_key)):
             )
         
         # Connect to MyJDownloader API using official library
-        jd_api = myjdapi.Myjdapi()
+        jd_api = RateLimitedMyjdapi()
         jd_api.set_app_key("jd2controller")
-        jd_api.connect(email, password)
+        await asyncio.to_thread(jd_api.connect, email, password)
         
         return {
             "status": "success",
@@ -421,8 +1693,16 @@ async def connect_to_cloud(api_key: str = Depends(verify_api_key)):
 
 
 @app.get("/cloud/devices", response_model=dict, tags=["Cloud Connection"])
-async def list_cloud_devices(api_key: str = Depends(verify_api_key)):
-    """List all devices connected to MyJDownloader cloud"""
+async def list_cloud_devices(
+    request: Request,
+    refresh: bool = False,
+    api_key: str = Depends(verify_api_key)
+):
+    """List all devices connected to MyJDownloader cloud
+    
+    Served from the shared session (refreshed every few seconds); pass
+    refresh=true to query MyJDownloader now.
+    """
     try:
         # Get credentials with priority: .env > JDownloader config
         email, password, device_name = get_credentials()
@@ -433,12 +1713,8 @@ async def list_cloud_devices(api_key: str = Depends(verify_api_key)):
                 detail="Email and password must be configured in .env or JDownloader config"
             )
         
-        # Connect and list devices using official library
-        jd_api = myjdapi.Myjdapi()
-        jd_api.set_app_key("jd2controller")
-        jd_api.connect(email, password)
-        jd_api.update_devices()
-        devices = jd_api.list_devices()
+        # List devices through the shared session
+        devices = await asyncio.to_thread(cloud_session.list_devices, refresh)
         
         # Update global connection state
         cloud_connection["connected"] = True
@@ -446,7 +1722,11 @@ async def list_cloud_devices(api_key: str = Depends(verify_api_key)):
         cloud_connection["last_check"] = time.time()
         cloud_connection["email"] = email
         
-        return {
+        etag = compute_etag("devices", cloud_session.email, cloud_session.devices_version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        
+        return JSONResponse({
             "status": "success",
             "message": f"Found {len(devices)} device(s)",
             "device_count": len(devices),
@@ -460,7 +1740,7 @@ async def list_cloud_devices(api_key: str = Depends(verify_api_key)):
                 }
                 for d in devices
             ]
-        }
+        }, headers={"ETag": etag})
         
     except HTTPException:
         raise
@@ -476,6 +1756,18 @@ async def list_cloud_devices(api_key: str = Depends(verify_api_key)):
         )
 
 
+@app.get("/cloud/rate-limit", response_model=dict, tags=["Cloud Connection"])
+async def get_rate_limit_stats(api_key: str = Depends(verify_api_key)):
+    """Per-account MyJDownloader call budget, queue depth and wait times by priority"""
+    return {
+        "status": "success",
+        "rate_per_second": account_limiter.rate,
+        "burst": account_limiter.burst,
+        "max_wait_seconds": account_limiter.max_wait,
+        "accounts": account_limiter.stats()
+    }
+
+
 @app.post("/cloud/verify", response_model=dict, tags=["Cloud Connection"])
 async def verify_cloud_connection(api_key: str = Depends(verify_api_key)):
     """Verify that local JDownloader is connected to MyJDownloader cloud"""
@@ -494,10 +1786,10 @@ async def verify_cloud_connection(api_key: str = Depends(verify_api_key)):
             )
         
         # Verify connection using official library
-        jd_api = myjdapi.Myjdapi()
+        jd_api = RateLimitedMyjdapi()
         jd_api.set_app_key("jd2controller")
-        jd_api.connect(email, password)
-        jd_api.update_devices()
+        await asyncio.to_thread(jd_api.connect, email, password)
+        await asyncio.to_thread(jd_api.update_devices)
         devices = jd_api.list_devices()
         
         # Check if expected device is found
@@ -556,14 +1848,15 @@ async def verify_cloud_connection(api_key: str = Depends(verify_api_key)):
 # JDownloader Service Management
 @app.get("/service/status", response_model=dict, tags=["Service Management"])
 async def get_service_status(api_key: str = Depends(verify_api_key)):
-    """Get JDownloader service status"""
+    """Get JDownloader service status with its lifecycle state"""
     try:
-        service = JDownloaderService(settings.jdownloader_home)
-        status_info = service.status()
+        service = JDownloaderService(settings.jdownloader_home, events=event_bus)
+        status_info = await asyncio.to_thread(service.status)
         
         return {
             "status": "success",
-            **status_info
+            **status_info,
+            "state": await lifecycle.refresh()
         }
         
     except Exception as e:
@@ -573,44 +1866,39 @@ async def get_service_status(api_key: str = Depends(verify_api_key)):
         )
 
 
-@app.post("/service/start", response_model=StatusResponse, tags=["Service Management"])
-async def start_service(api_key: str = Depends(verify_api_key)):
-    """Start JDownloader service"""
-    try:
-        service = JDownloaderService(settings.jdownloader_home)
-        success, message = service.start()
-        
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=message
-            )
-        
-        return StatusResponse(status="success", message=message)
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error starting service: {str(e)}"
-        )
+@app.get("/service/lifecycle", response_model=dict, tags=["Service Management"])
+async def get_service_lifecycle(
+    limit: int = Query(20, ge=1, le=100, description="Recent transitions to list"),
+    api_key: str = Depends(verify_api_key)
+):
+    """Lifecycle state, the transition in flight, and start/stop/restart durations"""
+    await lifecycle.refresh()
+    return {"status": "success", **lifecycle.info(limit)}
+
+
+@app.post("/service/start", response_model=dict, status_code=status.HTTP_202_ACCEPTED,
+          tags=["Service Management"])
+async def start_service(
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    api_key: str = Depends(verify_api_key)
+):
+    """Start JDownloader service as a background job"""
+    return submit_job("jd.start", {"wait": 0}, idempotency_key)
 
 
 @app.post("/service/stop", response_model=StatusResponse, tags=["Service Management"])
 async def stop_service(api_key: str = Depends(verify_api_key)):
-    """Stop JDownloader service"""
+    """Stop JDownloader service (joins a stop already in progress)"""
     try:
-        service = JDownloaderService(settings.jdownloader_home)
-        success, message = service.stop()
+        result = await lifecycle.request("stop")
         
-        if not success:
+        if not result["success"]:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=message
+                detail=result["message"]
             )
         
-        return StatusResponse(status="success", message=message)
+        return StatusResponse(status="success", message=result["message"])
         
     except HTTPException:
         raise
@@ -621,80 +1909,39 @@ async def stop_service(api_key: str = Depends(verify_api_key)):
         )
 
 
-@app.post("/service/restart", response_model=StatusResponse, tags=["Service Management"])
-async def restart_service(api_key: str = Depends(verify_api_key)):
-    """Restart JDownloader service"""
-    try:
-        service = JDownloaderService(settings.jdownloader_home)
-        success, message = service.restart()
-        
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=message
-            )
-        
-        return StatusResponse(status="success", message=message)
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error restarting service: {str(e)}"
-        )
+@app.post("/service/restart", response_model=dict, status_code=status.HTTP_202_ACCEPTED,
+          tags=["Service Management"])
+async def restart_service(
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    api_key: str = Depends(verify_api_key)
+):
+    """Restart JDownloader service as a background job"""
+    return submit_job("jd.restart", {"wait": 0}, idempotency_key)
 
 
 # CLI Command Endpoints (matching jdctl functionality)
-@app.post("/cli/start", response_model=dict, tags=["CLI Commands"])
-async def cli_start(api_key: str = Depends(verify_api_key)):
-    """Start JDownloader (like jdctl start)"""
-    try:
-        service = JDownloaderService(settings.jdownloader_home)
-        success, message = service.start()
-        
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=message
-            )
-        
-        # Wait a bit for JD2 to initialize
-        time.sleep(3)
-        
-        # Get status
-        status_info = service.status()
-        
-        return {
-            "status": "success",
-            "message": message,
-            "running": status_info["running"],
-            "pid": status_info["pid"]
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error starting JDownloader: {str(e)}"
-        )
+@app.post("/cli/start", response_model=dict, status_code=status.HTTP_202_ACCEPTED, tags=["CLI Commands"])
+async def cli_start(
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    api_key: str = Depends(verify_api_key)
+):
+    """Start JDownloader (like jdctl start); the job reports running/pid once JD2 had time to initialize"""
+    return submit_job("jd.start", {"wait": 3.0}, idempotency_key)
 
 
 @app.post("/cli/stop", response_model=StatusResponse, tags=["CLI Commands"])
 async def cli_stop(api_key: str = Depends(verify_api_key)):
     """Stop JDownloader (like jdctl stop)"""
     try:
-        service = JDownloaderService(settings.jdownloader_home)
-        success, message = service.stop()
+        result = await lifecycle.request("stop")
         
-        if not success:
+        if not result["success"]:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=message
+                detail=result["message"]
             )
         
-        return StatusResponse(status="success", message=message)
+        return StatusResponse(status="success", message=result["message"])
         
     except HTTPException:
         raise
@@ -705,89 +1952,39 @@ async def cli_stop(api_key: str = Depends(verify_api_key)):
         )
 
 
-@app.post("/cli/restart", response_model=dict, tags=["CLI Commands"])
-async def cli_restart(api_key: str = Depends(verify_api_key)):
-    """Restart JDownloader (like jdctl restart)"""
-    try:
-        service = JDownloaderService(settings.jdownloader_home)
-        success, message = service.restart()
-        
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=message
-            )
-        
-        # Get status after restart
-        time.sleep(2)
-        status_info = service.status()
-        
-        return {
-            "status": "success",
-            "message": message,
-            "running": status_info["running"],
-            "pid": status_info["pid"]
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error restarting JDownloader: {str(e)}"
-        )
+@app.post("/cli/restart", response_model=dict, status_code=status.HTTP_202_ACCEPTED, tags=["CLI Commands"])
+async def cli_restart(
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    api_key: str = Depends(verify_api_key)
+):
+    """Restart JDownloader (like jdctl restart); the job reports running/pid afterwards"""
+    return submit_job("jd.restart", {"wait": 2.0}, idempotency_key)
 
 
 @app.get("/cli/status", response_model=dict, tags=["CLI Commands"])
-async def cli_status(api_key: str = Depends(verify_api_key)):
+async def cli_status(fresh: bool = False, api_key: str = Depends(verify_api_key)):
     """Get JDownloader status with process details (like jdctl status)"""
     try:
-        # Check if running
-        result = subprocess.run(
-            ["/usr/bin/pgrep", "-f", "JDownloader.jar"],
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode != 0:
-            return {
-                "status": "stopped",
-                "running": False,
-                "message": "JDownloader is not running",
-                "pids": [],
-                "log_file": "/tmp/jd2.log"
-            }
-        
-        pids = [pid.strip() for pid in result.stdout.strip().split('\n') if pid.strip()]
-        
-        # Get process details for first PID
-        process_info = None
-        if pids:
-            ps_result = subprocess.run(
-                ["/usr/bin/ps", "-p", pids[0], "-o", "pid,ppid,%cpu,%mem,etime,cmd", "--no-headers"],
-                capture_output=True,
-                text=True
-            )
-            if ps_result.returncode == 0:
-                process_info = ps_result.stdout.strip()
-        
-        # Check log file
-        log_file = Path("/tmp/jd2.log")
+        report = await asyncio.to_thread(get_status_collector().collect, None, not fresh)
+        probes = report["probes"]
+        process = probes["process"].get("data", {})
+        log = probes["log"].get("data", {})
         log_info = None
-        if log_file.exists():
-            log_info = {
-                "path": str(log_file),
-                "size_kb": round(log_file.stat().st_size / 1024, 1),
-                "exists": True
-            }
+        if log.get("exists"):
+            log_info = {"path": log["path"], "size_kb": log["size_kb"], "exists": True}
         
+        running = process.get("running", False)
+        pids = [str(pid) for pid in process.get("pids", [])]
         return {
-            "status": "running",
-            "running": True,
-            "message": f"JDownloader is running with {len(pids)} process(es)",
+            "status": "running" if running else "stopped",
+            "running": running,
+            "message": (f"JDownloader is running with {len(pids)} process(es)" if running
+                        else "JDownloader is not running"),
             "pids": pids,
-            "process_info": process_info,
-            "log_file": log_info
+            "process_info": process.get("process_info"),
+            "log_file": log_info,
+            "probes": probes,
+            "duration_ms": report["duration_ms"]
         }
         
     except Exception as e:
@@ -815,14 +2012,14 @@ async def cli_verify(api_key: str = Depends(verify_api_key)):
             )
         
         # Use official myjdapi
-        jd_api = myjdapi.Myjdapi()
+        jd_api = RateLimitedMyjdapi()
         jd_api.set_app_key("jd2controller")
         
         # Connect
-        jd_api.connect(email, password)
+        await asyncio.to_thread(jd_api.connect, email, password)
         
         # Get devices
-        jd_api.update_devices()
+        await asyncio.to_thread(jd_api.update_devices)
         devices = jd_api.list_devices()
         
         if not devices:
@@ -880,6 +2077,7 @@ async def cli_verify(api_key: str = Depends(verify_api_key)):
 
 @app.get("/cli/logs", response_model=dict, tags=["CLI Commands"])
 async def cli_logs(
+    request: Request,
     lines: int = 50,
     api_key: str = Depends(verify_api_key)
 ):
@@ -887,7 +2085,13 @@ async def cli_logs(
     try:
         log_file = Path("/tmp/jd2.log")
         
-        if not log_file.exists():
+        # The log only grows, so its inode/size/mtime identify the tail
+        version = file_version(log_file)
+        etag = compute_etag("logs", lines, version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        
+        if version is None:
             return {
                 "status": "warning",
                 "message": "Log file not found",
@@ -896,22 +2100,24 @@ async def cli_logs(
             }
         
         # Read last N lines
-        result = subprocess.run(
-            ["/usr/bin/tail", f"-{lines}", str(log_file)],
-            capture_output=True,
-            text=True
-        )
+        with span("log.read", path=str(log_file), lines=lines):
+            result = await asyncio.to_thread(
+                run,
+                ["/usr/bin/tail", f"-{lines}", str(log_file)],
+                capture_output=True,
+                text=True
+            )
         
         log_lines = result.stdout.strip().split('\n') if result.stdout else []
         
-        return {
+        return JSONResponse({
             "status": "success",
             "message": f"Retrieved last {len(log_lines)} lines",
             "log_file": str(log_file),
             "lines_requested": lines,
             "lines_returned": len(log_lines),
             "logs": log_lines
-        }
+        }, headers={"ETag": etag})
         
     except Exception as e:
         raise HTTPException(
@@ -920,6 +2126,833 @@ async def cli_logs(
         )
 
 
+# Fleet Dispatch
+@app.get("/dispatch/metrics", response_model=dict, tags=["Dispatch"])
+async def get_dispatch_metrics(
+    refresh: bool = False,
+    api_key: str = Depends(verify_api_key)
+):
+    """Get live load metrics for every device"""
+    try:
+        metrics = await asyncio.to_thread(dispatcher.collect_metrics, refresh)
+        return {
+            "status": "success",
+            "policy": dispatcher.default_policy,
+            "policies": sorted(dispatcher.policies),
+            "device_count": len(metrics),
+            "devices": [
+                {
+                    **{k: v for k, v in m.items() if k not in ("device", "queued_packages")},
+                    "queued_packages": len(m["queued_packages"])
+                }
+                for m in metrics
+            ]
+        }
+    except myjdapi.exception.MYJDException as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"MyJDownloader API error: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error collecting metrics: {str(e)}"
+        )
+
+
+@app.get("/dispatch/admission", response_model=dict, tags=["Dispatch"])
+async def get_admission(refresh: bool = False, api_key: str = Depends(verify_api_key)):
+    """Free space, write throughput, queued bytes and projected time-to-full per volume"""
+    try:
+        if refresh or admission.last_check is None:
+            await asyncio.to_thread(run_admission)
+        return {"status": "success", **admission.status()}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error checking disk admission: {str(e)}"
+        )
+
+
+@app.post("/dispatch/links", response_model=dict, tags=["Dispatch"])
+async def dispatch_links(
+    request: DispatchRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    api_key: str = Depends(verify_api_key)
+):
+    """Add a package to the device chosen by the dispatch policy
+    
+    Bulk additions (ADMISSION_BULK_LINKS links or more) run as a background
+    job and answer 202 Accepted with its URL. The local device is skipped
+    for bulk additions while disk admission refuses them.
+    """
+    if len(request.links) >= settings.admission_bulk_links:
+        return submit_job("dispatch.links", request.model_dump(), idempotency_key)
+    try:
+        links, duplicates = await asyncio.to_thread(split_known_links, request.links, request.allow_duplicates)
+        if not links:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={"message": "All links are already known in the fleet", "duplicates": duplicates}
+            )
+        
+        result = await asyncio.to_thread(
+            dispatch_and_index,
+            links,
+            request.package_name,
+            request.destination_folder,
+            request.autostart,
+            request.policy
+        )
+        
+        return {
+            "status": "success",
+            "message": f"Sent {result['link_count']} link(s) to {result['device_name']}",
+            **result,
+            "duplicate_count": len(duplicates),
+            "duplicates": duplicates
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except DispatchRefused as e:
+        raise HTTPException(
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail=f"Bulk addition refused: {str(e)}"
+        )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except myjdapi.exception.MYJDException as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"MyJDownloader API error: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error dispatching links: {str(e)}"
+        )
+
+
+@app.post("/dispatch/rebalance", response_model=dict, tags=["Dispatch"])
+async def rebalance_devices(
+    request: RebalanceRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """Move queued, not-yet-started packages off overloaded devices"""
+    try:
+        threshold = request.threshold or settings.rebalance_threshold
+        result = await asyncio.to_thread(dispatcher.rebalance, threshold, request.dry_run)
+        return {"status": "success", **result}
+    except myjdapi.exception.MYJDException as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"MyJDownloader API error: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error rebalancing: {str(e)}"
+        )
+
+
+# Events
+@app.get("/events", response_model=dict, tags=["Events"])
+async def get_events_status(api_key: str = Depends(verify_api_key)):
+    """Get event bus outbox and webhook delivery status"""
+    return {"status": "success", **event_bus.info()}
+
+
+@app.post("/events/webhooks", response_model=dict, tags=["Events"])
+async def create_webhook(
+    webhook: WebhookCreate,
+    api_key: str = Depends(verify_api_key)
+):
+    """Register a webhook for controller events"""
+    try:
+        created = event_bus.register_webhook(
+            webhook.url,
+            webhook.event_types,
+            webhook.secret,
+            webhook.from_start
+        )
+        return {
+            "status": "success",
+            "message": "Webhook registered",
+            "webhook": {k: v for k, v in created.items() if k != "secret"}
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error registering webhook: {str(e)}"
+        )
+
+
+@app.delete("/events/webhooks/{webhook_id}", response_model=StatusResponse, tags=["Events"])
+async def delete_webhook(webhook_id: str, api_key: str = Depends(verify_api_key)):
+    """Remove a webhook"""
+    if not event_bus.remove_webhook(webhook_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Webhook '{webhook_id}' not found"
+        )
+    return StatusResponse(status="success", message="Webhook removed")
+
+
+# Duplicate Link Index
+@app.post("/links/check", response_model=dict, tags=["Link Index"])
+async def check_links(
+    request: LinkCheckRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """Report links already queued or finished anywhere in the fleet"""
+    try:
+        duplicates = await asyncio.to_thread(
+            get_link_index().check,
+            [link.model_dump() for link in request.links]
+        )
+        return {
+            "status": "success",
+            "checked": len(request.links),
+            "duplicate_count": len(duplicates),
+            "duplicates": duplicates
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error checking links: {str(e)}"
+        )
+
+
+@app.get("/links/index", response_model=dict, tags=["Link Index"])
+async def get_link_index_info(api_key: str = Depends(verify_api_key)):
+    """Get duplicate index size and hit statistics"""
+    return {"status": "success", **get_link_index().info()}
+
+
+@app.post("/links/index/sync", response_model=dict, tags=["Link Index"])
+async def sync_link_index(api_key: str = Depends(verify_api_key)):
+    """Index links from every device now"""
+    try:
+        result = await asyncio.to_thread(get_link_index().sync, cloud_session)
+        return {"status": "success" if not result["errors"] else "partial", **result}
+    except myjdapi.exception.MYJDException as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"MyJDownloader API error: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error syncing link index: {str(e)}"
+        )
+
+
+# Download-List Mirror
+@app.get("/mirror", response_model=dict, tags=["Mirror"])
+async def get_mirror_changes(
+    request: Request,
+    since: int = Query(0, ge=0),
+    device_id: Optional[str] = None,
+    api_key: str = Depends(verify_api_key)
+):
+    """Mirrored packages and links changed after version since (all when 0)"""
+    etag = compute_etag("mirror", download_mirror.version, since, device_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    changes = download_mirror.changes(since, device_id)
+    return JSONResponse({"status": "success", **changes}, headers={"ETag": etag})
+
+
+@app.get("/mirror/info", response_model=dict, tags=["Mirror"])
+async def get_mirror_info(api_key: str = Depends(verify_api_key)):
+    """Get mirror version, per-device record counts and sync statistics"""
+    return {"status": "success", **download_mirror.info()}
+
+
+@app.post("/mirror/sync", response_model=dict, tags=["Mirror"])
+async def sync_mirror(api_key: str = Depends(verify_api_key)):
+    """Sync the mirror with every device now"""
+    try:
+        result = await asyncio.to_thread(sync_download_mirror)
+        return {"status": "success" if not result["errors"] else "partial", **result}
+    except myjdapi.exception.MYJDException as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"MyJDownloader API error: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error syncing mirror: {str(e)}"
+        )
+
+
+# Hoster Analytics
+@app.get("/analytics/hosters", response_model=dict, tags=["Analytics"])
+async def get_hoster_analytics(
+    window: int = Query(3600, ge=0, description="Seconds of history to aggregate (0 = all retained)"),
+    min_samples: int = Query(0, ge=0, description="Hide hosters with fewer samples and outcomes"),
+    hoster: Optional[str] = Query(None, description="Only this hoster"),
+    api_key: str = Depends(verify_api_key)
+):
+    """Per-hoster speed percentiles, failure rates and time to first byte"""
+    result = await asyncio.to_thread(hoster_analytics.hosters, window, min_samples)
+    if hoster is not None:
+        result["hosters"] = {k: v for k, v in result["hosters"].items() if k == hoster.lower()}
+    return {"status": "success", **result, "info": hoster_analytics.info()}
+
+
+# Checksum Verification
+def parse_expected_digest(value: str) -> Tuple[str, str]:
+    """Split 'algorithm:hex' (or bare hex, algorithm from its length)"""
+    algorithm, _, digest = value.strip().rpartition(":")
+    digest = digest.lower()
+    algorithm = algorithm.lower() or HEX_LENGTHS.get(len(digest))
+    if not algorithm or not re.fullmatch(r"[0-9a-f]+", digest):
+        raise ValueError(f"Cannot parse expected checksum: {value}")
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unsupported algorithm: {algorithm} (use {', '.join(ALGORITHMS)})")
+    return algorithm, digest
+
+
+@app.post("/checksums/verify", response_model=dict, tags=["Checksums"])
+async def verify_checksums(
+    request: ChecksumRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """Queue files for hashing in the worker pool and compare with expected digests"""
+    if not request.paths and not request.directory:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Give paths or a directory to verify"
+        )
+    try:
+        expected = {
+            os.path.abspath(path): (*parse_expected_digest(value), "request")
+            for path, value in request.expected.items()
+        }
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    try:
+        verifier = get_checksum_verifier()
+        result = {"files": 0, "queued": 0, "missing": 0, "already_queued": 0}
+        if request.directory:
+            package = {"name": Path(request.directory).name, "save_to": request.directory}
+            counts = await asyncio.to_thread(verifier.submit_package, package, expected, request.force)
+            for key in result:
+                result[key] += counts[key]
+        if request.paths:
+            found = find_expected({os.path.dirname(os.path.abspath(p)) for p in request.paths})
+            found.update(expected)
+            counts = await asyncio.to_thread(verifier.submit, request.paths, found, None, None, request.force)
+            result["files"] += len(request.paths)
+            for key in counts:
+                result[key] += counts[key]
+        return {"status": "success", **result}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error queueing checksum verification: {str(e)}"
+        )
+
+
+@app.get("/checksums", response_model=dict, tags=["Checksums"])
+async def get_checksums(
+    status_filter: Optional[str] = Query(None, alias="status", description="ok, mismatch, hashed, missing or error"),
+    package: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=10000),
+    api_key: str = Depends(verify_api_key)
+):
+    """Recorded verification results, newest first"""
+    results = await asyncio.to_thread(get_checksum_verifier().results, status_filter, package, limit)
+    return {"status": "success", "count": len(results), "results": results}
+
+
+@app.get("/checksums/metrics", response_model=dict, tags=["Checksums"])
+async def get_checksum_metrics(api_key: str = Depends(verify_api_key)):
+    """Hashing throughput and capacity next to the fleet's current download speed"""
+    download_bps = None
+    if cloud_session.connected:
+        try:
+            metrics = await asyncio.to_thread(dispatcher.collect_metrics)
+            download_bps = sum(m["speed_bps"] or 0 for m in metrics)
+        except Exception:
+            pass
+    return {"status": "success", **get_checksum_verifier().metrics(download_bps)}
+
+
+# Finished-File Organiser
+@app.get("/organizer", response_model=dict, tags=["Organizer"])
+async def get_organizer(api_key: str = Depends(verify_api_key)):
+    """Get organiser rules, options and move statistics"""
+    return {"status": "success", "active": organizer.active, **organizer.to_dict(),
+            "metrics": organizer.metrics()}
+
+
+@app.put("/organizer", response_model=dict, tags=["Organizer"])
+async def put_organizer(
+    update: OrganizerUpdate,
+    api_key: str = Depends(verify_api_key)
+):
+    """Replace organiser rules"""
+    try:
+        organizer.set_rules(
+            [rule.model_dump() for rule in update.rules],
+            update.options.model_dump()
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid rules: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error saving rules: {str(e)}"
+        )
+    return {
+        "status": "success",
+        "message": f"Organizer rules updated with {len(organizer.rules)} rule(s)",
+        "active": organizer.active
+    }
+
+
+@app.post("/organizer/run", response_model=dict, tags=["Organizer"])
+async def run_organizer(
+    request: OrganizeRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """Move (or plan moving) every file in a folder through the organiser rules"""
+    if not os.path.isdir(request.directory):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Directory not found: {request.directory}"
+        )
+    package = {"name": request.package_name or Path(request.directory).name, "save_to": request.directory}
+    try:
+        files = await asyncio.to_thread(organizer.package_files, package)
+        if request.dry_run:
+            planned = await asyncio.to_thread(organizer.plan, files, package)
+            return {"status": "success", "files": len(files), "planned": planned}
+        result = await asyncio.to_thread(organizer.submit, files, package)
+        return {"status": "success", **result}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error organizing files: {str(e)}"
+        )
+
+
+@app.get("/organizer/manifest", response_model=dict, tags=["Organizer"])
+async def get_organizer_manifest(
+    since: int = Query(0, ge=0, description="Byte offset returned as 'next' by the previous call"),
+    limit: int = Query(1000, ge=1, le=10000),
+    api_key: str = Depends(verify_api_key)
+):
+    """Moves recorded since an offset, so consumers never rescan the library"""
+    entries, next_offset = await asyncio.to_thread(organizer.read_manifest, since, limit)
+    return {"status": "success", "count": len(entries), "since": since, "next": next_offset, "entries": entries}
+
+
+# Linkgrabber Auto-Processing
+@app.get("/autoprocess", response_model=dict, tags=["Autoprocess"])
+async def get_autoprocess(api_key: str = Depends(verify_api_key)):
+    """Get linkgrabber rules and options"""
+    return {"status": "success", "active": autoprocess.active, **autoprocess.to_dict()}
+
+
+@app.put("/autoprocess", response_model=dict, tags=["Autoprocess"])
+async def put_autoprocess(
+    update: AutoprocessUpdate,
+    api_key: str = Depends(verify_api_key)
+):
+    """Replace linkgrabber rules"""
+    try:
+        autoprocess.set_rules(
+            [rule.model_dump() for rule in update.rules],
+            update.options.model_dump()
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid rules: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error saving rules: {str(e)}"
+        )
+    return {
+        "status": "success",
+        "message": f"Linkgrabber rules updated with {len(autoprocess.rules)} rule(s)",
+        "active": autoprocess.active
+    }
+
+
+@app.get("/autoprocess/metrics", response_model=dict, tags=["Autoprocess"])
+async def get_autoprocess_metrics(api_key: str = Depends(verify_api_key)):
+    """Per-rule hit counts and latency from linkgrabber to download list"""
+    return {"status": "success", **autoprocess.metrics()}
+
+
+@app.post("/autoprocess/run", response_model=dict, tags=["Autoprocess"])
+async def run_autoprocess_now(api_key: str = Depends(verify_api_key)):
+    """Process every device's linkgrabber now"""
+    try:
+        result = await asyncio.to_thread(run_autoprocess)
+        return {"status": "success" if not result["errors"] else "partial", **result}
+    except myjdapi.exception.MYJDException as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"MyJDownloader API error: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing linkgrabber: {str(e)}"
+        )
+
+
+# Streaming Export
+def check_export_format(format: str) -> None:
+    if format not in MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format: {format} (use {' or '.join(MEDIA_TYPES)})"
+        )
+
+
+@app.get("/export/downloads", tags=["Export"])
+async def export_downloads(
+    format: str = "ndjson",
+    gzip: bool = False,
+    device_id: Optional[str] = None,
+    page_size: int = Query(500, ge=1, le=5000),
+    api_key: str = Depends(verify_api_key)
+):
+    """Stream every download link as NDJSON or CSV, paging through each device"""
+    check_export_format(format)
+    try:
+        # Resolve devices up front so connection errors still get a proper status
+        devices = await asyncio.to_thread(cloud_session.get_devices)
+    except myjdapi.exception.MYJDException as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"MyJDownloader API error: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error exporting downloads: {str(e)}"
+        )
+    if device_id:
+        devices = [device for device in devices if device.device_id == device_id]
+        if not devices:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Device not found: {device_id}"
+            )
+    return export_response(
+        iter_download_rows(devices, page_size),
+        DOWNLOAD_COLUMNS,
+        format,
+        gzip,
+        filename="downloads"
+    )
+
+
+@app.get("/export/history", tags=["Export"])
+async def export_history(
+    format: str = "ndjson",
+    gzip: bool = False,
+    since: Optional[float] = None,
+    state: Optional[str] = None,
+    page_size: int = Query(1000, ge=1, le=10000),
+    api_key: str = Depends(verify_api_key)
+):
+    """Stream the fleet link history from the local index as NDJSON or CSV"""
+    check_export_format(format)
+    return export_response(
+        iter_history_rows(get_link_index(), since, state, page_size),
+        HISTORY_COLUMNS,
+        format,
+        gzip,
+        filename="history"
+    )
+
+
+# Bandwidth Schedule
+@app.get("/schedule", response_model=dict, tags=["Schedule"])
+async def get_schedule(api_key: str = Depends(verify_api_key)):
+    """Get scheduler rules and the limits currently in force"""
+    limits, matched = scheduler.effective_limits()
+    return {
+        "status": "success",
+        **scheduler.to_dict(),
+        "effective_limits": limits,
+        "active_rules": matched,
+        "last_applied_at": scheduler.last_applied_at
+    }
+
+
+@app.put("/schedule", response_model=dict, tags=["Schedule"])
+async def put_schedule(
+    schedule: ScheduleUpdate,
+    api_key: str = Depends(verify_api_key)
+):
+    """Replace scheduler rules"""
+    try:
+        scheduler.set_rules(
+            [rule.model_dump() for rule in schedule.rules],
+            schedule.defaults.model_dump()
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid schedule: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error saving schedule: {str(e)}"
+        )
+    
+    limits, matched = scheduler.effective_limits()
+    return {
+        "status": "success",
+        "message": f"Schedule updated with {len(scheduler.rules)} rule(s)",
+        "effective_limits": limits,
+        "active_rules": matched
+    }
+
+
+@app.get("/schedule/preview", response_model=dict, tags=["Schedule"])
+async def preview_schedule(
+    hours: int = Query(168, ge=1, le=744),
+    start: Optional[datetime] = None,
+    api_key: str = Depends(verify_api_key)
+):
+    """Show the effective limits timeline"""
+    timeline = scheduler.preview(start=start, hours=hours)
+    return {
+        "status": "success",
+        "hours": hours,
+        "segment_count": len(timeline),
+        "timeline": timeline
+    }
+
+
+@app.post("/schedule/apply", response_model=dict, tags=["Schedule"])
+async def apply_schedule(api_key: str = Depends(verify_api_key)):
+    """Push the current limits to JD cfg and all cloud devices now"""
+    try:
+        service = JDownloaderService(settings.jdownloader_home, events=event_bus)
+        result = await asyncio.to_thread(scheduler.tick, service, cloud_session, True)
+        return {
+            "status": "success" if not result["errors"] else "partial",
+            **result
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error applying schedule: {str(e)}"
+        )
+
+
+# Batch
+# Outer request headers that must not leak into sub-requests
+BATCH_DROPPED_HEADERS = {"content-length", "content-type", "accept-encoding", "transfer-encoding"}
+
+
+async def run_batch_operation(request: Request, op: BatchOperation) -> Dict:
+    """Execute one operation through the app, in-process"""
+    started = time.monotonic()
+    result = {"id": op.id, "method": op.method.upper(), "path": op.path}
+    if not op.path.startswith("/") or op.path.rstrip("/") == "/batch":
+        return {**result, "status_code": 400, "duration_ms": 0.0,
+                "body": {"detail": "Path must be an API path other than /batch"}}
+
+    headers = {
+        k.decode("latin-1"): v.decode("latin-1") for k, v in request.scope["headers"]
+        if k.decode("latin-1").lower() not in BATCH_DROPPED_HEADERS
+    }
+    # Sub-responses are decoded as JSON/text, so they must come back uncompressed
+    headers.update({k.lower(): v for k, v in op.headers.items() if k.lower() not in BATCH_DROPPED_HEADERS})
+    body = b""
+    if op.body is not None:
+        body = json.dumps(op.body).encode("utf-8")
+        headers["content-type"] = "application/json"
+
+    try:
+        status_code, response_headers, raw = await call_asgi(
+            request.app, op.method, op.path, op.params,
+            [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()],
+            body, request.scope
+        )
+    except Exception as e:
+        return {**result, "status_code": 500, "duration_ms": round((time.monotonic() - started) * 1000, 1),
+                "body": {"detail": f"Error in batch operation: {str(e)}"}}
+
+    try:
+        payload = json.loads(raw) if raw else None
+    except ValueError:
+        payload = raw.decode("utf-8", errors="replace")
+    result.update({
+        "status_code": status_code,
+        "duration_ms": round((time.monotonic() - started) * 1000, 1),
+        "body": payload
+    })
+    for header in ("etag", "x-upstream-calls", "x-upstream-wait-ms"):
+        if header in response_headers:
+            result.setdefault("headers", {})[header] = response_headers[header]
+    return result
+
+
+@app.post("/batch", response_model=dict, tags=["Batch"])
+async def batch(
+    batch_request: BatchRequest,
+    request: Request,
+    api_key: str = Depends(verify_api_key)
+):
+    """Run several API operations concurrently and return all results
+    
+    Each operation goes through the normal routing, validation and API key
+    check, and shares the server's caches and cloud session.
+    """
+    started = time.monotonic()
+    results = await asyncio.gather(*[
+        run_batch_operation(request, op) for op in batch_request.operations
+    ])
+    failed = sum(1 for r in results if r["status_code"] >= 400)
+    return {
+        "status": "success" if not failed else ("partial" if failed < len(results) else "error"),
+        "operation_count": len(results),
+        "failed": failed,
+        "duration_ms": round((time.monotonic() - started) * 1000, 1),
+        "results": results
+    }
+
+
+# Background jobs
+@app.get("/jobs", response_model=dict, tags=["Jobs"])
+async def list_jobs(
+    status_filter: Optional[str] = Query(None, alias="status", description="queued, running, succeeded, failed or cancelled"),
+    kind: Optional[str] = Query(None, description="Job kind, e.g. jd.restart"),
+    limit: int = Query(50, ge=1, le=1000),
+    api_key: str = Depends(verify_api_key)
+):
+    """Recent jobs, newest first, with worker pool and per-status counts"""
+    found = await asyncio.to_thread(jobs.list, status_filter, kind, limit)
+    return {"status": "success", "count": len(found), "jobs": found, "pool": jobs.info()}
+
+
+@app.get("/jobs/{job_id}", response_model=dict, tags=["Jobs"])
+async def get_job(job_id: str, api_key: str = Depends(verify_api_key)):
+    """Job status, progress and (once finished) result or error"""
+    job = await asyncio.to_thread(jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job not found: {job_id}")
+    return {"status": "success", "job": job}
+
+
+@app.get("/jobs/{job_id}/log", response_model=dict, tags=["Jobs"])
+async def get_job_log(
+    job_id: str,
+    after: int = Query(0, ge=0, description="Only lines after this seq (the last one seen)"),
+    limit: int = Query(500, ge=1, le=5000),
+    api_key: str = Depends(verify_api_key)
+):
+    """Job log lines; poll with after=<last seq> to follow a running job"""
+    job = await asyncio.to_thread(jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job not found: {job_id}")
+    lines = await asyncio.to_thread(jobs.log, job_id, after, limit)
+    return {
+        "status": "success",
+        "job_status": job["status"],
+        "lines": lines,
+        "next": lines[-1]["seq"] if lines else after
+    }
+
+
+@app.post("/jobs/{job_id}/cancel", response_model=dict, tags=["Jobs"])
+async def cancel_job(job_id: str, api_key: str = Depends(verify_api_key)):
+    """Cancel a queued job, or ask a running one to stop at its next checkpoint"""
+    job = await asyncio.to_thread(jobs.cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job not found: {job_id}")
+    if job["status"] in ("succeeded", "failed"):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job already {job['status']}")
+    return {
+        "status": "success",
+        "message": "Job cancelled" if job["status"] == "cancelled" else "Cancellation requested",
+        "job": job
+    }
+
+
+# Debugging
+@app.get("/debug/traces", response_model=dict, tags=["Debug"])
+async def get_traces(
+    limit: int = Query(20, ge=1, le=500),
+    since: Optional[float] = Query(None, description="Only traces started after this Unix time"),
+    path: Optional[str] = Query(None, description="Only requests whose method/path contains this"),
+    api_key: str = Depends(verify_api_key)
+):
+    """Slowest recent requests with their span breakdown, plus per-span totals"""
+    return {
+        "status": "success",
+        "slowest": tracer.slowest(limit, since, path),
+        "summary": tracer.summary()
+    }
+
+
+@app.get("/debug/logging", response_model=dict, tags=["Debug"])
+async def get_logging_stats(api_key: str = Depends(verify_api_key)):
+    """Log queue depth, records dropped on a full queue and debug records sampled out"""
+    return {"status": "success", **log_pipeline.stats()}
+
+
+@app.get("/debug/profile", tags=["Debug"])
+async def get_profile(
+    seconds: float = Query(10, gt=0, le=120, description="How long to sample"),
+    hz: int = Query(100, ge=1, le=1000, description="Samples per second"),
+    format: str = Query("json", pattern="^(json|collapsed)$", description="json, or collapsed stacks as text"),
+    include_idle: bool = Query(False, description="Keep stacks parked in select/wait/get"),
+    top: int = Query(30, ge=1, le=500, description="Rows in the function table"),
+    api_key: str = Depends(verify_api_key)
+):
+    """Sample every thread (and the event loop) for a while; one profile at a time"""
+    try:
+        result = await asyncio.to_thread(profile, seconds, hz, include_idle, threading.get_ident())
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error profiling: {str(e)}"
+        )
+    stacks = result.pop("stacks")
+    if format == "collapsed":
+        return PlainTextResponse(collapsed(stacks))
+    return {
+        "status": "success",
+        **result,
+        "top": top_functions(stacks, top),
+        "collapsed": collapsed(stacks)
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     
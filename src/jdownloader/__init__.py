@@ -1,9 +1,71 @@
-"""JDownloader Integration Package"""
-from .jd_auth_config import JDownloaderConfig
-from .jd_cloud_connector import MyJDownloaderAPI, JDownloaderService
+"""JDownloader Integration Package
+
+Exports are imported on first access, so importing one submodule (as the
+jdctl and verification scripts do) does not load numpy, requests and the
+rest of the controller.
+"""
+import importlib
+
+# Exported name -> submodule defining it
+_EXPORTS = {
+    "JDownloaderConfig": ".jd_auth_config",
+    "JDConfigStore": ".jd_config_store",
+    "MyJDownloaderAPI": ".jd_cloud_connector",
+    "JDownloaderService": ".jd_cloud_connector",
+    "CloudSession": ".jd_cloud_session",
+    "RateLimitedMyjdapi": ".jd_cloud_session",
+    "BandwidthScheduler": ".jd_scheduler",
+    "LinkDispatcher": ".jd_dispatcher",
+    "LinkIndex": ".jd_link_index",
+    "DownloadMirror": ".jd_mirror",
+    "HosterAnalytics": ".jd_analytics",
+    "LinkgrabberPipeline": ".jd_autoprocess",
+    "AdmissionController": ".jd_admission",
+    "ChecksumVerifier": ".jd_checksum",
+    "FileOrganizer": ".jd_organizer",
+    "ProcessWatcher": ".jd_events",
+    "PackagePoller": ".jd_events",
+    "JDLifecycle": ".jd_lifecycle",
+    "DOWNLOAD_COLUMNS": ".jd_export",
+    "HISTORY_COLUMNS": ".jd_export",
+    "iter_download_rows": ".jd_export",
+    "iter_history_rows": ".jd_export",
+}
 
 __all__ = [
     "JDownloaderConfig",
+    "JDConfigStore",
     "MyJDownloaderAPI",
     "JDownloaderService",
+    "CloudSession",
+    "RateLimitedMyjdapi",
+    "BandwidthScheduler",
+    "LinkDispatcher",
+    "LinkIndex",
+    "DownloadMirror",
+    "HosterAnalytics",
+    "LinkgrabberPipeline",
+    "AdmissionController",
+    "ChecksumVerifier",
+    "FileOrganizer",
+    "ProcessWatcher",
+    "PackagePoller",
+    "JDLifecycle",
+    "DOWNLOAD_COLUMNS",
+    "HISTORY_COLUMNS",
+    "iter_download_rows",
+    "iter_history_rows",
 ]
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
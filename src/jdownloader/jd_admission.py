@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""Disk-space and write-throughput admission control for the local JD node"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import psutil
+
+from .jd_config_store import JDConfigStore
+
+
+GENERAL_SETTINGS = "org.jdownloader.settings.GeneralSettings"
+
+QUEUE_QUERY = {
+    "bytesLoaded": True,
+    "bytesTotal": True,
+    "finished": True,
+    "saveTo": True,
+    "maxResults": -1,
+    "startAt": 0
+}
+
+MB = 1024 * 1024
+
+
+def _existing(path: str) -> Optional[str]:
+    """Nearest existing ancestor of path (download folders may not exist yet)"""
+    current = Path(path).expanduser()
+    while not current.exists():
+        if current.parent == current:
+            return None
+        current = current.parent
+    return str(current.resolve())
+
+
+def _volume_of(path: str, partitions: List) -> Tuple[str, Optional[str]]:
+    """Mount point and disk name (as in disk_io_counters) holding path"""
+    best, best_len = None, -1
+    for part in partitions:
+        mount = part.mountpoint.rstrip("/")
+        if (path == part.mountpoint or path.startswith(mount + "/")) and len(mount) > best_len:
+            best, best_len = part, len(mount)
+    if best is None:
+        return "/", None
+    disk = os.path.basename(os.path.realpath(best.device)) if best.device.startswith("/dev/") else None
+    return best.mountpoint, disk
+
+
+class AdmissionController:
+    """Pause downloads and refuse bulk additions before the download volume fills
+
+    Downloads are paused when free space drops below pause_free_mb and resumed
+    (only if this controller paused them) above resume_free_mb. Bulk additions
+    are refused while paused or when the queued bytes no longer fit.
+    """
+
+    def __init__(self, jd_home: str, config_store: Optional[JDConfigStore] = None,
+                 pause_free_mb: int = 2048, resume_free_mb: int = 4096,
+                 reserve_mb: int = 1024, bulk_links: int = 20):
+        self.config_store = config_store or JDConfigStore(jd_home)
+        self.pause_free = pause_free_mb * MB
+        self.resume_free = max(resume_free_mb, pause_free_mb) * MB
+        self.reserve = reserve_mb * MB
+        self.bulk_links = bulk_links
+        self.paused = False
+        self.paused_at: Optional[float] = None
+        self.reason: Optional[str] = None
+        self.volumes: Dict[str, Dict] = {}
+        self.refused = 0
+        self.last_check: Optional[float] = None
+        self._io: Dict[str, Tuple[float, int]] = {}
+        self._rates: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, pause_free_mb: int, resume_free_mb: int, reserve_mb: int, bulk_links: int) -> None:
+        with self._lock:
+            self.pause_free = pause_free_mb * MB
+            self.resume_free = max(resume_free_mb, pause_free_mb) * MB
+            self.reserve = reserve_mb * MB
+            self.bulk_links = bulk_links
+
+    def _write_rate(self, disk: Optional[str], counters: Dict) -> Optional[float]:
+        """Smoothed bytes/s written to disk since the previous sample"""
+        if disk is None or disk not in counters:
+            return None
+        now = time.monotonic()
+        written = counters[disk].write_bytes
+        previous = self._io.get(disk)
+        self._io[disk] = (now, written)
+        if previous is None or now <= previous[0]:
+            return self._rates.get(disk)
+        rate = max(written - previous[1], 0) / (now - previous[0])
+        last = self._rates.get(disk)
+        self._rates[disk] = rate if last is None else 0.3 * rate + 0.7 * last
+        return self._rates[disk]
+
+    def sample(self, packages: List[Dict], download_bps: Optional[float] = None) -> Dict[str, Dict]:
+        """Measure every volume holding the default folder or a queued package"""
+        queued: Dict[str, int] = {}
+        default_folder = self.config_store.get(GENERAL_SETTINGS, "defaultdownloadfolder")
+        if default_folder:
+            queued[default_folder] = 0
+        for package in packages:
+            if package.get("finished"):
+                continue
+            remaining = max((package.get("bytesTotal") or 0) - (package.get("bytesLoaded") or 0), 0)
+            folder = package.get("saveTo") or default_folder
+            if folder:
+                queued[folder] = queued.get(folder, 0) + remaining
+
+        partitions = psutil.disk_partitions(all=True)
+        try:
+            counters = psutil.disk_io_counters(perdisk=True) or {}
+        except (OSError, RuntimeError):
+            counters = {}
+
+        volumes: Dict[str, Dict] = {}
+        rates: Dict[Optional[str], Optional[float]] = {}
+        for folder, remaining in queued.items():
+            path = _existing(folder)
+            if path is None:
+                continue
+            mount, disk = _volume_of(path, partitions)
+            if mount not in volumes:
+                if disk not in rates:
+                    rates[disk] = self._write_rate(disk, counters)
+                usage = psutil.disk_usage(path)
+                volumes[mount] = {
+                    "mountpoint": mount,
+                    "disk": disk,
+                    "folders": [],
+                    "total_bytes": usage.total,
+                    "free_bytes": usage.free,
+                    "queued_bytes": 0,
+                    "write_bps": rates[disk]
+                }
+            volumes[mount]["folders"].append(folder)
+            volumes[mount]["queued_bytes"] += remaining
+
+        for volume in volumes.values():
+            # JD's own speed is the best fill-rate estimate; disk writes include other writers
+            fill_bps = download_bps or volume["write_bps"]
+            volume["fill_bps"] = round(fill_bps, 1) if fill_bps else 0
+            volume["write_bps"] = round(volume["write_bps"], 1) if volume["write_bps"] is not None else None
+            volume["time_to_full_seconds"] = round(volume["free_bytes"] / fill_bps) if fill_bps else None
+            volume["shortfall_bytes"] = max(volume["queued_bytes"] + self.reserve - volume["free_bytes"], 0)
+        return volumes
+
+    def tick(self, device=None) -> Dict:
+        """Sample the local volumes and pause or resume the local device's downloads"""
+        packages: List[Dict] = []
+        speed = None
+        if device is not None:
+            packages = device.downloads.query_packages([QUEUE_QUERY]) or []
+            try:
+                speed = device.downloadcontroller.get_speed_in_bytes() or 0
+            except Exception:
+                speed = None
+
+        volumes = self.sample(packages, speed)
+        lowest = min(volumes.values(), key=lambda v: v["free_bytes"], default=None)
+        action = None
+        with self._lock:
+            self.volumes = volumes
+            self.last_check = time.time()
+            if lowest is not None and lowest["free_bytes"] < self.pause_free and not self.paused:
+                action = "pause"
+                reason = f"{lowest['mountpoint']} has {lowest['free_bytes'] // MB} MiB free " \
+                         f"(pause below {self.pause_free // MB} MiB)"
+            elif self.paused and (lowest is None or lowest["free_bytes"] >= self.resume_free):
+                action = "resume"
+
+        if action is not None:
+            if device is None:
+                # Nothing to pause; admit() still refuses on low space
+                action = None
+            else:
+                device.downloadcontroller.pause_downloads(action == "pause")
+        with self._lock:
+            if action == "pause":
+                self.paused, self.paused_at, self.reason = True, time.time(), reason
+            elif action == "resume":
+                self.paused, self.paused_at, self.reason = False, None, None
+        return {"action": action, **self.status()}
+
+    def admit(self, link_count: int) -> Tuple[bool, Optional[str]]:
+        """Decide whether an addition of link_count links may go ahead"""
+        with self._lock:
+            if link_count < self.bulk_links:
+                return True, None
+            low = [v for v in self.volumes.values() if v["free_bytes"] < self.pause_free]
+            if self.paused:
+                reason = f"Downloads are paused for disk space: {self.reason}"
+            elif low:
+                reason = f"{low[0]['mountpoint']} has {low[0]['free_bytes'] // MB} MiB free " \
+                         f"(pause below {self.pause_free // MB} MiB)"
+            else:
+                short = [v for v in self.volumes.values() if v["shortfall_bytes"] > 0]
+                if not short:
+                    return True, None
+                reason = f"Queued downloads need {short[0]['shortfall_bytes'] // MB} MiB more than " \
+                         f"{short[0]['mountpoint']} has free (keeping {self.reserve // MB} MiB reserve)"
+            self.refused += 1
+            return False, reason
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "paused": self.paused,
+                "paused_at": self.paused_at,
+                "reason": self.reason,
+                "watermarks": {
+                    "pause_free_mb": self.pause_free // MB,
+                    "resume_free_mb": self.resume_free // MB,
+                    "reserve_mb": self.reserve // MB,
+                    "bulk_links": self.bulk_links
+                },
+                "refused_additions": self.refused,
+                "last_check": self.last_check,
+                "volumes": list(self.volumes.values())
+            }
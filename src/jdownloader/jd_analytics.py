@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""Per-hoster throughput, failure and time-to-first-byte analytics"""
+import bisect
+import math
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy
+except ImportError:  # required by requirements.txt; pure Python keeps working without it
+    numpy = None
+
+
+PERCENTILES = (0.5, 0.9, 0.99)
+
+# Values are counted in log-spaced bins covering 0..2^32 (bytes/s, milliseconds):
+# percentiles are read from per-hoster histograms, within 0.6% of the exact value
+BINS = 2048
+LOG_STEP = math.log1p(2 ** 32) / BINS
+UNKNOWN_BIN = BINS
+
+# Link status texts (lowercase substrings) that mean the download failed
+FAILURE_STATUSES = ("offline", "not found", "error", "defect", "failed", "unavailable", "captcha")
+
+
+def _ring(typecode: str, capacity: int) -> array:
+    return array(typecode, bytes(array(typecode).itemsize * capacity))
+
+
+def _bin(value: float) -> int:
+    return min(int(math.log1p(max(value, 0)) / LOG_STEP), BINS - 1)
+
+
+def _histogram_percentile(counts: List[int], q: float) -> Optional[float]:
+    """Value below which a fraction q of a histogram's counts fall"""
+    total = sum(counts)
+    if not total:
+        return None
+    target = q * total
+    seen = 0
+    for index, count in enumerate(counts):
+        if count and seen + count >= target:
+            return math.expm1((index + (target - seen) / count) * LOG_STEP)
+        seen += count
+    return math.expm1(BINS * LOG_STEP)
+
+
+class HosterAnalytics:
+    """Fixed-size columnar history of link speed samples and outcomes per hoster
+
+    Samples live in preallocated typed arrays used as ring buffers, each
+    stored as a (hoster, bin) key computed on arrival. With NumPy installed,
+    aggregation is a zero-copy view plus one bincount over those keys: no
+    sorting, no copies, and cost independent of how many hosters there are.
+    """
+
+    def __init__(self, max_samples: int = 2_000_000, max_outcomes: int = 200_000):
+        self.max_samples = max_samples
+        self.max_outcomes = max_outcomes
+        self._hosts: Dict[str, int] = {}
+        self._host_names: List[str] = []
+        # Speed samples: time and host id * BINS + speed bin
+        self._s_time = _ring("d", max_samples)
+        self._s_key = _ring("I", max_samples)
+        self._s_written = 0
+        # Link outcomes: host id, time, 1 = finished / 0 = failed, time-to-first-byte bin (ms)
+        self._o_host = _ring("I", max_outcomes)
+        self._o_time = _ring("d", max_outcomes)
+        self._o_ok = _ring("b", max_outcomes)
+        self._o_ttfb = _ring("H", max_outcomes)
+        self._o_written = 0
+        # Per-link progress: (device_id, uuid) -> [started_at, ttfb, outcome recorded]
+        self._links: Dict[Tuple, List] = {}
+        self.mirror_version = 0
+        self._cache: Dict[Tuple, Tuple[float, Dict]] = {}
+        self._lock = threading.Lock()
+
+    def _host_id(self, host: Optional[str]) -> int:
+        host = (host or "unknown").lower()
+        if host not in self._hosts:
+            self._hosts[host] = len(self._host_names)
+            self._host_names.append(host)
+        return self._hosts[host]
+
+    def _add_sample(self, host_id: int, at: float, speed: int) -> None:
+        i = self._s_written % self.max_samples
+        self._s_time[i], self._s_key[i] = at, host_id * BINS + _bin(speed)
+        self._s_written += 1
+
+    def _add_outcome(self, host_id: int, at: float, ok: bool, ttfb: Optional[float]) -> None:
+        i = self._o_written % self.max_outcomes
+        self._o_host[i], self._o_time[i], self._o_ok[i] = host_id, at, 1 if ok else 0
+        self._o_ttfb[i] = UNKNOWN_BIN if ttfb is None else _bin(ttfb * 1000)
+        self._o_written += 1
+
+    # Intake
+    def observe(self, links: List[Dict], removed: List[Dict] = (), at: Optional[float] = None) -> int:
+        """Record mirror link records (changed since the last call); returns samples added"""
+        at = at or time.time()
+        added = 0
+        with self._lock:
+            for link in links:
+                key = (link.get("device_id"), link.get("uuid"))
+                host_id = self._host_id(link.get("host"))
+                state = self._links.get(key)
+                running = bool(link.get("running"))
+                loaded = link.get("bytes_loaded") or 0
+                if state is None:
+                    # Already loading when first seen: its start is unknown
+                    state = self._links[key] = [at if running and not loaded else None, None, False]
+                elif running and state[0] is None and not loaded:
+                    state[0] = at
+                if state[0] is not None and state[1] is None and loaded > 0:
+                    state[1] = at - state[0]
+
+                speed = link.get("speed") or 0
+                if running and speed > 0:
+                    self._add_sample(host_id, at, speed)
+                    added += 1
+
+                if state[2]:
+                    continue
+                status = (link.get("status") or "").lower()
+                if link.get("finished"):
+                    self._add_outcome(host_id, at, True, state[1])
+                    state[2] = True
+                elif not running and any(word in status for word in FAILURE_STATUSES):
+                    self._add_outcome(host_id, at, False, state[1])
+                    state[2] = True
+            for entry in removed:
+                if entry.get("kind") == "links":
+                    self._links.pop((entry.get("device_id"), entry.get("uuid")), None)
+            self._cache.clear()
+        return added
+
+    def observe_mirror(self, mirror) -> int:
+        """Feed every link change the download mirror recorded since the last call"""
+        changes = mirror.changes(self.mirror_version)
+        added = self.observe(changes["links"], changes["removed"])
+        self.mirror_version = changes["version"]
+        return added
+
+    # Aggregation
+    @staticmethod
+    def _segments(written: int, capacity: int, times: array, since: float) -> List[Tuple[int, int]]:
+        """Index ranges of ring entries at or after since
+
+        Entries are appended in time order, so the ring is at most two sorted
+        runs and the window start is found by binary search, not a scan.
+        """
+        if written <= capacity:
+            runs = [(0, written)]
+        else:
+            head = written % capacity
+            runs = [(head, capacity), (0, head)]
+        return [(bisect.bisect_left(times, since, start, end), end) for start, end in runs]
+
+    def _histograms(self, keys: array, segments: List[Tuple[int, int]], typecode, size: int):
+        """(hosters, BINS) counts of the keys in segments, from zero-copy views"""
+        counts = numpy.zeros(size * BINS, dtype=numpy.int64)
+        view = numpy.frombuffer(keys, dtype=typecode)
+        for start, end in segments:
+            if end > start:
+                counts += numpy.bincount(view[start:end], minlength=size * BINS)
+        return counts.reshape(size, BINS)
+
+    @staticmethod
+    def _percentiles(histograms) -> "numpy.ndarray":
+        """PERCENTILES (rows) of every hoster's histogram (columns)"""
+        cumulative = numpy.cumsum(histograms, axis=1)
+        totals = cumulative[:, -1]
+        rows = numpy.arange(len(histograms))
+        result = []
+        for q in PERCENTILES:
+            target = q * totals
+            index = numpy.minimum((cumulative < target[:, None]).sum(axis=1), BINS - 1)
+            count = histograms[rows, index]
+            seen = cumulative[rows, index] - count
+            fraction = numpy.divide(target - seen, count, out=numpy.zeros(len(rows)), where=count > 0)
+            values = numpy.expm1((index + fraction) * LOG_STEP)
+            result.append(numpy.where(totals > 0, values, numpy.nan))
+        return numpy.array(result)
+
+    def _aggregate_numpy(self, since: float) -> Dict[str, Dict]:
+        size = len(self._host_names)
+        speed_hist = self._histograms(
+            self._s_key, self._segments(self._s_written, self.max_samples, self._s_time, since),
+            numpy.uint32, size
+        )
+        # Outcome keys: host id * BINS + ttfb bin, and the finished flag as a weight
+        o_segments = self._segments(self._o_written, self.max_outcomes, self._o_time, since)
+        o_host = numpy.frombuffer(self._o_host, dtype=numpy.uint32)
+        o_ok = numpy.frombuffer(self._o_ok, dtype=numpy.int8)
+        o_ttfb = numpy.frombuffer(self._o_ttfb, dtype=numpy.uint16)
+        outcomes = numpy.zeros(size, dtype=numpy.int64)
+        finished = numpy.zeros(size)
+        ttfb_hist = numpy.zeros(size * BINS, dtype=numpy.int64)
+        for start, end in o_segments:
+            if end <= start:
+                continue
+            hosts, ttfbs = o_host[start:end], o_ttfb[start:end]
+            outcomes += numpy.bincount(hosts, minlength=size)
+            finished += numpy.bincount(hosts, weights=o_ok[start:end], minlength=size)
+            known = ttfbs != UNKNOWN_BIN
+            ttfb_hist += numpy.bincount(hosts[known].astype(numpy.int64) * BINS + ttfbs[known],
+                                        minlength=size * BINS)
+        ttfb_hist = ttfb_hist.reshape(size, BINS)
+
+        samples = speed_hist.sum(axis=1)
+        # Mean from bin centres, as precise as the percentiles
+        centres = numpy.expm1((numpy.arange(BINS) + 0.5) * LOG_STEP)
+        means = numpy.divide(speed_hist @ centres, samples, out=numpy.full(size, numpy.nan), where=samples > 0)
+        speed = self._percentiles(speed_hist)
+        ttfb = self._percentiles(ttfb_hist) / 1000
+
+        hosters = {}
+        for host_id in numpy.flatnonzero((samples > 0) | (outcomes > 0)):
+            hosters[self._host_names[host_id]] = self._row(
+                int(samples[host_id]),
+                float(means[host_id]),
+                speed[:, host_id].tolist(),
+                int(finished[host_id]),
+                int(outcomes[host_id] - finished[host_id]),
+                int(ttfb_hist[host_id].sum()),
+                ttfb[:, host_id].tolist()
+            )
+        return hosters
+
+    def _aggregate_python(self, since: float) -> Dict[str, Dict]:
+        speeds: Dict[int, List[int]] = {}
+        for start, end in self._segments(self._s_written, self.max_samples, self._s_time, since):
+            for i in range(start, end):
+                host_id, index = divmod(self._s_key[i], BINS)
+                histogram = speeds.get(host_id)
+                if histogram is None:
+                    histogram = speeds[host_id] = [0] * BINS
+                histogram[index] += 1
+        outcomes: Dict[int, List] = {}
+        for start, end in self._segments(self._o_written, self.max_outcomes, self._o_time, since):
+            for i in range(start, end):
+                entry = outcomes.get(self._o_host[i])
+                if entry is None:
+                    entry = outcomes[self._o_host[i]] = [[0] * BINS, 0, 0]
+                if self._o_ttfb[i] != UNKNOWN_BIN:
+                    entry[0][self._o_ttfb[i]] += 1
+                entry[1 if self._o_ok[i] else 2] += 1
+
+        hosters = {}
+        for host_id in set(speeds) | set(outcomes):
+            histogram = speeds.get(host_id, [0] * BINS)
+            ttfb_histogram, finished, failed = outcomes.get(host_id, [[0] * BINS, 0, 0])
+            samples = sum(histogram)
+            total = sum(count * math.expm1((index + 0.5) * LOG_STEP) for index, count in enumerate(histogram) if count)
+            ttfbs = [_histogram_percentile(ttfb_histogram, q) for q in PERCENTILES]
+            hosters[self._host_names[host_id]] = self._row(
+                samples,
+                total / samples if samples else None,
+                [_histogram_percentile(histogram, q) for q in PERCENTILES],
+                finished,
+                failed,
+                sum(ttfb_histogram),
+                [None if t is None else t / 1000 for t in ttfbs]
+            )
+        return hosters
+
+    @staticmethod
+    def _row(samples: int, mean: Optional[float], speed: List, finished: int, failed: int,
+             ttfb_count: int, ttfb: List) -> Dict:
+        def rounded(value, digits=0):
+            # NaN (no data) becomes None
+            return None if value is None or value != value else round(value, digits)
+
+        return {
+            "samples": samples,
+            "speed_bps": {
+                "mean": rounded(mean),
+                **{f"p{round(q * 100)}": rounded(v) for q, v in zip(PERCENTILES, speed)}
+            },
+            "finished": finished,
+            "failed": failed,
+            "failure_rate": round(failed / (finished + failed), 4) if finished + failed else None,
+            "ttfb_seconds": {
+                "samples": ttfb_count,
+                **{f"p{round(q * 100)}": rounded(v, 2) for q, v in zip(PERCENTILES, ttfb)}
+            }
+        }
+
+    def hosters(self, window: float = 3600, min_samples: int = 0, ttl: float = 1.0) -> Dict:
+        """Per-hoster statistics over the last window seconds (0 = everything retained)"""
+        started = time.monotonic()
+        key = (window, min_samples)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and started - cached[0] < ttl:
+                return {**cached[1], "cached": True}
+            since = time.time() - window if window > 0 else 0
+            hosters = self._aggregate_numpy(since) if numpy is not None else self._aggregate_python(since)
+            retained = min(self._s_written, self.max_samples)
+        hosters = {
+            name: row for name, row in sorted(hosters.items(), key=lambda item: (-item[1]["samples"], item[0]))
+            if row["samples"] + row["finished"] + row["failed"] >= min_samples
+        }
+        result = {
+            "window_seconds": window,
+            "samples_retained": retained,
+            "engine": "numpy" if numpy is not None else "python",
+            "compute_ms": round((time.monotonic() - started) * 1000, 2),
+            "hosters": hosters
+        }
+        with self._lock:
+            self._cache[key] = (started, result)
+        return {**result, "cached": False}
+
+    def info(self) -> Dict:
+        with self._lock:
+            return {
+                "hosters": len(self._host_names),
+                "samples_written": self._s_written,
+                "samples_retained": min(self._s_written, self.max_samples),
+                "outcomes_written": self._o_written,
+                "tracked_links": len(self._links),
+                "mirror_version": self.mirror_version,
+                "engine": "numpy" if numpy is not None else "python"
+            }
@@ -1,13 +1,22 @@
 #!/usr/bin/env python3
 """JDownloader Cloud Authentication Configuration Script"""
-import json, os, sys, argparse, socket
+import json, os, sys, argparse, socket, logging
 from pathlib import Path
 from typing import Dict, Optional
 from dotenv import load_dotenv
 
+try:
+    from src.utils.tracing import traced
+except ImportError:
+    # Run as a standalone script: no request tracing
+    def traced(name):
+        return lambda fn: fn
+
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class JDownloaderConfig:
     def __init__(self, jd_home: str = None):
         if jd_home is None:
@@ -16,6 +25,7 @@ class JDownloaderConfig:
         self.config_dir = self.jd_home / "cfg"
         self.config_file = self.config_dir / "org.jdownloader.api.myjdownloader.MyJDownloaderSettings.json"
     
+    @traced("config.read")
     def read_config(self) -> Dict:
         if not self.config_file.exists():
             return self._get_default_config()
@@ -37,10 +47,10 @@ class JDownloaderConfig:
     def update_credentials(self, email: str, password: str, device_name: Optional[str] = None) -> bool:
         config = self.read_config()
         if not email or "@" not in email:
-            print(f"✗ Invalid email: {email}")
+            logger.warning("✗ Invalid email: %s", email, extra={"path": str(self.config_file)})
             return False
         if not password or len(password) < 6:
-            print(f"✗ Password too short")
+            logger.warning("✗ Password too short", extra={"path": str(self.config_file)})
             return False
         config["email"] = email
         config["password"] = password
@@ -54,10 +64,10 @@ class JDownloaderConfig:
             self.config_dir.mkdir(parents=True, exist_ok=True)
             with open(self.config_file, "w") as f:
                 json.dump(config, f, indent=2)
-            print(f"✓ Configuration saved")
+            logger.info("✓ Configuration saved", extra={"path": str(self.config_file)})
             return True
         except Exception as e:
-            print(f"✗ Error: {e}")
+            logger.error("✗ Error saving configuration: %s", e, extra={"path": str(self.config_file)})
             return False
     
     def display_config(self) -> None:
@@ -72,6 +82,7 @@ class JDownloaderConfig:
         print("="*60 + "\n")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     parser = argparse.ArgumentParser(description="Configure JDownloader MyJDownloader")
     parser.add_argument("--email", "-e", help="Email address (or use JDOWNLOADER_EMAIL env var)")
     parser.add_argument("--password", "-p", help="Password (or use JDOWNLOADER_PASSWORD env var)")
@@ -90,6 +101,6 @@ if __name__ == "__main__":
         jd.display_config()
     elif email and password:
         if jd.update_credentials(email, password, device_name):
-            print("✓ Credentials configured!")
+            logger.info("✓ Credentials configured!")
     else:
         jd.display_config()
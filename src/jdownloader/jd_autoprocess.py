@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""Rules-driven linkgrabber processing: confirm, route and clean up new links"""
+import json
+import re
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .jd_dispatcher import link_host
+from .jd_link_index import normalize_url
+
+
+ACTIONS = ("download", "remove", "ignore")
+
+PRIORITIES = ("HIGHEST", "HIGHER", "HIGH", "DEFAULT", "LOW", "LOWER", "LOWEST")
+
+# Availability values JD reports while a link is still being checked
+CHECKING = ("UNKNOWN", "TEMP_UNKNOWN")
+
+GRABBER_PACKAGE_QUERY = {
+    "bytesTotal": True,
+    "childCount": True,
+    "hosts": True,
+    "saveTo": True,
+    "maxResults": -1,
+    "startAt": 0
+}
+
+GRABBER_LINK_QUERY = {
+    "availability": True,
+    "bytesTotal": True,
+    "host": True,
+    "url": True,
+    "maxResults": -1,
+    "startAt": 0
+}
+
+DOWNLOAD_URL_QUERY = {
+    "url": True,
+    "maxResults": -1,
+    "startAt": 0
+}
+
+
+def _host_matches(host: str, patterns: List[str]) -> bool:
+    """host equals a pattern or is a subdomain of it"""
+    return any(host == p or host.endswith("." + p) for p in patterns)
+
+
+def normalize_rule(rule: Dict) -> Dict:
+    """Validate a rule dict and precompile its name pattern"""
+    action = rule.get("action", "download")
+    if action not in ACTIONS:
+        raise ValueError(f"Invalid action: {action} (use {', '.join(ACTIONS)})")
+    priority = rule.get("priority")
+    if priority is not None and priority.upper() not in PRIORITIES:
+        raise ValueError(f"Invalid priority: {priority}")
+
+    normalized = {
+        "name": rule.get("name") or f"rule-{action}",
+        "action": action,
+        "hosts": [h.lower().strip() for h in rule.get("hosts") or []],
+        "exclude_hosts": [h.lower().strip() for h in rule.get("exclude_hosts") or []],
+        "min_size_mb": rule.get("min_size_mb"),
+        "max_size_mb": rule.get("max_size_mb"),
+        "name_pattern": rule.get("name_pattern"),
+        "save_to": rule.get("save_to"),
+        "priority": priority.upper() if priority else None
+    }
+    try:
+        normalized["_pattern"] = re.compile(normalized["name_pattern"], re.IGNORECASE) \
+            if normalized["name_pattern"] else None
+    except re.error as e:
+        raise ValueError(f"Invalid name_pattern for {normalized['name']}: {str(e)}")
+    return normalized
+
+
+def rule_matches(rule: Dict, package: Dict) -> bool:
+    """Check a normalized rule against a package summary (name, hosts, bytes_total)
+
+    hosts must cover every link host; exclude_hosts must match none.
+    """
+    hosts = package["hosts"]
+    if rule["hosts"] and not all(_host_matches(h, rule["hosts"]) for h in hosts):
+        return False
+    if rule["exclude_hosts"] and any(_host_matches(h, rule["exclude_hosts"]) for h in hosts):
+        return False
+    size_mb = (package["bytes_total"] or 0) / (1024 * 1024)
+    if rule["min_size_mb"] is not None and size_mb < rule["min_size_mb"]:
+        return False
+    if rule["max_size_mb"] is not None and size_mb > rule["max_size_mb"]:
+        return False
+    if rule["_pattern"] is not None and not rule["_pattern"].search(package["name"] or ""):
+        return False
+    return True
+
+
+class LinkgrabberPipeline:
+    """Polls each device's linkgrabber and applies the first matching rule per package
+
+    Offline links and links already queued or finished anywhere in the fleet
+    (per the link index) are removed first. Packages with links still being
+    checked wait up to settle_seconds before rules are applied.
+    """
+
+    def __init__(self, rules_file: str, link_index=None):
+        self.rules_file = Path(rules_file)
+        self.link_index = link_index
+        self._lock = threading.Lock()
+        self.rules: List[Dict] = []
+        self.options = {
+            "remove_offline": False,
+            "remove_duplicates": False,
+            "settle_seconds": 30,
+            "batch_size": 50
+        }
+        self._first_seen: Dict[tuple, float] = {}
+        self._latencies = deque(maxlen=1000)
+        self.hits: Dict[str, Dict] = {}
+        self.stats = {"cycles": 0, "moved_packages": 0, "moved_links": 0, "removed_offline": 0,
+                      "removed_duplicates": 0, "deferred": 0, "last_run": None}
+        self.load_rules()
+
+    # Rule storage
+    def load_rules(self) -> None:
+        """Load rules from the rules file (missing file means no rules)"""
+        if not self.rules_file.exists():
+            return
+        with open(self.rules_file, "r") as f:
+            data = json.load(f)
+        self.set_rules(data.get("rules", []), data.get("options"), persist=False)
+
+    def set_rules(self, rules: List[Dict], options: Optional[Dict] = None, persist: bool = True) -> None:
+        """Replace the rule set; rules are tried in order and the first match wins"""
+        normalized = [normalize_rule(r) for r in rules]
+        with self._lock:
+            self.rules = normalized
+            for key, value in (options or {}).items():
+                if key in self.options and value is not None:
+                    self.options[key] = value
+            self.hits = {
+                rule["name"]: self.hits.get(rule["name"], {"packages": 0, "links": 0, "bytes": 0})
+                for rule in normalized
+            }
+
+        if persist:
+            self.rules_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.rules_file, "w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+
+    def to_dict(self) -> Dict:
+        return {
+            "options": dict(self.options),
+            "rules": [
+                {k: v for k, v in rule.items() if not k.startswith("_")}
+                for rule in self.rules
+            ]
+        }
+
+    @property
+    def active(self) -> bool:
+        return bool(self.rules) or self.options["remove_offline"] or self.options["remove_duplicates"]
+
+    # Processing
+    def _cleanup(self, device, links: List[Dict]) -> Dict[str, List]:
+        """Pick offline and duplicate links for removal"""
+        offline = [link["uuid"] for link in links if link.get("availability") == "OFFLINE"] \
+            if self.options["remove_offline"] else []
+        duplicates = []
+        if self.options["remove_duplicates"]:
+            seen = set()
+            candidates = []
+            for link in links:
+                if link["uuid"] in offline or not link.get("url"):
+                    continue
+                key = normalize_url(link["url"])
+                if key in seen:
+                    duplicates.append(link["uuid"])
+                    continue
+                seen.add(key)
+                candidates.append(link)
+            if self.link_index is not None and candidates:
+                # The index also records grabber links; only queued/finished ones count
+                matches = [
+                    d for d in self.link_index.check([
+                        {"url": l["url"], "name": l.get("name"), "size": l.get("bytesTotal")}
+                        for l in candidates
+                    ]) if d["state"] in ("queued", "finished")
+                ]
+                # A match on this device may be the grabber link itself (indexed
+                # before it reached the download list): only trust it when the
+                # download list really has it
+                if any(d["device_id"] == device.device_id for d in matches):
+                    listed = {
+                        normalize_url(l["url"])
+                        for l in device.downloads.query_links([DOWNLOAD_URL_QUERY]) or [] if l.get("url")
+                    }
+                    matches = [d for d in matches
+                               if d["device_id"] != device.device_id or normalize_url(d["known_url"]) in listed]
+                known = {d["url"] for d in matches}
+                duplicates += [l["uuid"] for l in candidates if l["url"] in known]
+        return {"offline": offline, "duplicates": duplicates}
+
+    def process_device(self, device) -> Dict:
+        """Run one pass over a device's linkgrabber"""
+        result = {"moved": [], "removed": [], "offline": 0, "duplicates": 0, "deferred": 0}
+        grabber = device.linkgrabber
+        packages = grabber.query_packages([GRABBER_PACKAGE_QUERY]) or []
+        if not packages:
+            return result
+        links = grabber.query_links([GRABBER_LINK_QUERY]) or []
+        now = time.time()
+
+        # First-seen times drive the settle delay and latency-to-start metrics
+        current = {(device.device_id, p["uuid"]) for p in packages}
+        with self._lock:
+            for key in current:
+                self._first_seen.setdefault(key, now)
+            for key in [k for k in self._first_seen if k[0] == device.device_id and k not in current]:
+                del self._first_seen[key]
+
+        cleanup = self._cleanup(device, links)
+        removed = set(cleanup["offline"]) | set(cleanup["duplicates"])
+        if removed:
+            grabber.remove_links(sorted(removed), [])
+            result["offline"] = len(cleanup["offline"])
+            result["duplicates"] = len(cleanup["duplicates"])
+
+        by_package: Dict = {}
+        for link in links:
+            if link["uuid"] not in removed:
+                by_package.setdefault(link.get("packageUUID"), []).append(link)
+
+        # First matching rule per package; group downloads by (save_to, priority)
+        batches: Dict[tuple, List] = {}
+        to_remove: List = []
+        for package in packages:
+            package_links = by_package.get(package["uuid"])
+            if not package_links:
+                continue
+            first_seen = self._first_seen.get((device.device_id, package["uuid"]), now)
+            if any(l.get("availability") in CHECKING for l in package_links) \
+                    and now - first_seen < self.options["settle_seconds"]:
+                result["deferred"] += 1
+                continue
+            summary = {
+                "name": package.get("name"),
+                "hosts": {(l.get("host") or link_host(l.get("url") or "")).lower() for l in package_links},
+                "bytes_total": sum(max(l.get("bytesTotal") or 0, 0) for l in package_links)
+            }
+            rule = next((r for r in self.rules if rule_matches(r, summary)), None)
+            if rule is None:
+                continue
+            with self._lock:
+                hits = self.hits.setdefault(rule["name"], {"packages": 0, "links": 0, "bytes": 0})
+                hits["packages"] += 1
+                hits["links"] += len(package_links)
+                hits["bytes"] += summary["bytes_total"]
+            entry = (package, package_links, rule, first_seen)
+            if rule["action"] == "ignore":
+                continue
+            if rule["action"] == "remove":
+                to_remove.append(entry)
+            else:
+                batches.setdefault((rule["save_to"], rule["priority"]), []).append(entry)
+
+        if to_remove:
+            grabber.remove_links([], [package["uuid"] for package, _, _, _ in to_remove])
+            result["removed"] = [package.get("name") for package, _, _, _ in to_remove]
+
+        batch_size = max(int(self.options["batch_size"]), 1)
+        for (save_to, priority), entries in batches.items():
+            for i in range(0, len(entries), batch_size):
+                chunk = entries[i:i + batch_size]
+                package_ids = [package["uuid"] for package, _, _, _ in chunk]
+                if save_to:
+                    device.action(grabber.url + "/setDownloadDirectory", [save_to, package_ids])
+                if priority:
+                    # myjdapi's Linkgrabber.set_priority is an empty stub
+                    device.action(grabber.url + "/setPriority", [priority, [], package_ids])
+                grabber.move_to_downloadlist([], package_ids)
+
+                moved_at = time.time()
+                with self._lock:
+                    for package, _, rule, first_seen in chunk:
+                        self._latencies.append((rule["name"], moved_at - first_seen))
+                        result["moved"].append(package.get("name"))
+                if self.link_index is not None:
+                    self.link_index.add([
+                        {"url": l["url"], "name": l.get("name"), "size": l.get("bytesTotal")}
+                        for _, package_links, _, _ in chunk for l in package_links if l.get("url")
+                    ], device_id=device.device_id, state="queued")
+                with self._lock:
+                    self.stats["moved_packages"] += len(chunk)
+                    self.stats["moved_links"] += sum(len(e[1]) for e in chunk)
+        return result
+
+    def run(self, session) -> Dict:
+        """Process every device's linkgrabber once"""
+        result = {"devices": 0, "moved": 0, "removed": 0, "offline": 0, "duplicates": 0,
+                  "deferred": 0, "errors": []}
+        for device in session.get_devices():
+            try:
+                device_result = self.process_device(device)
+                result["devices"] += 1
+                result["moved"] += len(device_result["moved"])
+                result["removed"] += len(device_result["removed"])
+                for key in ("offline", "duplicates", "deferred"):
+                    result[key] += device_result[key]
+            except Exception as e:
+                result["errors"].append(f"{device.name}: {str(e)}")
+        with self._lock:
+            self.stats["cycles"] += 1
+            self.stats["removed_offline"] += result["offline"]
+            self.stats["removed_duplicates"] += result["duplicates"]
+            self.stats["deferred"] += result["deferred"]
+            self.stats["last_run"] = time.time()
+        return result
+
+    def metrics(self) -> Dict:
+        """Per-rule hit counts and latency from first seen in the grabber to download list"""
+        def summarize(values: List[float]) -> Dict:
+            if not values:
+                return {"count": 0}
+            ordered = sorted(values)
+            return {
+                "count": len(ordered),
+                "avg_seconds": round(sum(ordered) / len(ordered), 1),
+                "p50_seconds": round(ordered[len(ordered) // 2], 1),
+                "p95_seconds": round(ordered[max(int(len(ordered) * 0.95) - 1, 0)], 1),
+                "max_seconds": round(ordered[-1], 1)
+            }
+
+        with self._lock:
+            latencies = list(self._latencies)
+            rules = {
+                name: {**hits, "latency_to_start": summarize([s for r, s in latencies if r == name])}
+                for name, hits in self.hits.items()
+            }
+            return {
+                **self.stats,
+                "pending_packages": len(self._first_seen),
+                "latency_to_start": summarize([s for _, s in latencies]),
+                "rules": rules
+            }
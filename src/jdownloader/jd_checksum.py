@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""Post-download checksum verification in a process pool"""
+import logging
+import multiprocessing
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.utils.file_hash import ALGORITHMS, CHECKSUM_EXTENSIONS, find_expected, hash_file
+
+from .jd_events import PACKAGE_FINISHED
+
+
+logger = logging.getLogger(__name__)
+
+# Files in a package folder that are never hashed
+SKIP_SUFFIXES = tuple(CHECKSUM_EXTENSIONS) + (".part", ".crdownload")
+
+
+class ChecksumVerifier:
+    """Hash finished files in worker processes and record the results in SQLite
+
+    Each disk (st_dev) gets its own queue served by per_disk threads, so one
+    busy disk neither starves the others nor sees more than per_disk
+    concurrent sequential readers.
+    """
+
+    def __init__(self, db_path: str, workers: int = 0, per_disk: int = 2, algorithm: str = "sha256",
+                 resolver: Optional[Callable[[Dict], List[str]]] = None):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unsupported algorithm: {algorithm} (use {', '.join(ALGORITHMS)})")
+        self.workers = workers or os.cpu_count() or 1
+        self.per_disk = max(per_disk, 1)
+        self.algorithm = algorithm
+        self.resolver = resolver
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS checksums (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                algorithm TEXT,
+                digest TEXT,
+                expected TEXT,
+                expected_algorithm TEXT,
+                expected_source TEXT,
+                status TEXT NOT NULL,
+                package TEXT,
+                device_id TEXT,
+                seconds REAL,
+                verified_at REAL NOT NULL,
+                error TEXT
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS checksums_status ON checksums (status)")
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._queues: Dict[int, queue.Queue] = {}
+        self._workers: List[threading.Thread] = []
+        self._closed = False
+        self._db_closed = False
+        self._pending = set()
+        self._intake: queue.Queue = queue.Queue()
+        self._intake_thread: Optional[threading.Thread] = None
+        self._recent = deque(maxlen=10000)
+        self.stats = {"files": 0, "bytes": 0, "hash_seconds": 0.0, "ok": 0, "mismatch": 0,
+                      "hashed": 0, "missing": 0, "errors": 0, "skipped": 0, "packages": 0}
+
+    # Pool and per-disk queues
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Checksum verifier is closed")
+            if self._pool is None:
+                # forkserver: never fork the threaded API process itself
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(method))
+            return self._pool
+
+    def _disk_queue(self, device: int) -> queue.Queue:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Checksum verifier is closed")
+            if device not in self._queues:
+                self._queues[device] = queue.Queue()
+                for i in range(self.per_disk):
+                    worker = threading.Thread(
+                        target=self._disk_worker,
+                        args=(self._queues[device],),
+                        name=f"checksum-disk-{device}-{i}",
+                        daemon=True
+                    )
+                    worker.start()
+                    self._workers.append(worker)
+            return self._queues[device]
+
+    def _disk_worker(self, jobs: queue.Queue) -> None:
+        while True:
+            job = jobs.get()
+            # None is the stop sentinel; jobs still queued at close are dropped
+            if job is None or self._closed:
+                return
+            try:
+                self._verify(job)
+            except Exception as e:
+                self._record(job, None, status="error", error=str(e))
+            finally:
+                with self._lock:
+                    self._pending.discard(job["path"])
+
+    # Submission
+    def submit(self, paths: Iterable[str], expected: Optional[Dict[str, Tuple[str, str, str]]] = None,
+               package: Optional[str] = None, device_id: Optional[str] = None, force: bool = False) -> Dict:
+        """Queue files for hashing; expected maps path to (algorithm, hex, source)"""
+        expected = expected or {}
+        result = {"queued": 0, "missing": 0, "already_queued": 0}
+        for path in paths:
+            path = os.path.abspath(path)
+            job = {"path": path, "expected": expected.get(path), "package": package,
+                   "device_id": device_id, "force": force}
+            try:
+                st = os.stat(path)
+            except OSError:
+                self._record(job, None, status="missing")
+                result["missing"] += 1
+                continue
+            with self._lock:
+                if path in self._pending:
+                    result["already_queued"] += 1
+                    continue
+                self._pending.add(path)
+            self._disk_queue(st.st_dev).put(job)
+            result["queued"] += 1
+        return result
+
+    def is_pending(self, path: str) -> bool:
+        """True while path is queued or being hashed"""
+        with self._lock:
+            return os.path.abspath(path) in self._pending
+
+    def package_files(self, package: Dict) -> List[str]:
+        """Files of a finished package, from the resolver or by listing its folder"""
+        if self.resolver is not None and package.get("device_id"):
+            try:
+                return self.resolver(package)
+            except Exception as e:
+                logger.warning("Could not resolve files of %s: %s", package.get("name"), e,
+                               extra={"package": package.get("name"), "path": package.get("save_to")})
+        try:
+            return [
+                entry.path for entry in os.scandir(package["save_to"])
+                if entry.is_file() and not entry.name.lower().endswith(SKIP_SUFFIXES)
+            ]
+        except (OSError, KeyError, TypeError):
+            return []
+
+    def submit_package(self, package: Dict, expected: Optional[Dict] = None, force: bool = False) -> Dict:
+        """Queue every file of a package, with expected values from its checksum files"""
+        files = [f for f in self.package_files(package) if not f.lower().endswith(SKIP_SUFFIXES)]
+        found = find_expected({os.path.dirname(os.path.abspath(f)) for f in files})
+        found.update(expected or {})
+        with self._lock:
+            self.stats["packages"] += 1
+        return {
+            "files": len(files),
+            **self.submit(files, found, package.get("name"), package.get("device_id"), force)
+        }
+
+    def on_event(self, event: Dict) -> None:
+        """Event bus listener: queue finished packages (resolved off the publisher's thread)"""
+        if event["type"] != PACKAGE_FINISHED:
+            return
+        self._intake.put(event["data"])
+        with self._lock:
+            if self._intake_thread is None:
+                self._intake_thread = threading.Thread(target=self._intake_loop, name="checksum-intake", daemon=True)
+                self._intake_thread.start()
+
+    def _intake_loop(self) -> None:
+        while True:
+            package = self._intake.get()
+            if package is None or self._closed:
+                return
+            try:
+                self.submit_package(package)
+            except Exception as e:
+                logger.error("Checksum intake failed for %s: %s", package.get("name"), e,
+                             extra={"package": package.get("name"), "path": package.get("save_to")})
+
+    # Verification
+    def _previous(self, path: str) -> Optional[Tuple]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT size, mtime_ns, algorithm, expected, status FROM checksums WHERE path = ?", (path,)
+            ).fetchone()
+
+    def _verify(self, job: Dict) -> None:
+        path = job["path"]
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._record(job, None, status="missing")
+            return
+        expected = job["expected"]
+        if expected is None:
+            # Keep an expected value recorded earlier for the same file
+            stored = self._expected_of(path)
+            expected = stored if stored and stored[1] else None
+        previous = self._previous(path)
+        if not job["force"] and previous is not None and previous[:4] == (
+            st.st_size, st.st_mtime_ns, self.algorithm, expected[1] if expected else None
+        ) and previous[4] in ("ok", "mismatch", "hashed"):
+            with self._lock:
+                self.stats["skipped"] += 1
+            return
+
+        algorithms = {self.algorithm}
+        if expected:
+            algorithms.add(expected[0])
+        result = self._get_pool().submit(hash_file, path, tuple(sorted(algorithms))).result()
+
+        if expected is None:
+            status = "hashed"
+        else:
+            status = "ok" if result["digests"].get(expected[0]) == expected[1] else "mismatch"
+        self._record({**job, "expected": expected}, result, status=status, st=st)
+
+    def _expected_of(self, path: str) -> Optional[Tuple[str, str, str]]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT expected_algorithm, expected, expected_source FROM checksums WHERE path = ?", (path,)
+            ).fetchone()
+
+    def _record(self, job: Dict, result: Optional[Dict], status: str,
+                st: Optional[os.stat_result] = None, error: Optional[str] = None) -> None:
+        expected = job.get("expected") or (None, None, None)
+        row = (
+            job["path"],
+            st.st_size if st else None,
+            st.st_mtime_ns if st else None,
+            self.algorithm if result else None,
+            result["digests"].get(self.algorithm) if result else None,
+            expected[1],
+            expected[0],
+            expected[2],
+            status,
+            job.get("package"),
+            job.get("device_id"),
+            round(result["seconds"], 3) if result else None,
+            time.time(),
+            error
+        )
+        with self._lock:
+            if self._db_closed:
+                return
+            self._db.execute(
+                """INSERT OR REPLACE INTO checksums (path, size, mtime_ns, algorithm, digest, expected,
+                   expected_algorithm, expected_source, status, package, device_id, seconds, verified_at, error)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                row
+            )
+            self._db.commit()
+            self.stats["errors" if status == "error" else status] += 1
+            if result:
+                self.stats["files"] += 1
+                self.stats["bytes"] += result["size"]
+                self.stats["hash_seconds"] += result["seconds"]
+                self._recent.append((time.time(), result["size"]))
+        if status == "mismatch":
+            logger.error("Checksum mismatch: %s (expected %s %s)", job["path"], expected[0], expected[1],
+                         extra={"package": job.get("package"), "path": job["path"]})
+
+    # Reporting
+    def results(self, status: Optional[str] = None, package: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        query = "SELECT * FROM checksums WHERE (? IS NULL OR status = ?) AND (? IS NULL OR package = ?) " \
+                "ORDER BY verified_at DESC LIMIT ?"
+        with self._lock:
+            cursor = self._db.execute(query, (status, status, package, package, limit))
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def metrics(self, download_bps: Optional[float] = None, window: float = 60.0) -> Dict:
+        """Hashing throughput next to the fleet's download speed"""
+        now = time.time()
+        with self._lock:
+            stats = dict(self.stats)
+            recent = sum(size for at, size in self._recent if now - at <= window)
+            queued = len(self._pending)
+            disks = len(self._queues)
+        per_worker = stats["bytes"] / stats["hash_seconds"] if stats["hash_seconds"] else None
+        # Concurrency is bounded by both the pool and the per-disk limit
+        capacity = per_worker * min(self.workers, max(disks, 1) * self.per_disk) if per_worker else None
+        return {
+            **stats,
+            "hash_seconds": round(stats["hash_seconds"], 1),
+            "queued_files": queued,
+            "workers": self.workers,
+            "per_disk": self.per_disk,
+            "algorithm": self.algorithm,
+            "per_worker_bps": round(per_worker) if per_worker else None,
+            "capacity_bps": round(capacity) if capacity else None,
+            "recent_bps": round(recent / window),
+            "download_bps": download_bps,
+            "keeping_up": None if capacity is None or download_bps is None else capacity >= download_bps
+        }
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the disk workers and the pool, then close the database"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            queues = list(self._queues.values())
+            workers = list(self._workers)
+            pool, self._pool = self._pool, None
+        for jobs in queues:
+            for _ in range(self.per_disk):
+                jobs.put(None)
+        self._intake.put(None)
+        if pool is not None:
+            # Cancels queued hashes; workers waiting on them wake up with an error
+            pool.shutdown(wait=False, cancel_futures=True)
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.join(max(deadline - time.monotonic(), 0))
+        with self._lock:
+            self._db_closed = True
+            self._db.close()
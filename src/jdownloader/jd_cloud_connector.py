@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 """MyJDownloader Cloud Connection and Verification Module"""
+import contextlib
 import hashlib
 import hmac
 import time
@@ -9,6 +10,19 @@ import subprocess
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
+try:
+    from src.utils.rate_limiter import account_limiter
+    from src.utils.tracing import run, span
+    from .jd_events import JD_STARTED, JD_STOPPING, JD_STOPPED
+except ImportError:
+    # Run as a standalone script: no shared rate limit, tracing or event bus
+    account_limiter = None
+    run = subprocess.run
+    JD_STARTED, JD_STOPPING, JD_STOPPED = "jd.started", "jd.stopping", "jd.stopped"
+
+    def span(name, **attrs):
+        return contextlib.nullcontext()
+
 
 class MyJDownloaderAPI:
     """Client for MyJDownloader API"""
@@ -65,12 +79,15 @@ class MyJDownloaderAPI:
                 'Content-Type': 'application/x-www-form-urlencoded'
             }
             
-            response = requests.get(
-                f"{self.API_URL}/my/connect",
-                params=query_params,
-                headers=headers,
-                timeout=10
-            )
+            with span("myjdapi", path="/my/connect"):
+                if account_limiter is not None:
+                    account_limiter.acquire(self.email)
+                response = requests.get(
+                    f"{self.API_URL}/my/connect",
+                    params=query_params,
+                    headers=headers,
+                    timeout=10
+                )
             
             if response.status_code != 200:
                 return False, f"Connection failed with status {response.status_code}: {response.text}"
@@ -114,11 +131,14 @@ class MyJDownloaderAPI:
             query_params["signature"] = signature
             
             # Make request
-            response = requests.post(
-                f"{self.API_URL}/my/listdevices",
-                params=query_params,
-                timeout=10
-            )
+            with span("myjdapi", path="/my/listdevices"):
+                if account_limiter is not None:
+                    account_limiter.acquire(self.email)
+                response = requests.post(
+                    f"{self.API_URL}/my/listdevices",
+                    params=query_params,
+                    timeout=10
+                )
             
             if response.status_code != 200:
                 return False, [], f"List devices failed with status {response.status_code}"
@@ -193,14 +213,20 @@ class MyJDownloaderAPI:
 class JDownloaderService:
     """Manage JDownloader service"""
     
-    def __init__(self, jd_home: str = "/opt/jd2"):
+    def __init__(self, jd_home: str = "/opt/jd2", events=None):
         self.jd_home = Path(jd_home)
         self.jar_file = self.jd_home / "JDownloader.jar"
+        self.events = events
+    
+    def _publish(self, event_type: str, data: Dict) -> None:
+        """Publish a lifecycle event if an event bus is attached"""
+        if self.events is not None:
+            self.events.publish(event_type, data)
     
     def is_running(self) -> Tuple[bool, int]:
         """Check if JDownloader is running"""
         try:
-            result = subprocess.run(
+            result = run(
                 ["/usr/bin/pgrep", "-f", "JDownloader.jar"],
                 capture_output=True,
                 text=True
@@ -226,19 +252,21 @@ class JDownloaderService:
         
         try:
             # Start JDownloader in background
-            subprocess.Popen(
-                ["/usr/bin/java", "-Djava.awt.headless=true", "-jar", str(self.jar_file), "-norestart"],
-                cwd=str(self.jd_home),
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                start_new_session=True
-            )
+            with span("subprocess", argv="/usr/bin/java -jar JDownloader.jar"):
+                subprocess.Popen(
+                    ["/usr/bin/java", "-Djava.awt.headless=true", "-jar", str(self.jar_file), "-norestart"],
+                    cwd=str(self.jd_home),
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    start_new_session=True
+                )
             
             # Wait a bit and verify
             time.sleep(2)
             is_running, pid = self.is_running()
             
             if is_running:
+                self._publish(JD_STARTED, {"pid": pid, "source": "service"})
                 return True, f"JDownloader started successfully (PID: {pid})"
             else:
                 return False, "JDownloader failed to start"
@@ -254,16 +282,20 @@ class JDownloaderService:
             return True, "JDownloader is not running"
         
         try:
-            subprocess.run(["/usr/bin/kill", str(pid)], check=True)
+            # Announce first so the process watcher does not report a crash
+            self._publish(JD_STOPPING, {"pid": pid})
+            run(["/usr/bin/kill", str(pid)], check=True)
             time.sleep(1)
             
             # Verify stopped
             is_running, _ = self.is_running()
             if not is_running:
+                self._publish(JD_STOPPED, {"pid": pid, "forced": False})
                 return True, f"JDownloader stopped (PID: {pid})"
             else:
                 # Force kill if still running
-                subprocess.run(["/usr/bin/kill", "-9", str(pid)], check=True)
+                run(["/usr/bin/kill", "-9", str(pid)], check=True)
+                self._publish(JD_STOPPED, {"pid": pid, "forced": True})
                 return True, f"JDownloader force stopped (PID: {pid})"
                 
         except Exception as e:
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Shared MyJDownloader cloud session for background controller components"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import myjdapi
+
+from src.utils.rate_limiter import account_limiter
+from src.utils.tracing import span
+from .jd_events import CLOUD_CONNECTED, CLOUD_DISCONNECTED
+
+
+APP_KEY = "jd2controller"
+
+
+class RateLimitedMyjdapi(myjdapi.Myjdapi):
+    """myjdapi client whose cloud calls pass through the per-account rate limiter
+
+    Direct (LAN) device connections are not limited; they never reach
+    the MyJDownloader servers.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.account = ""
+
+    def connect(self, email, password):
+        self.account = email
+        return super().connect(email, password)
+
+    def request_api(self, path, http_method="GET", params=None, action=None, api=None):
+        with span("myjdapi", path=action or path, direct=api is not None) as current:
+            if api is None:
+                waited = account_limiter.acquire(self.account)
+                if current is not None and waited:
+                    current.attrs["wait_ms"] = round(waited * 1000, 1)
+            return super().request_api(path, http_method, params, action, api)
+
+
+class CloudSession:
+    """Lazily connected, reusable myjdapi session
+
+    Background components (scheduler, dispatcher, pollers) share one session
+    instead of logging in to MyJDownloader on every cycle. The lock only
+    guards the cached client, device list and handles; upstream calls (and
+    their rate limiter waits) run outside it, so a background poll queued
+    on the token bucket never holds up an interactive request.
+    """
+
+    def __init__(self, credentials_provider: Callable[[], Tuple], device_ttl: float = 30.0,
+                 events=None):
+        self._credentials_provider = credentials_provider
+        self.device_ttl = device_ttl
+        self.events = events
+        self._api: Optional[myjdapi.Myjdapi] = None
+        self._lock = threading.Lock()
+        # Serializes logins only, so concurrent callers share one connect()
+        self._connect_lock = threading.Lock()
+        self._devices_checked = 0.0
+        self._devices_snapshot: List[Dict] = []
+        self.devices_version = 0
+        self.email: Optional[str] = None
+        # Jddevice handles by device id; building one costs an upstream
+        # getDirectConnectionInfos call, so they live until the list changes
+        self._handles: Dict[str, myjdapi.myjdapi.Jddevice] = {}
+        self._handles_api: Optional[myjdapi.Myjdapi] = None
+
+    def _current(self) -> Optional[myjdapi.Myjdapi]:
+        with self._lock:
+            api = self._api
+        return api if api is not None and api.is_connected() else None
+
+    def get_api(self) -> myjdapi.Myjdapi:
+        """Return a connected myjdapi client, logging in if needed"""
+        jd_api = self._current()
+        if jd_api is not None:
+            return jd_api
+        with self._connect_lock:
+            # Another caller may have logged in while we waited
+            jd_api = self._current()
+            if jd_api is not None:
+                return jd_api
+
+            email, password, _ = self._credentials_provider()
+            if not email or not password:
+                raise myjdapi.exception.MYJDConnectionException(
+                    "Email and password must be configured in .env or JDownloader config"
+                )
+
+            jd_api = RateLimitedMyjdapi()
+            jd_api.set_app_key(APP_KEY)
+            jd_api.connect(email, password)
+            with self._lock:
+                self._api = jd_api
+                self._devices_checked = time.time()
+                self.email = email
+        if self.events is not None:
+            self.events.publish(CLOUD_CONNECTED, {
+                "email": email,
+                "device_count": len(jd_api.list_devices() or [])
+            })
+        return jd_api
+
+    def list_devices(self, refresh: bool = False) -> List[Dict]:
+        """List cloud devices, refreshing the list once it is older than device_ttl"""
+        jd_api = self.get_api()
+        with self._lock:
+            stale = refresh or time.time() - self._devices_checked > self.device_ttl
+            if stale:
+                # Claim the refresh so concurrent callers use the current list
+                self._devices_checked = time.time()
+        if stale:
+            try:
+                jd_api.update_devices()
+            except myjdapi.exception.MYJDException:
+                # Session expired upstream: log in again once
+                self.invalidate()
+                jd_api = self.get_api()
+        devices = jd_api.list_devices() or []
+        with self._lock:
+            if devices != self._devices_snapshot:
+                # Bumped only when the inventory changes, for cheap ETags
+                self._devices_snapshot = list(devices)
+                self.devices_version += 1
+                self._handles = {}
+        return devices
+
+    def cached_devices(self) -> List[Dict]:
+        """Last known device list, without touching the network"""
+        return list(self._devices_snapshot) if self.connected else []
+
+    def _handle(self, device_id: str) -> myjdapi.myjdapi.Jddevice:
+        """Cached handle for a listed device, built outside the lock on a miss"""
+        jd_api = self.get_api()
+        with self._lock:
+            if self._handles_api is not jd_api:
+                self._handles = {}
+                self._handles_api = jd_api
+            handle = self._handles.get(device_id)
+        if handle is None:
+            handle = jd_api.get_device(device_id=device_id)
+            with self._lock:
+                if self._handles_api is jd_api:
+                    handle = self._handles.setdefault(device_id, handle)
+        return handle
+
+    def get_devices(self, refresh: bool = False) -> List[myjdapi.myjdapi.Jddevice]:
+        """Return a device handle for every device on the account"""
+        return [self._handle(d["id"]) for d in self.list_devices(refresh=refresh)]
+
+    def get_device(self, device_id: str = None, device_name: str = None) -> myjdapi.myjdapi.Jddevice:
+        """Return a device handle by id or name (first device if neither given)"""
+        for d in self.list_devices():
+            if (device_id is None or d["id"] == device_id) and \
+                    (device_name is None or d.get("name") == device_name):
+                return self._handle(d["id"])
+        return self.get_api().get_device(device_name=device_name, device_id=device_id)
+
+    def invalidate(self) -> None:
+        """Drop the current session; the next call logs in again"""
+        with self._lock:
+            dropped, email = self._api, self.email
+            self._api = None
+            self._handles = {}
+            self._devices_checked = 0.0
+            self.email = None
+        if dropped is not None and self.events is not None:
+            self.events.publish(CLOUD_DISCONNECTED, {"email": email})
+
+    @property
+    def connected(self) -> bool:
+        return self._current() is not None
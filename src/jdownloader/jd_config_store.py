@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""Indexed access to every JDownloader cfg/*.json file with atomic commits"""
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class ConfigConflictError(Exception):
+    """Raised when a batch cannot be committed"""
+
+
+class JDConfigStore:
+    """Lazy (file, key) index over JD's cfg directory
+
+    Files are parsed on first access and re-parsed only when their
+    inode/size/mtime changes. Batched writes touch only files whose content
+    changes and are committed all-or-nothing.
+    """
+
+    def __init__(self, jd_home: str):
+        self.config_dir = Path(jd_home) / "cfg"
+        self._cache: Dict[str, Tuple[Tuple[int, int, int], Dict]] = {}
+        self._lock = threading.RLock()
+        self.stats = {"parses": 0, "cache_hits": 0, "commits": 0, "files_written": 0}
+
+    @staticmethod
+    def file_name(name: str) -> str:
+        """Normalize 'org.jdownloader.X' or 'org.jdownloader.X.json' to a file name"""
+        name = name.strip()
+        if not name.endswith(".json"):
+            name += ".json"
+        if "/" in name or "\\" in name or name.startswith("."):
+            raise ValueError(f"Invalid config file name: {name}")
+        return name
+
+    def _path(self, name: str) -> Path:
+        return self.config_dir / self.file_name(name)
+
+    @staticmethod
+    def _stat(path: Path) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def files(self) -> List[str]:
+        """List config files without parsing them"""
+        if not self.config_dir.exists():
+            return []
+        with os.scandir(self.config_dir) as entries:
+            return sorted(e.name for e in entries if e.is_file() and e.name.endswith(".json"))
+
+    def load(self, name: str) -> Dict:
+        """Return a file's parsed content, using the cache while the file is unchanged"""
+        path = self._path(name)
+        with self._lock:
+            version = self._stat(path)
+            if version is None:
+                return {}
+            cached = self._cache.get(path.name)
+            if cached and cached[0] == version:
+                self.stats["cache_hits"] += 1
+                return cached[1]
+
+            with open(path, "r") as f:
+                data = json.load(f)
+            self.stats["parses"] += 1
+            self._cache[path.name] = (version, data)
+            return data
+
+    @staticmethod
+    def _resolve_key(data: Dict, key: str) -> str:
+        """JD stores keys lowercased; accept any case"""
+        if key in data:
+            return key
+        lowered = key.lower()
+        for existing in data:
+            if existing.lower() == lowered:
+                return existing
+        return lowered
+
+    def get(self, name: str, key: str, default: Any = None) -> Any:
+        data = self.load(name)
+        if not isinstance(data, dict):
+            return default
+        return data.get(self._resolve_key(data, key), default)
+
+    def get_many(self, items: Iterable[Tuple[str, str]]) -> List[Dict]:
+        """Batched reads; each file is parsed at most once"""
+        results = []
+        for name, key in items:
+            try:
+                data = self.load(name)
+                resolved = self._resolve_key(data, key) if isinstance(data, dict) else key
+                found = isinstance(data, dict) and resolved in data
+                results.append({
+                    "file": self.file_name(name),
+                    "key": resolved,
+                    "found": found,
+                    "value": data.get(resolved) if found else None
+                })
+            except Exception as e:
+                results.append({"file": name, "key": key, "found": False, "error": str(e)})
+        return results
+
+    def search(self, pattern: str, limit: int = 500) -> List[Dict]:
+        """Find (file, key) pairs whose file or key matches a regex"""
+        regex = re.compile(pattern, re.IGNORECASE)
+        matches = []
+        for name in self.files():
+            try:
+                data = self.load(name)
+            except Exception:
+                continue
+            if not isinstance(data, dict):
+                continue
+            file_matches = bool(regex.search(name))
+            for key, value in data.items():
+                if file_matches or regex.search(key):
+                    matches.append({"file": name, "key": key, "value": value})
+                    if len(matches) >= limit:
+                        return matches
+        return matches
+
+    def commit(self, writes: Iterable[Tuple[str, str, Any]]) -> Dict:
+        """Apply (file, key, value) writes atomically across files
+
+        New contents go to temp files first; only then are they renamed into
+        place. If any rename fails, already replaced files are restored.
+        """
+        with self._lock:
+            staged: Dict[str, Dict] = {}
+            for name, key, value in writes:
+                file_name = self.file_name(name)
+                if file_name not in staged:
+                    current = self.load(file_name)
+                    if not isinstance(current, dict):
+                        raise ConfigConflictError(f"{file_name} is not a JSON object")
+                    staged[file_name] = dict(current)
+                data = staged[file_name]
+                data[self._resolve_key(data, key)] = value
+
+            changed = {
+                name: data for name, data in staged.items()
+                if data != self.load(name)
+            }
+            if not changed:
+                return {"changed_files": [], "unchanged_files": sorted(staged)}
+
+            self.config_dir.mkdir(parents=True, exist_ok=True)
+            temps: Dict[str, Path] = {}
+            originals: Dict[str, Optional[bytes]] = {}
+            replaced: List[str] = []
+            try:
+                for name, data in changed.items():
+                    path = self.config_dir / name
+                    originals[name] = path.read_bytes() if path.exists() else None
+                    tmp = path.with_name(f".{name}.tmp")
+                    with open(tmp, "w") as f:
+                        json.dump(data, f, indent=2)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    temps[name] = tmp
+
+                for name, tmp in temps.items():
+                    os.replace(tmp, self.config_dir / name)
+                    replaced.append(name)
+            except Exception as e:
+                for name in replaced:
+                    path = self.config_dir / name
+                    if originals[name] is None:
+                        path.unlink(missing_ok=True)
+                    else:
+                        path.write_bytes(originals[name])
+                for tmp in temps.values():
+                    tmp.unlink(missing_ok=True)
+                for name in changed:
+                    self._cache.pop(name, None)
+                raise ConfigConflictError(f"Commit rolled back: {str(e)}")
+
+            for name, data in changed.items():
+                version = self._stat(self.config_dir / name)
+                self._cache[name] = (version, data)
+            self.stats["commits"] += 1
+            self.stats["files_written"] += len(changed)
+            return {
+                "changed_files": sorted(changed),
+                "unchanged_files": sorted(set(staged) - set(changed))
+            }
+
+    def relocate(self, jd_home: str) -> None:
+        """Point the store at another JD installation"""
+        with self._lock:
+            self.config_dir = Path(jd_home) / "cfg"
+            self._cache.clear()
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Drop cached parses (all files, or one)"""
+        with self._lock:
+            if name is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(self.file_name(name), None)
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""Throughput-aware dispatcher that balances new links across JD devices"""
+import itertools
+import logging
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_QUERY = {
+    "bytesLoaded": True,
+    "bytesTotal": True,
+    "finished": True,
+    "hosts": True,
+    "running": True,
+    "saveTo": True,
+    "speed": True,
+    "status": True,
+    "maxResults": -1,
+    "startAt": 0
+}
+
+
+def link_host(url: str) -> str:
+    """Return the hoster of a link without a leading www."""
+    host = urlparse(url.strip()).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def collect_device_metrics(device) -> Dict:
+    """Query a device for the load figures the dispatch policies use"""
+    packages = device.downloads.query_packages([PACKAGE_QUERY]) or []
+
+    remaining = 0
+    active = 0
+    queued = []
+    hosts = set()
+    for package in packages:
+        if package.get("finished"):
+            continue
+        total = package.get("bytesTotal", 0) or 0
+        loaded = package.get("bytesLoaded", 0) or 0
+        remaining += max(total - loaded, 0)
+        hosts.update(package.get("hosts") or [])
+        if package.get("running"):
+            active += 1
+        elif loaded == 0:
+            queued.append(package)
+
+    free_bytes = None
+    try:
+        storages = device.system.get_storage_info() or []
+        free = [s.get("free") for s in storages if s.get("free") is not None]
+        if free:
+            free_bytes = max(free)
+    except Exception:
+        pass
+
+    try:
+        speed = device.downloadcontroller.get_speed_in_bytes() or 0
+    except Exception:
+        speed = sum(p.get("speed", 0) or 0 for p in packages)
+
+    return {
+        "device_id": device.device_id,
+        "name": device.name,
+        "speed_bps": speed,
+        "remaining_bytes": remaining,
+        "active_downloads": active,
+        "queued_packages": queued,
+        "free_bytes": free_bytes,
+        "hosts": sorted(hosts),
+        "collected_at": time.time()
+    }
+
+
+class DispatchPolicy:
+    """Base class for device selection policies"""
+
+    name = "base"
+
+    def select(self, metrics: List[Dict], links: List[str]) -> Dict:
+        raise NotImplementedError
+
+
+class LeastRemainingBytesPolicy(DispatchPolicy):
+    """Pick the device that will drain its queue soonest
+
+    Devices are ranked by estimated seconds to drain: remaining bytes over
+    current speed, so a fast box with a longer queue can still win. Idle
+    devices are estimated at the fleet's mean speed (or NOMINAL_SPEED_BPS
+    when nothing is downloading), keeping every score in the same unit.
+    """
+
+    name = "least-remaining-bytes"
+
+    # Assumed speed of an idle device when no device reports one (10 MB/s)
+    NOMINAL_SPEED_BPS = 10 * 1024 * 1024
+
+    def select(self, metrics: List[Dict], links: List[str]) -> Dict:
+        speeds = [m["speed_bps"] for m in metrics if m["speed_bps"]]
+        nominal = sum(speeds) / len(speeds) if speeds else self.NOMINAL_SPEED_BPS
+
+        def drain_score(m: Dict) -> Tuple:
+            return (m["remaining_bytes"] / (m["speed_bps"] or nominal), m["active_downloads"])
+        return min(metrics, key=drain_score)
+
+
+class RoundRobinPolicy(DispatchPolicy):
+    """Cycle through devices in name order"""
+
+    name = "round-robin"
+
+    def __init__(self):
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def select(self, metrics: List[Dict], links: List[str]) -> Dict:
+        ordered = sorted(metrics, key=lambda m: m["name"])
+        with self._lock:
+            index = next(self._counter)
+        return ordered[index % len(ordered)]
+
+
+class HostAffinityPolicy(DispatchPolicy):
+    """Keep each hoster on one device so accounts and quotas stay together
+
+    Explicit host -> device name pins win; otherwise a device already
+    downloading from the host is preferred, then a stable hash of the host.
+    """
+
+    name = "host-affinity"
+
+    def __init__(self, pins: Optional[Dict[str, str]] = None):
+        self.pins = {k.lower(): v for k, v in (pins or {}).items()}
+        self.fallback = LeastRemainingBytesPolicy()
+
+    def select(self, metrics: List[Dict], links: List[str]) -> Dict:
+        hosts = [link_host(link) for link in links if link_host(link)]
+        if not hosts:
+            return self.fallback.select(metrics, links)
+        host = max(set(hosts), key=hosts.count)
+
+        pinned = self.pins.get(host)
+        if pinned:
+            for m in metrics:
+                if m["name"].lower() == pinned.lower() or m["device_id"] == pinned:
+                    return m
+
+        busy = [m for m in metrics if host in m["hosts"]]
+        if busy:
+            return self.fallback.select(busy, links)
+
+        ordered = sorted(metrics, key=lambda m: m["device_id"])
+        return ordered[zlib.crc32(host.encode("utf-8")) % len(ordered)]
+
+
+def parse_host_pins(value: str) -> Dict[str, str]:
+    """Parse 'host=device,host=device' into a dict"""
+    pins = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            host, device = item.split("=", 1)
+            pins[host.strip().lower()] = device.strip()
+    return pins
+
+
+class DispatchRefused(RuntimeError):
+    """Every eligible device refused the package (admission check)"""
+
+
+class LinkDispatcher:
+    """Route new packages to the least loaded device and rebalance queues
+
+    admission_check(metrics, links) may return a reason to refuse a device
+    (e.g. disk admission on the local node); the policy then picks among
+    the remaining devices.
+    """
+
+    def __init__(self, session, policy: str = "least-remaining-bytes",
+                 host_pins: Optional[Dict[str, str]] = None,
+                 min_free_bytes: int = 0, metrics_ttl: float = 15.0,
+                 admission_check: Optional[Callable[[Dict, List[str]], Optional[str]]] = None,
+                 shared_storage: bool = False):
+        self.session = session
+        # Devices see the same download paths (shared mount), so moved
+        # packages may keep their folder
+        self.shared_storage = shared_storage
+        self.admission_check = admission_check
+        self.min_free_bytes = min_free_bytes
+        self.metrics_ttl = metrics_ttl
+        self.policies: Dict[str, DispatchPolicy] = {}
+        self.register_policy(LeastRemainingBytesPolicy())
+        self.register_policy(RoundRobinPolicy())
+        self.register_policy(HostAffinityPolicy(host_pins))
+        if policy not in self.policies:
+            raise ValueError(f"Unknown dispatch policy: {policy}")
+        self.default_policy = policy
+        self._metrics: List[Dict] = []
+        self._metrics_at = 0.0
+        self._lock = threading.Lock()
+
+    def register_policy(self, policy: DispatchPolicy) -> None:
+        """Add or replace a selection policy"""
+        self.policies[policy.name] = policy
+
+    def invalidate_metrics(self) -> None:
+        """Force the next selection to collect fresh device metrics"""
+        self._metrics_at = 0.0
+
+    def collect_metrics(self, refresh: bool = False) -> List[Dict]:
+        """Gather live metrics from every device (cached for metrics_ttl)"""
+        with self._lock:
+            if not refresh and self._metrics and time.time() - self._metrics_at < self.metrics_ttl:
+                return self._metrics
+
+            metrics = []
+            for device in self.session.get_devices(refresh=refresh):
+                try:
+                    m = collect_device_metrics(device)
+                    m["device"] = device
+                    metrics.append(m)
+                except Exception as e:
+                    logger.warning("Skipping device %s: %s", device.name, e, extra={"device": device.name})
+            self._metrics = metrics
+            self._metrics_at = time.time()
+            return metrics
+
+    def select_device(self, links: List[str], policy: Optional[str] = None) -> Dict:
+        """Pick the target device for a package"""
+        name = policy or self.default_policy
+        if name not in self.policies:
+            raise ValueError(f"Unknown dispatch policy: {name}")
+
+        metrics = self.collect_metrics()
+        eligible = [
+            m for m in metrics
+            if m["free_bytes"] is None or m["free_bytes"] >= self.min_free_bytes
+        ]
+        if not eligible:
+            raise RuntimeError("No eligible JDownloader device available")
+        while True:
+            target = self.policies[name].select(eligible, links)
+            reason = self.admission_check(target, links) if self.admission_check else None
+            if reason is None:
+                return target
+            eligible = [m for m in eligible if m is not target]
+            if not eligible:
+                raise DispatchRefused(f"{target['name']}: {reason}")
+
+    def dispatch(self, links: List[str], package_name: Optional[str] = None,
+                 destination_folder: Optional[str] = None, autostart: bool = True,
+                 policy: Optional[str] = None) -> Dict:
+        """Send a package of links to the selected device"""
+        target = self.select_device(links, policy)
+        target["device"].linkgrabber.add_links([{
+            "autostart": autostart,
+            "links": "\n".join(links),
+            "packageName": package_name,
+            "destinationFolder": destination_folder,
+            "overwritePackagizerRules": False
+        }])
+        # Sizes are unknown until JD resolves the links: refresh before the next pick
+        self.invalidate_metrics()
+        return {
+            "device_id": target["device_id"],
+            "device_name": target["name"],
+            "policy": policy or self.default_policy,
+            "link_count": len(links)
+        }
+
+    def plan_rebalance(self, threshold: float = 0.5) -> Tuple[float, List[Dict], List[Dict]]:
+        """Plan moves of queued, not-yet-started packages off overloaded devices
+
+        Imbalance is (max - min) / max of remaining bytes. Packages that have
+        loaded any bytes are never moved. Returns the imbalance, the moves
+        and the metrics snapshot they were planned from.
+        """
+        metrics = self.collect_metrics(refresh=True)
+        if len(metrics) < 2:
+            return 0.0, [], metrics
+
+        load = {m["device_id"]: m["remaining_bytes"] for m in metrics}
+        by_id = {m["device_id"]: m for m in metrics}
+
+        def imbalance() -> float:
+            high = max(load.values())
+            return (high - min(load.values())) / high if high else 0.0
+
+        initial = imbalance()
+        moves = []
+        if initial <= threshold:
+            return initial, moves, metrics
+
+        candidates = {
+            m["device_id"]: sorted(m["queued_packages"], key=lambda p: p.get("bytesTotal", 0) or 0)
+            for m in metrics
+        }
+        while imbalance() > threshold:
+            source = max(load, key=load.get)
+            target = min(load, key=load.get)
+            gap = load[source] - load[target]
+            queue = candidates[source]
+            # Largest package that still narrows the gap
+            movable = [p for p in queue if 0 < (p.get("bytesTotal", 0) or 0) < gap]
+            if not movable:
+                break
+            package = movable[-1]
+            size = package.get("bytesTotal", 0) or 0
+            queue.remove(package)
+            load[source] -= size
+            load[target] += size
+            moves.append({
+                "package_uuid": package.get("uuid"),
+                "package_name": package.get("name"),
+                "bytes": size,
+                "save_to": package.get("saveTo"),
+                "from_device": by_id[source]["name"],
+                "from_id": source,
+                "to_device": by_id[target]["name"],
+                "to_id": target
+            })
+        return initial, moves, metrics
+
+    def rebalance(self, threshold: float = 0.5, dry_run: bool = False) -> Dict:
+        """Move queued packages between devices when imbalance crosses threshold"""
+        initial, moves, metrics = self.plan_rebalance(threshold)
+        by_id = {m["device_id"]: m for m in metrics}
+        executed = []
+        errors = []
+
+        for move in moves if not dry_run else []:
+            source = by_id[move["from_id"]]["device"]
+            target = by_id[move["to_id"]]["device"]
+            try:
+                links = source.downloads.query_links([{
+                    "packageUUIDs": [move["package_uuid"]],
+                    "url": True,
+                    "bytesLoaded": True,
+                    "maxResults": -1,
+                    "startAt": 0
+                }]) or []
+                # Re-check: the package may have started since planning
+                if any((link.get("bytesLoaded", 0) or 0) > 0 for link in links):
+                    continue
+                urls = [link["url"] for link in links if link.get("url")]
+                if not urls:
+                    continue
+                target.linkgrabber.add_links([{
+                    "autostart": True,
+                    "links": "\n".join(urls),
+                    "packageName": move["package_name"],
+                    # saveTo is a path on the source host
+                    "destinationFolder": move["save_to"] if self.shared_storage else None,
+                    "overwritePackagizerRules": False
+                }])
+                source.downloads.remove_links([], [move["package_uuid"]])
+                executed.append(move)
+            except Exception as e:
+                errors.append(f"{move['package_name']}: {str(e)}")
+
+        return {
+            "imbalance": round(initial, 3),
+            "threshold": threshold,
+            "dry_run": dry_run,
+            "planned": moves,
+            "moved": executed,
+            "errors": errors
+        }
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""JDownloader lifecycle and download event sources for the event bus"""
+import time
+from typing import Dict, Optional, Set
+
+
+# Event types
+JD_STARTED = "jd.started"
+JD_STOPPING = "jd.stopping"
+JD_STOPPED = "jd.stopped"
+JD_CRASHED = "jd.crashed"
+CLOUD_CONNECTED = "cloud.connected"
+CLOUD_DISCONNECTED = "cloud.disconnected"
+PACKAGE_ADDED = "package.added"
+PACKAGE_FINISHED = "package.finished"
+PACKAGE_FAILED = "package.failed"
+
+# Substrings of JD package status texts that mean the package cannot finish
+FAILURE_MARKERS = ("error", "failed", "offline", "not found", "corrupt", "aborted")
+
+PACKAGE_QUERY = {
+    "bytesLoaded": True,
+    "bytesTotal": True,
+    "childCount": True,
+    "finished": True,
+    "hosts": True,
+    "saveTo": True,
+    "status": True,
+    "maxResults": -1,
+    "startAt": 0
+}
+
+
+class ProcessWatcher:
+    """Emit start/crash events for the local JD process
+
+    Stops requested through JDownloaderService publish jd.stopping and
+    jd.stopped; any other disappearance of the process is reported as a crash.
+    """
+
+    def __init__(self, service, events):
+        self.service = service
+        self.events = events
+        self.pid: Optional[int] = None
+        self._baseline = False
+        self._expected_exits: Set[int] = set()
+        self._announced: Set[int] = set()
+        events.subscribe(self._on_event)
+
+    def _on_event(self, event: Dict) -> None:
+        pid = event["data"].get("pid")
+        if event["type"] in (JD_STOPPING, JD_STOPPED) and pid:
+            self._expected_exits.add(pid)
+        elif event["type"] == JD_STARTED and pid:
+            self._announced.add(pid)
+
+    def check(self) -> None:
+        running, pid = self.service.is_running()
+        if not self._baseline:
+            # A JD already running when the controller starts is not news
+            self._baseline = True
+            self.pid = pid if running else None
+            return
+
+        if (running and pid != self.pid) or (not running and self.pid is not None):
+            # Stop events are dispatched asynchronously: let them reach
+            # _on_event before telling an expected exit from a crash
+            self.events.flush()
+
+        if running and pid != self.pid:
+            if self.pid is not None and self.pid not in self._expected_exits:
+                self.events.publish(JD_CRASHED, {"pid": self.pid, "replaced_by": pid})
+            self._expected_exits.discard(self.pid)
+            if pid not in self._announced:
+                self.events.publish(JD_STARTED, {"pid": pid, "source": "watcher"})
+            self.pid = pid
+        elif not running and self.pid is not None:
+            if self.pid not in self._expected_exits:
+                self.events.publish(JD_CRASHED, {"pid": self.pid})
+            self._expected_exits.discard(self.pid)
+            self._announced.discard(self.pid)
+            self.pid = None
+
+
+class PackagePoller:
+    """Diff each device's download list and emit package events"""
+
+    def __init__(self, events):
+        self.events = events
+        self._packages: Dict[str, Dict[int, Dict]] = {}
+
+    @staticmethod
+    def _state(package: Dict) -> str:
+        if package.get("finished"):
+            return "finished"
+        status = (package.get("status") or "").lower()
+        if any(marker in status for marker in FAILURE_MARKERS):
+            return "failed"
+        return "active"
+
+    def poll_device(self, device) -> int:
+        """Poll one device; returns the number of events emitted"""
+        packages = device.downloads.query_packages([PACKAGE_QUERY]) or []
+        previous = self._packages.get(device.device_id)
+        current = {}
+        emitted = 0
+
+        for package in packages:
+            uuid = package.get("uuid")
+            state = self._state(package)
+            current[uuid] = {"state": state}
+            # First poll of a device only records the baseline
+            if previous is None:
+                continue
+
+            data = {
+                "device_id": device.device_id,
+                "device_name": device.name,
+                "package_uuid": uuid,
+                "name": package.get("name"),
+                "bytes_total": package.get("bytesTotal"),
+                "save_to": package.get("saveTo"),
+                "status": package.get("status")
+            }
+            before = previous.get(uuid)
+            if before is None:
+                self.events.publish(PACKAGE_ADDED, data)
+                emitted += 1
+            if state != "active" and (before is None or before["state"] != state):
+                self.events.publish(PACKAGE_FINISHED if state == "finished" else PACKAGE_FAILED, data)
+                emitted += 1
+
+        self._packages[device.device_id] = current
+        return emitted
+
+    def poll(self, session) -> Dict:
+        result = {"devices": 0, "events": 0, "errors": [], "polled_at": time.time()}
+        for device in session.get_devices():
+            try:
+                result["events"] += self.poll_device(device)
+                result["devices"] += 1
+            except Exception as e:
+                result["errors"].append(f"{device.name}: {str(e)}")
+        return result
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Serialized start/stop/restart of the local JD process"""
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from .jd_events import JD_CRASHED, JD_STARTED
+
+
+# Lifecycle states
+STOPPED = "stopped"
+STARTING = "starting"
+RUNNING = "running"
+STOPPING = "stopping"
+UNKNOWN = "unknown"
+
+# Transitions a request may join instead of queueing its own: a start is
+# satisfied by any start or restart, stop and restart only by their own kind
+JOINS = {
+    "start": ("start", "restart"),
+    "stop": ("stop",),
+    "restart": ("restart",)
+}
+
+
+class JDLifecycle:
+    """State machine (stopped, starting, running, stopping) behind one asyncio.Lock
+
+    Every transition runs as its own task holding the lock, so start, stop
+    and restart never interleave (no second JVM, no killing the process
+    another call just started) and a disconnecting client cannot abort one
+    halfway. A request matching the transition in flight, or one already
+    queued for the lock, joins it and gets the same result instead of
+    paying for another JD cold start.
+    """
+
+    def __init__(self, service_factory: Callable, history: int = 100, restart_delay: float = 2.0):
+        self.service_factory = service_factory
+        self.restart_delay = restart_delay
+        self.state = UNKNOWN
+        self.pid: Optional[int] = None
+        self.since = time.time()
+        self._lock = asyncio.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Optional[Dict] = None
+        self._waiting: Dict[str, Dict] = {}
+        self.transitions = deque(maxlen=history)
+        self.durations: Dict[str, Dict] = {}
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Event loop that request_threadsafe() submits to"""
+        self._loop = loop
+
+    def _set(self, state: str, pid: Optional[int] = None) -> None:
+        if state != self.state:
+            self.state = state
+            self.since = time.time()
+        self.pid = pid
+
+    async def refresh(self) -> str:
+        """Re-read the process state unless a transition owns it"""
+        if self._inflight is None and not self._lock.locked():
+            running, pid = await asyncio.to_thread(self.service_factory().is_running)
+            if self._inflight is None:
+                self._set(RUNNING if running else STOPPED, pid if running else None)
+        return self.state
+
+    def on_event(self, event: Dict) -> None:
+        """Track crashes and outside starts seen by the process watcher
+
+        Events are published from worker threads; the state change is
+        applied on the attached event loop, where transitions own it.
+        """
+        if self._loop is None:
+            self._apply_event(event)
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._apply_event, event)
+        except RuntimeError:
+            # Loop already closed (shutdown)
+            pass
+
+    def _apply_event(self, event: Dict) -> None:
+        if self._inflight is not None:
+            return
+        if event["type"] == JD_CRASHED:
+            self._set(STOPPED)
+        elif event["type"] == JD_STARTED:
+            self._set(RUNNING, event["data"].get("pid"))
+
+    # Requests
+    async def request(self, action: str) -> Dict:
+        """Run (or join) a start, stop or restart; returns success, message, state and joined"""
+        if action not in JOINS:
+            raise ValueError(f"Unknown lifecycle action: {action} (use {', '.join(JOINS)})")
+        self._loop = asyncio.get_running_loop()
+        for pending in [self._inflight, *self._waiting.values()]:
+            if pending is not None and pending["action"] in JOINS[action]:
+                pending["joined"] += 1
+                result = await asyncio.shield(pending["future"])
+                return {**result, "joined": True}
+
+        transition = {"action": action, "future": self._loop.create_future(), "joined": 0,
+                      "requested_at": time.time()}
+        self._waiting[action] = transition
+        transition["task"] = asyncio.create_task(self._execute(transition))
+        result = await asyncio.shield(transition["future"])
+        return {**result, "joined": False}
+
+    def request_threadsafe(self, action: str, timeout: Optional[float] = None) -> Dict:
+        """request() from a worker thread (background jobs)"""
+        if self._loop is None:
+            raise RuntimeError("Lifecycle is not attached to an event loop")
+        return asyncio.run_coroutine_threadsafe(self.request(action), self._loop).result(timeout)
+
+    # Transitions
+    async def _execute(self, transition: Dict) -> None:
+        action = transition["action"]
+        try:
+            async with self._lock:
+                self._waiting.pop(action, None)
+                self._inflight = transition
+                try:
+                    result = await self._transition(action, transition)
+                except Exception as e:
+                    await self._reread()
+                    result = {"success": False, "message": f"Error during {action}: {str(e)}"}
+                finally:
+                    self._inflight = None
+                result.update(state=self.state, pid=self.pid)
+                self._record(transition, result)
+        except BaseException as e:
+            # Cancelled (shutdown): release everyone waiting on this transition
+            self._waiting.pop(action, None)
+            if not transition["future"].done():
+                transition["future"].set_result({"success": False, "message": f"{action} aborted: {e!r}",
+                                                 "state": self.state, "pid": self.pid})
+            raise
+        transition["future"].set_result(result)
+
+    async def _transition(self, action: str, transition: Dict) -> Dict:
+        service = self.service_factory()
+        transition["from"] = self.state
+        transition["started"] = time.monotonic()
+        stop_msg = None
+        if action in ("stop", "restart"):
+            self._set(STOPPING, self.pid)
+            success, stop_msg = await asyncio.to_thread(service.stop)
+            if action == "stop" or (not success and "not running" not in stop_msg):
+                await self._reread()
+                message = stop_msg if action == "stop" else f"Failed to stop: {stop_msg}"
+                return {"success": success, "message": message}
+            self._set(STOPPED)
+            await asyncio.sleep(self.restart_delay)
+        self._set(STARTING)
+        success, start_msg = await asyncio.to_thread(service.start)
+        await self._reread()
+        message = start_msg if stop_msg is None else f"Restart: {stop_msg} -> {start_msg}"
+        return {"success": success, "message": message}
+
+    async def _reread(self) -> None:
+        """Process state after a transition step (the caller holds the lock)"""
+        running, pid = await asyncio.to_thread(self.service_factory().is_running)
+        self._set(RUNNING if running else STOPPED, pid if running else None)
+
+    def _record(self, transition: Dict, result: Dict) -> None:
+        action = transition["action"]
+        duration_ms = round((time.monotonic() - transition.get("started", time.monotonic())) * 1000, 1)
+        queued_ms = round((time.time() - transition["requested_at"]) * 1000 - duration_ms, 1)
+        self.transitions.append({
+            "action": action,
+            "from": transition.get("from"),
+            "to": self.state,
+            "success": result["success"],
+            "message": result["message"],
+            "requested_at": transition["requested_at"],
+            "queued_ms": max(queued_ms, 0.0),
+            "duration_ms": duration_ms,
+            "joined": transition["joined"]
+        })
+        stats = self.durations.setdefault(action, {"count": 0, "failures": 0, "joined": 0, "total_ms": 0.0,
+                                                   "max_ms": 0.0, "last_ms": 0.0})
+        stats["count"] += 1
+        stats["failures"] += 0 if result["success"] else 1
+        stats["joined"] += transition["joined"]
+        stats["total_ms"] += duration_ms
+        stats["max_ms"] = max(stats["max_ms"], duration_ms)
+        stats["last_ms"] = duration_ms
+
+    def info(self, limit: int = 20) -> Dict:
+        inflight = self._inflight
+        recent: List[Dict] = list(self.transitions)[-limit:][::-1]
+        return {
+            "state": self.state,
+            "pid": self.pid,
+            "since": self.since,
+            "in_flight": None if inflight is None else {
+                "action": inflight["action"],
+                "requested_at": inflight["requested_at"],
+                "joined": inflight["joined"]
+            },
+            "queued": sorted(self._waiting),
+            "durations": {
+                action: {**stats, "avg_ms": round(stats["total_ms"] / stats["count"], 1),
+                         "total_ms": round(stats["total_ms"], 1)}
+                for action, stats in self.durations.items()
+            },
+            "transitions": recent
+        }
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""Fleet-wide duplicate link index (Bloom filter front, SQLite store)"""
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from src.utils.bloom import BloomFilter
+
+
+logger = logging.getLogger(__name__)
+
+TRACKING_PARAMS = {
+    "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content",
+    "fbclid", "gclid", "ref", "referer", "referrer"
+}
+
+LINK_QUERY = {
+    "bytesTotal": True,
+    "finished": True,
+    "url": True,
+    "status": True,
+    "maxResults": -1,
+    "startAt": 0
+}
+
+# SQLite limits bound parameters per statement
+_CHUNK = 500
+
+
+def normalize_url(url: str) -> str:
+    """Reduce a link to a canonical form for duplicate detection
+
+    Scheme, www., default ports, fragments, trailing slashes and tracking
+    parameters are dropped; the remaining query is sorted.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    port = parts.port
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    path = parts.path.rstrip("/") or "/"
+    normalized = f"{host}{path}"
+    if parts.query:
+        query = sorted(
+            (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if k.lower() not in TRACKING_PARAMS
+        )
+        if query:
+            normalized += "?" + urlencode(query)
+    return normalized
+
+
+def content_key(name: Optional[str], size: Optional[int]) -> Optional[str]:
+    """Identify a file by name and size when both are known"""
+    if not name or not size or size <= 0:
+        return None
+    return f"{name.strip().lower()}|{size}"
+
+
+class LinkIndex:
+    """Global index of normalised URLs and (name, size) content identifiers
+
+    Lookups hit the in-memory Bloom filter first, so unseen links are
+    answered without touching disk; possible hits are confirmed in SQLite.
+    """
+
+    def __init__(self, db_path: str, capacity: int = 10_000_000,
+                 error_rate: float = 0.01, max_memory_mb: int = 64):
+        self.db_path = Path(db_path)
+        self.bloom_path = self.db_path.with_suffix(".bloom")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.max_bytes = max_memory_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self.last_sync: Optional[float] = None
+        self.stats = {"checks": 0, "bloom_negatives": 0, "store_lookups": 0, "duplicates": 0}
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS link_keys (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                url TEXT,
+                device_id TEXT,
+                state TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            ) WITHOUT ROWID"""
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+        self.bloom = self._load_bloom()
+
+    def _load_bloom(self) -> BloomFilter:
+        """Load the persisted filter, rebuilding it from SQLite if stale"""
+        stored = self._db.execute("SELECT COUNT(*) FROM link_keys").fetchone()[0]
+        saved = self._db.execute("SELECT value FROM meta WHERE name = 'bloom_rows'").fetchone()
+        if self.bloom_path.exists() and saved and int(saved[0]) == stored:
+            try:
+                return BloomFilter.load(str(self.bloom_path), self.capacity)
+            except Exception as e:
+                logger.warning("Rebuilding link index filter: %s", e, extra={"path": str(self.bloom_path)})
+
+        bloom = BloomFilter(max(self.capacity, stored * 2), self.error_rate, self.max_bytes)
+        for (key,) in self._db.execute("SELECT key FROM link_keys"):
+            bloom.add(key)
+        return bloom
+
+    def save(self) -> None:
+        """Persist the Bloom filter next to the SQLite store"""
+        with self._lock:
+            self.bloom.save(str(self.bloom_path))
+            # Rows covered by the saved filter; a mismatch on load forces a rebuild
+            stored = self._db.execute("SELECT COUNT(*) FROM link_keys").fetchone()[0]
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES ('bloom_rows', ?)", (str(stored),)
+            )
+            self._db.commit()
+
+    @staticmethod
+    def _keys_for(url: str, name: Optional[str] = None, size: Optional[int] = None) -> List[Tuple[str, str]]:
+        keys = [(f"u:{normalize_url(url)}", "url")]
+        ckey = content_key(name, size)
+        if ckey:
+            keys.append((f"c:{ckey}", "content"))
+        return keys
+
+    def _lookup(self, keys: List[str]) -> Dict[str, Tuple]:
+        """Confirm Bloom positives against SQLite"""
+        found = {}
+        for i in range(0, len(keys), _CHUNK):
+            chunk = keys[i:i + _CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._db.execute(
+                f"SELECT key, url, device_id, state FROM link_keys WHERE key IN ({placeholders})",
+                chunk
+            )
+            for key, url, device_id, state in rows:
+                found[key] = (url, device_id, state)
+        return found
+
+    def check(self, links: Iterable[Dict]) -> List[Dict]:
+        """Return duplicate reports for links already known anywhere in the fleet
+
+        Each link is a dict with "url" and optional "name" and "size".
+        """
+        candidates = []
+        with self._lock:
+            for link in links:
+                self.stats["checks"] += 1
+                keys = self._keys_for(link["url"], link.get("name"), link.get("size"))
+                maybe = [key for key, _ in keys if key in self.bloom]
+                if not maybe:
+                    self.stats["bloom_negatives"] += 1
+                    continue
+                candidates.append((link, maybe))
+
+            if not candidates:
+                return []
+            self.stats["store_lookups"] += len(candidates)
+            found = self._lookup([key for _, keys in candidates for key in keys])
+
+        duplicates = []
+        for link, keys in candidates:
+            for key in keys:
+                if key in found:
+                    url, device_id, state = found[key]
+                    duplicates.append({
+                        "url": link["url"],
+                        "match": "url" if key.startswith("u:") else "content",
+                        "known_url": url,
+                        "device_id": device_id,
+                        "state": state
+                    })
+                    break
+        self.stats["duplicates"] += len(duplicates)
+        return duplicates
+
+    def add(self, links: Iterable[Dict], device_id: Optional[str] = None, state: str = "queued") -> int:
+        """Record links (dicts with "url" and optional "name"/"size"); returns rows written"""
+        now = time.time()
+        rows = []
+        for link in links:
+            if not link.get("url"):
+                continue
+            for key, kind in self._keys_for(link["url"], link.get("name"), link.get("size")):
+                rows.append((key, kind, link["url"], link.get("device_id", device_id),
+                             link.get("state", state), now, now))
+
+        with self._lock:
+            self._db.executemany(
+                """INSERT INTO link_keys (key, kind, url, device_id, state, first_seen, last_seen)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(key) DO UPDATE SET
+                       device_id = excluded.device_id,
+                       state = excluded.state,
+                       last_seen = excluded.last_seen""",
+                rows
+            )
+            self._db.commit()
+            for row in rows:
+                self.bloom.add(row[0])
+        return len(rows)
+
+    def sync_device(self, device) -> int:
+        """Index every link in a device's download list and linkgrabber"""
+        links = []
+        for link in device.downloads.query_links([LINK_QUERY]) or []:
+            links.append({
+                "url": link.get("url"),
+                "name": link.get("name"),
+                "size": link.get("bytesTotal"),
+                "state": "finished" if link.get("finished") else "queued"
+            })
+        for link in device.linkgrabber.query_links([{
+            "bytesTotal": True, "url": True, "maxResults": -1, "startAt": 0
+        }]) or []:
+            links.append({
+                "url": link.get("url"),
+                "name": link.get("name"),
+                "size": link.get("bytesTotal"),
+                "state": "linkgrabber"
+            })
+        return self.add(links, device_id=device.device_id)
+
+    def sync(self, session) -> Dict:
+        """Index all devices on the account"""
+        result = {"devices": 0, "keys": 0, "errors": []}
+        for device in session.get_devices():
+            try:
+                result["keys"] += self.sync_device(device)
+                result["devices"] += 1
+            except Exception as e:
+                result["errors"].append(f"{device.name}: {str(e)}")
+        self.last_sync = time.time()
+        self.save()
+        return result
+
+    def iter_links(self, since: Optional[float] = None, state: Optional[str] = None,
+                   page_size: int = 1000) -> Iterator[Tuple]:
+        """Yield (url, device_id, state, first_seen, last_seen) for every indexed URL
+
+        Keyset-paged, so the lock is held per page and memory stays flat.
+        """
+        after = ""
+        while True:
+            with self._lock:
+                page = self._db.execute(
+                    """SELECT key, url, device_id, state, first_seen, last_seen FROM link_keys
+                       WHERE kind = 'url' AND key > ?
+                         AND (? IS NULL OR last_seen >= ?)
+                         AND (? IS NULL OR state = ?)
+                       ORDER BY key LIMIT ?""",
+                    (after, since, since, state, state, page_size)
+                ).fetchall()
+            for row in page:
+                yield row[1:]
+            if len(page) < page_size:
+                return
+            after = page[-1][0]
+
+    def info(self) -> Dict:
+        with self._lock:
+            stored = self._db.execute("SELECT COUNT(*) FROM link_keys").fetchone()[0]
+        return {
+            "stored_keys": stored,
+            "bloom_bytes": self.bloom.size_bytes,
+            "bloom_hashes": self.bloom.num_hashes,
+            "bloom_estimated_error_rate": round(self.bloom.estimated_error_rate, 6),
+            "last_sync": self.last_sync,
+            **self.stats
+        }
+
+    def close(self) -> None:
+        self.save()
+        with self._lock:
+            self._db.close()
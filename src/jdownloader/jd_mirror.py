@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""Incrementally synced local mirror of each device's download list"""
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+
+# Volatile fields, fetched for every package/link on every cycle (JD name -> mirror key)
+PACKAGE_FIELDS = {
+    "bytesLoaded": "bytes_loaded",
+    "bytesTotal": "bytes_total",
+    "childCount": "child_count",
+    "eta": "eta",
+    "finished": "finished",
+    "running": "running",
+    "speed": "speed",
+    "status": "status"
+}
+LINK_FIELDS = {
+    "bytesLoaded": "bytes_loaded",
+    "enabled": "enabled",
+    "finished": "finished",
+    "running": "running",
+    "speed": "speed",
+    "status": "status"
+}
+
+# Stable fields, fetched only for new or changed packages
+PACKAGE_DETAIL_FIELDS = {
+    "comment": "comment",
+    "enabled": "enabled",
+    "hosts": "hosts",
+    "priority": "priority",
+    "saveTo": "save_to"
+}
+LINK_DETAIL_FIELDS = {
+    "addedDate": "added_date",
+    "bytesTotal": "bytes_total",
+    "comment": "comment",
+    "finishedDate": "finished_date",
+    "host": "host",
+    "priority": "priority",
+    "url": "url"
+}
+
+
+def _query(fields: Dict[str, str], **extra) -> Dict:
+    return {**{field: True for field in fields}, "maxResults": -1, "startAt": 0, **extra}
+
+
+def _pick(item: Dict, fields: Dict[str, str]) -> Dict:
+    return {key: item.get(field) for field, key in fields.items()}
+
+
+class DownloadMirror:
+    """Local copy of every device's packages and links, synced by UUID
+
+    Each cycle fetches only volatile fields; full records are re-fetched for
+    packages that are new, renamed, or whose link count or size changed.
+    Every change bumps a version counter so readers can ask for changes
+    since the version they last saw.
+    """
+
+    def __init__(self, max_tombstones: int = 10000):
+        self.version = 0
+        self._devices: Dict[str, Dict] = {}
+        self._removed = deque(maxlen=max_tombstones)
+        self._removed_floor = 0
+        self._lock = threading.Lock()
+        self.stats = {"syncs": 0, "refetched_packages": 0, "last_sync": None, "last_duration_ms": None}
+
+    def _bump(self) -> int:
+        self.version += 1
+        return self.version
+
+    def _tombstone(self, kind: str, device_id: str, uuid) -> None:
+        if len(self._removed) == self._removed.maxlen:
+            self._removed_floor = self._removed[0][0]
+        self._removed.append((self._bump(), kind, device_id, uuid))
+
+    @staticmethod
+    def _signature(package: Dict) -> Tuple:
+        return package.get("name"), package.get("child_count"), package.get("bytes_total")
+
+    def _store(self, records: Dict, uuid, record: Dict) -> bool:
+        """Save record if it differs from the mirrored one; True when changed"""
+        current = records.get(uuid)
+        if current is not None and all(current.get(k) == v for k, v in record.items()):
+            return False
+        records[uuid] = {**(current or {}), **record, "version": self._bump()}
+        return True
+
+    def sync_device(self, device) -> Dict:
+        """Sync one device; returns counts of changed, added and removed records"""
+        packages = device.downloads.query_packages([_query(PACKAGE_FIELDS)]) or []
+        links = device.downloads.query_links([_query(LINK_FIELDS)]) or []
+
+        with self._lock:
+            mirror = self._devices.get(device.device_id, {"packages": {}, "links": {}})
+            stale = set()
+            for package in packages:
+                uuid = package.get("uuid")
+                before = mirror["packages"].get(uuid)
+                light = {"name": package.get("name"), **_pick(package, PACKAGE_FIELDS)}
+                if before is None or self._signature(before) != self._signature(light):
+                    stale.add(uuid)
+            for link in links:
+                before = mirror["links"].get(link.get("uuid"))
+                if before is None or "url" not in before \
+                        or before["package_uuid"] != link.get("packageUUID") \
+                        or before["name"] != link.get("name"):
+                    stale.add(link.get("packageUUID"))
+
+        # Full records for new/changed packages only, outside the lock
+        details: Dict = {}
+        link_details: Dict = {}
+        if stale:
+            uuids = sorted(stale)
+            for package in device.downloads.query_packages([
+                _query(PACKAGE_DETAIL_FIELDS, packageUUIDs=uuids)
+            ]) or []:
+                details[package.get("uuid")] = _pick(package, PACKAGE_DETAIL_FIELDS)
+            for link in device.downloads.query_links([
+                _query(LINK_DETAIL_FIELDS, packageUUIDs=uuids)
+            ]) or []:
+                link_details[link.get("uuid")] = _pick(link, LINK_DETAIL_FIELDS)
+
+        result = {"changed": 0, "added": 0, "removed": 0, "refetched_packages": len(stale)}
+        with self._lock:
+            mirror = self._devices.setdefault(device.device_id, {"packages": {}, "links": {}})
+            for kind, items, fields, detail in (
+                ("packages", packages, PACKAGE_FIELDS, details),
+                ("links", links, LINK_FIELDS, link_details)
+            ):
+                records = mirror[kind]
+                seen = set()
+                for item in items:
+                    uuid = item.get("uuid")
+                    seen.add(uuid)
+                    record = {
+                        "uuid": uuid,
+                        "device_id": device.device_id,
+                        "name": item.get("name"),
+                        **_pick(item, fields),
+                        **detail.get(uuid, {})
+                    }
+                    if kind == "links":
+                        record["package_uuid"] = item.get("packageUUID")
+                    added = uuid not in records
+                    if self._store(records, uuid, record):
+                        result["added" if added else "changed"] += 1
+                for uuid in set(records) - seen:
+                    del records[uuid]
+                    self._tombstone(kind, device.device_id, uuid)
+                    result["removed"] += 1
+            mirror["synced_at"] = time.time()
+            self.stats["refetched_packages"] += len(stale)
+        return result
+
+    def sync(self, session) -> Dict:
+        started = time.monotonic()
+        result = {"devices": 0, "changed": 0, "added": 0, "removed": 0, "refetched_packages": 0, "errors": []}
+        for device in session.get_devices():
+            try:
+                counts = self.sync_device(device)
+                for key, value in counts.items():
+                    result[key] += value
+                result["devices"] += 1
+            except Exception as e:
+                result["errors"].append(f"{device.name}: {str(e)}")
+        with self._lock:
+            self.stats["syncs"] += 1
+            self.stats["last_sync"] = time.time()
+            self.stats["last_duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+            result["version"] = self.version
+        result["duration_ms"] = self.stats["last_duration_ms"]
+        return result
+
+    def changes(self, since: int = 0, device_id: Optional[str] = None) -> Dict:
+        """Records changed after version since (everything when since is 0)
+
+        reset is true when since predates the retained removals; the caller
+        should then replace its copy with the returned records.
+        """
+        with self._lock:
+            reset = since <= 0 or since < self._removed_floor
+            after = 0 if reset else since
+            devices = {
+                key: mirror for key, mirror in self._devices.items()
+                if device_id is None or key == device_id
+            }
+            result = {
+                "version": self.version,
+                "since": since,
+                "reset": reset,
+                "packages": [
+                    dict(r) for mirror in devices.values()
+                    for r in mirror["packages"].values() if r["version"] > after
+                ],
+                "links": [
+                    dict(r) for mirror in devices.values()
+                    for r in mirror["links"].values() if r["version"] > after
+                ],
+                "removed": [] if reset else [
+                    {"version": version, "kind": kind, "device_id": device, "uuid": uuid}
+                    for version, kind, device, uuid in self._removed
+                    if version > after and (device_id is None or device == device_id)
+                ]
+            }
+        return result
+
+    def info(self) -> Dict:
+        with self._lock:
+            return {
+                "version": self.version,
+                "devices": {
+                    device_id: {
+                        "packages": len(mirror["packages"]),
+                        "links": len(mirror["links"]),
+                        "synced_at": mirror.get("synced_at")
+                    }
+                    for device_id, mirror in self._devices.items()
+                },
+                **self.stats
+            }
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""Move finished downloads into a templated library tree"""
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.utils.file_move import COLLISION_POLICIES, device_of, move_file
+
+from .jd_events import PACKAGE_FINISHED
+
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = {
+    "video": ("mkv", "mp4", "avi", "mov", "wmv", "m4v", "webm", "ts", "mpg", "mpeg"),
+    "audio": ("mp3", "flac", "m4a", "aac", "ogg", "opus", "wav", "wma"),
+    "image": ("jpg", "jpeg", "png", "gif", "webp", "bmp", "tif", "tiff"),
+    "archive": ("zip", "rar", "7z", "tar", "gz", "bz2", "xz", "zst", "iso"),
+    "document": ("pdf", "epub", "mobi", "azw3", "cbz", "cbr", "txt", "doc", "docx")
+}
+
+# Template fields available in destinations
+FIELDS = ("package", "name", "stem", "ext", "category", "device", "year", "month", "day")
+
+# Never moved: JD partial downloads
+SKIP_SUFFIXES = (".part", ".crdownload")
+
+_UNSAFE = re.compile(r"[/\x00]")
+
+
+def category_of(ext: str) -> str:
+    ext = ext.lower()
+    return next((name for name, exts in CATEGORIES.items() if ext in exts), "other")
+
+
+def _clean(value: str) -> str:
+    """Make a template value safe as one path component"""
+    value = _UNSAFE.sub("_", value).strip()
+    return value.lstrip(".") or "_"
+
+
+def normalize_rule(rule: Dict) -> Dict:
+    """Validate a rule dict: its template fields and name pattern"""
+    destination = rule.get("destination")
+    if not destination or not os.path.isabs(destination):
+        raise ValueError(f"destination must be an absolute path template: {destination}")
+    unknown = set(re.findall(r"{(\w+)}", destination)) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown template fields: {', '.join(sorted(unknown))} (use {', '.join(FIELDS)})")
+    normalized = {
+        "name": rule.get("name") or destination,
+        "destination": destination,
+        "extensions": [e.lower().lstrip(".") for e in rule.get("extensions") or []],
+        "categories": [c.lower() for c in rule.get("categories") or []],
+        "name_pattern": rule.get("name_pattern"),
+        "min_size_mb": rule.get("min_size_mb")
+    }
+    try:
+        normalized["_pattern"] = re.compile(normalized["name_pattern"], re.IGNORECASE) \
+            if normalized["name_pattern"] else None
+    except re.error as e:
+        raise ValueError(f"Invalid name_pattern for {normalized['name']}: {str(e)}")
+    return normalized
+
+
+class FileOrganizer:
+    """Moves each finished package's files to the first matching rule's destination
+
+    Moves run in parallel, one queue per (source, destination) filesystem pair,
+    with per_device workers each. Every outcome is appended to a JSON-lines
+    manifest that readers follow by byte offset.
+    """
+
+    def __init__(self, rules_file: str, manifest_file: str,
+                 resolver: Optional[Callable[[Dict], List[str]]] = None,
+                 busy: Optional[Callable[[str], bool]] = None):
+        self.rules_file = Path(rules_file)
+        self.manifest_file = Path(manifest_file)
+        self.resolver = resolver
+        self.busy = busy
+        self.rules: List[Dict] = []
+        self.options = {"collision": "rename", "per_device": 2, "settle_seconds": 5}
+        self._lock = threading.Lock()
+        self._manifest_lock = threading.Lock()
+        self._queues: Dict[Tuple, queue.Queue] = {}
+        self._pending = 0
+        self._intake: queue.Queue = queue.Queue()
+        self._intake_thread: Optional[threading.Thread] = None
+        self.stats = {"packages": 0, "moved": 0, "bytes": 0, "renamed": 0, "skipped": 0,
+                      "deduplicated": 0, "errors": 0, "seconds": 0.0}
+        self.load_rules()
+
+    # Rule storage
+    def load_rules(self) -> None:
+        """Load rules from the rules file (missing file means no rules)"""
+        if not self.rules_file.exists():
+            return
+        with open(self.rules_file, "r") as f:
+            data = json.load(f)
+        self.set_rules(data.get("rules", []), data.get("options"), persist=False)
+
+    def set_rules(self, rules: List[Dict], options: Optional[Dict] = None, persist: bool = True) -> None:
+        """Replace the rule set; rules are tried in order and the first match wins"""
+        normalized = [normalize_rule(r) for r in rules]
+        options = {k: v for k, v in (options or {}).items() if k in self.options and v is not None}
+        if options.get("collision", "rename") not in COLLISION_POLICIES:
+            raise ValueError(f"Unknown collision policy: {options['collision']}")
+        with self._lock:
+            self.rules = normalized
+            self.options.update(options)
+
+        if persist:
+            self.rules_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.rules_file, "w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+
+    def to_dict(self) -> Dict:
+        return {
+            "options": dict(self.options),
+            "rules": [
+                {k: v for k, v in rule.items() if not k.startswith("_")}
+                for rule in self.rules
+            ]
+        }
+
+    @property
+    def active(self) -> bool:
+        return bool(self.rules)
+
+    # Planning
+    def destination_for(self, path: str, package: Dict, at: Optional[datetime] = None) -> Optional[Tuple[Dict, str]]:
+        """First matching rule and the rendered destination for one file"""
+        file = Path(path)
+        ext = file.suffix.lstrip(".").lower()
+        try:
+            size = file.stat().st_size
+        except OSError:
+            return None
+        at = at or datetime.now()
+        fields = {
+            "package": _clean(package.get("name") or file.parent.name),
+            "name": _clean(file.name),
+            "stem": _clean(file.stem),
+            "ext": _clean(ext) if ext else "_",
+            "category": category_of(ext),
+            "device": _clean(package.get("device_name") or "local"),
+            "year": f"{at.year:04d}",
+            "month": f"{at.month:02d}",
+            "day": f"{at.day:02d}"
+        }
+        for rule in self.rules:
+            if rule["extensions"] and ext not in rule["extensions"]:
+                continue
+            if rule["categories"] and fields["category"] not in rule["categories"]:
+                continue
+            if rule["_pattern"] is not None and not rule["_pattern"].search(file.name):
+                continue
+            if rule["min_size_mb"] is not None and size < rule["min_size_mb"] * 1024 * 1024:
+                continue
+            destination = rule["destination"].format(**fields)
+            # A template naming only folders keeps the file name
+            if not re.search(r"{(name|stem|ext)}", rule["destination"]):
+                destination = os.path.join(destination, file.name)
+            return rule, os.path.normpath(destination)
+        return None
+
+    def plan(self, paths: List[str], package: Dict) -> List[Dict]:
+        planned = []
+        for path in paths:
+            if path.lower().endswith(SKIP_SUFFIXES):
+                continue
+            match = self.destination_for(path, package)
+            if match is not None:
+                planned.append({"source": path, "destination": match[1], "rule": match[0]["name"]})
+        return planned
+
+    # Execution
+    def _queue_for(self, key: Tuple) -> queue.Queue:
+        with self._lock:
+            if key not in self._queues:
+                self._queues[key] = queue.Queue()
+                for i in range(max(int(self.options["per_device"]), 1)):
+                    threading.Thread(
+                        target=self._worker,
+                        args=(self._queues[key],),
+                        name=f"organizer-{key[0]}-{key[1]}-{i}",
+                        daemon=True
+                    ).start()
+            return self._queues[key]
+
+    def _worker(self, jobs: queue.Queue) -> None:
+        while True:
+            job = jobs.get()
+            if self.busy is not None and self.busy(job["source"]) and job["deferred"] < 600:
+                # Still being hashed: try again shortly
+                job["deferred"] += 1
+                time.sleep(1)
+                jobs.put(job)
+                continue
+            started = time.monotonic()
+            try:
+                result = move_file(job["source"], job["destination"], self.options["collision"])
+            except Exception as e:
+                result = {"source": job["source"], "destination": job["destination"],
+                          "status": "error", "error": str(e)}
+            elapsed = time.monotonic() - started
+            self._append_manifest({**result, "rule": job["rule"], "package": job["package"],
+                                   "device_id": job["device_id"], "seconds": round(elapsed, 3)})
+            with self._lock:
+                self._pending -= 1
+                status = result["status"]
+                if status == "moved":
+                    self.stats["moved"] += 1
+                    self.stats["bytes"] += result["size"]
+                    self.stats["seconds"] += elapsed
+                    if result.get("collision") == "renamed":
+                        self.stats["renamed"] += 1
+                else:
+                    self.stats["errors" if status == "error" else status] += 1
+
+    def submit(self, paths: List[str], package: Dict) -> Dict:
+        """Plan and queue moves for files of one package"""
+        planned = self.plan(paths, package)
+        for move in planned:
+            key = (device_of(move["source"]), device_of(os.path.dirname(move["destination"])))
+            with self._lock:
+                self._pending += 1
+            self._queue_for(key).put({
+                **move,
+                "package": package.get("name"),
+                "device_id": package.get("device_id"),
+                "deferred": 0
+            })
+        with self._lock:
+            self.stats["packages"] += 1
+        return {"files": len(paths), "queued": len(planned), "unmatched": len(paths) - len(planned)}
+
+    def package_files(self, package: Dict) -> List[str]:
+        """Files of a finished package, from the resolver or by listing its folder"""
+        if self.resolver is not None and package.get("device_id"):
+            try:
+                return self.resolver(package)
+            except Exception as e:
+                logger.warning("Could not resolve files of %s: %s", package.get("name"), e,
+                               extra={"package": package.get("name"), "path": package.get("save_to")})
+        try:
+            return [entry.path for entry in os.scandir(package["save_to"]) if entry.is_file()]
+        except (OSError, KeyError, TypeError):
+            return []
+
+    def on_event(self, event: Dict) -> None:
+        """Event bus listener: organise finished packages after settle_seconds"""
+        if event["type"] != PACKAGE_FINISHED or not self.active:
+            return
+        self._intake.put((time.monotonic(), event["data"]))
+        with self._lock:
+            if self._intake_thread is None:
+                self._intake_thread = threading.Thread(target=self._intake_loop, name="organizer-intake", daemon=True)
+                self._intake_thread.start()
+
+    def _intake_loop(self) -> None:
+        while True:
+            received, package = self._intake.get()
+            # JD may still be renaming/extracting right after the finished state
+            time.sleep(max(self.options["settle_seconds"] - (time.monotonic() - received), 0))
+            try:
+                self.submit(self.package_files(package), package)
+            except Exception as e:
+                logger.error("Organizer failed for %s: %s", package.get("name"), e,
+                             extra={"package": package.get("name"), "path": package.get("save_to")})
+
+    # Manifest
+    def _append_manifest(self, entry: Dict) -> None:
+        line = json.dumps({"time": time.time(), **entry}, separators=(",", ":")) + "\n"
+        with self._manifest_lock:
+            self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.manifest_file, "a") as f:
+                f.write(line)
+
+    def read_manifest(self, offset: int = 0, limit: int = 1000) -> Tuple[List[Dict], int]:
+        """Entries appended after byte offset, and the offset to continue from"""
+        entries = []
+        if not self.manifest_file.exists():
+            return entries, offset
+        with open(self.manifest_file, "rb") as f:
+            f.seek(offset)
+            while len(entries) < limit:
+                line = f.readline()
+                if not line or not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return entries, offset
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            pending = self._pending
+            lanes = len(self._queues)
+        return {
+            **stats,
+            "seconds": round(stats["seconds"], 1),
+            "pending": pending,
+            "lanes": lanes,
+            "throughput_bps": round(stats["bytes"] / stats["seconds"]) if stats["seconds"] else None
+        }
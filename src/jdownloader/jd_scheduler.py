@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Time-of-day bandwidth and concurrency scheduler for JDownloader"""
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .jd_config_store import JDConfigStore
+
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+# Limits a rule may set. None means "leave JDownloader's value alone".
+LIMIT_KEYS = ("speed_limit_kbps", "max_downloads", "max_chunks")
+
+GENERAL_SETTINGS = "org.jdownloader.settings.GeneralSettings"
+
+
+def _parse_time(value: str) -> int:
+    """Parse HH:MM into minutes after midnight"""
+    hours, minutes = value.strip().split(":")
+    hours, minutes = int(hours), int(minutes)
+    if not (0 <= hours <= 24 and 0 <= minutes < 60) or hours * 60 + minutes > 1440:
+        raise ValueError(f"Invalid time of day: {value}")
+    return hours * 60 + minutes
+
+
+def normalize_rule(rule: Dict) -> Dict:
+    """Validate a rule dict and precompute its window in minutes"""
+    days = [d.lower()[:3] for d in (rule.get("days") or WEEKDAYS)]
+    for day in days:
+        if day not in WEEKDAYS:
+            raise ValueError(f"Invalid weekday: {day}")
+
+    normalized = {
+        "name": rule.get("name") or f"{rule.get('start', '00:00')}-{rule.get('end', '24:00')}",
+        "days": days,
+        "start": rule.get("start", "00:00"),
+        "end": rule.get("end", "24:00"),
+    }
+    normalized["_start"] = _parse_time(normalized["start"])
+    normalized["_end"] = _parse_time(normalized["end"])
+
+    for key in LIMIT_KEYS:
+        value = rule.get(key)
+        if value is not None and int(value) < 0:
+            raise ValueError(f"{key} must be >= 0")
+        normalized[key] = None if value is None else int(value)
+    return normalized
+
+
+def rule_matches(rule: Dict, at: datetime) -> bool:
+    """Check whether a normalized rule covers the given moment
+
+    Windows with end <= start wrap past midnight into the next day.
+    """
+    day = WEEKDAYS[at.weekday()]
+    previous_day = WEEKDAYS[(at.weekday() - 1) % 7]
+    minute = at.hour * 60 + at.minute
+    start, end = rule["_start"], rule["_end"]
+
+    if start < end:
+        return day in rule["days"] and start <= minute < end
+    return (day in rule["days"] and minute >= start) or \
+           (previous_day in rule["days"] and minute < end)
+
+
+class BandwidthScheduler:
+    """Holds weekday/time-window rules and pushes effective limits to JDownloader"""
+
+    def __init__(self, jd_home: str, rules_file: str, config_store: Optional[JDConfigStore] = None):
+        self.jd_home = Path(jd_home)
+        self.rules_file = Path(rules_file)
+        self.config_store = config_store or JDConfigStore(jd_home)
+        self.cfg_file = self.config_store.config_dir / f"{GENERAL_SETTINGS}.json"
+        self._lock = threading.Lock()
+        self.defaults: Dict = {key: None for key in LIMIT_KEYS}
+        self.rules: List[Dict] = []
+        self.applied: Dict[str, Dict] = {}
+        self.last_pid: Optional[int] = None
+        self.seen_stopped = False
+        self.last_applied_at: Optional[float] = None
+        self.load_rules()
+
+    def relocate(self, jd_home: str) -> None:
+        """Follow a moved JD installation; limits are re-applied on the next tick"""
+        with self._lock:
+            self.jd_home = Path(jd_home)
+            if self.config_store.config_dir != self.jd_home / "cfg":
+                self.config_store.relocate(jd_home)
+            self.cfg_file = self.config_store.config_dir / f"{GENERAL_SETTINGS}.json"
+            self.applied.pop("cfg", None)
+
+    # Rule storage
+    def load_rules(self) -> None:
+        """Load rules from the rules file (missing file means no rules)"""
+        if not self.rules_file.exists():
+            return
+        with open(self.rules_file, "r") as f:
+            data = json.load(f)
+        self.set_rules(data.get("rules", []), data.get("defaults"), persist=False)
+
+    def set_rules(self, rules: List[Dict], defaults: Optional[Dict] = None, persist: bool = True) -> None:
+        """Replace the rule set; later rules override earlier ones per limit"""
+        normalized = [normalize_rule(r) for r in rules]
+        new_defaults = {key: None for key in LIMIT_KEYS}
+        for key, value in (defaults or {}).items():
+            if key in LIMIT_KEYS:
+                new_defaults[key] = None if value is None else int(value)
+
+        with self._lock:
+            self.rules = normalized
+            self.defaults = new_defaults
+            # Force a push on the next tick
+            self.applied = {}
+
+        if persist:
+            self.rules_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.rules_file, "w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+
+    def to_dict(self) -> Dict:
+        return {
+            "defaults": dict(self.defaults),
+            "rules": [
+                {k: v for k, v in rule.items() if not k.startswith("_")}
+                for rule in self.rules
+            ]
+        }
+
+    @property
+    def active(self) -> bool:
+        """True when there is anything to enforce"""
+        return bool(self.rules) or any(v is not None for v in self.defaults.values())
+
+    # Evaluation
+    def effective_limits(self, at: Optional[datetime] = None) -> Tuple[Dict, List[str]]:
+        """Return the limits in force at a moment and the names of matching rules"""
+        at = at or datetime.now()
+        limits = dict(self.defaults)
+        matched = []
+        for rule in self.rules:
+            if rule_matches(rule, at):
+                matched.append(rule["name"])
+                for key in LIMIT_KEYS:
+                    if rule[key] is not None:
+                        limits[key] = rule[key]
+        return limits, matched
+
+    def preview(self, start: Optional[datetime] = None, hours: int = 168) -> List[Dict]:
+        """Build the effective-limits timeline as a list of constant segments"""
+        start = (start or datetime.now()).replace(second=0, microsecond=0)
+        end = start + timedelta(hours=hours)
+
+        # Limits can only change at a rule boundary, so evaluate just those
+        boundaries = {start}
+        day = start.replace(hour=0, minute=0)
+        while day < end:
+            for rule in self.rules:
+                for minute in (rule["_start"], rule["_end"]):
+                    moment = day + timedelta(minutes=minute)
+                    if start < moment < end:
+                        boundaries.add(moment)
+            day += timedelta(days=1)
+
+        segments = []
+        for moment in sorted(boundaries):
+            limits, matched = self.effective_limits(moment)
+            if segments and segments[-1]["limits"] == limits and segments[-1]["rules"] == matched:
+                continue
+            if segments:
+                segments[-1]["end"] = moment.isoformat()
+            segments.append({
+                "start": moment.isoformat(),
+                "end": None,
+                "limits": limits,
+                "rules": matched
+            })
+        if segments:
+            segments[-1]["end"] = end.isoformat()
+        return segments
+
+    # Application
+    def apply_to_cfg(self, limits: Dict) -> bool:
+        """Write limits into JD's GeneralSettings cfg file (used on next JD start)"""
+        if not self.config_store.config_dir.exists():
+            return False
+
+        writes = []
+        speed = limits.get("speed_limit_kbps")
+        if speed is not None:
+            writes.append((GENERAL_SETTINGS, "downloadspeedlimitenabled", speed > 0))
+            if speed > 0:
+                writes.append((GENERAL_SETTINGS, "downloadspeedlimit", speed * 1024))
+        if limits.get("max_downloads") is not None:
+            writes.append((GENERAL_SETTINGS, "maxsimultanedownloads", limits["max_downloads"]))
+        if limits.get("max_chunks") is not None:
+            writes.append((GENERAL_SETTINGS, "maxchunksperfile", limits["max_chunks"]))
+
+        try:
+            if writes:
+                self.config_store.commit(writes)
+            return True
+        except Exception as e:
+            logger.error("Could not write schedule to %s: %s", self.cfg_file, e, extra={"path": str(self.cfg_file)})
+            return False
+
+    def apply_to_device(self, device, limits: Dict) -> None:
+        """Push limits to a running JD through the device config API"""
+        speed = limits.get("speed_limit_kbps")
+        if speed is not None:
+            if speed > 0:
+                device.config.set(GENERAL_SETTINGS, "null", "DownloadSpeedLimit", speed * 1024)
+            device.config.set(GENERAL_SETTINGS, "null", "DownloadSpeedLimitEnabled", speed > 0)
+        if limits.get("max_downloads") is not None:
+            device.config.set(GENERAL_SETTINGS, "null", "MaxSimultaneDownloads", limits["max_downloads"])
+        if limits.get("max_chunks") is not None:
+            device.config.set(GENERAL_SETTINGS, "null", "MaxChunksPerFile", limits["max_chunks"])
+
+    def tick(self, service=None, session=None, force: bool = False) -> Dict:
+        """Apply the current limits wherever they are stale
+
+        Limits are pushed when they change, when a device has not seen them
+        yet, or when the local JD process was restarted (new PID).
+        """
+        limits, matched = self.effective_limits()
+        result = {"limits": limits, "rules": matched, "applied": [], "errors": []}
+
+        if service is not None:
+            running, pid = service.is_running()
+            if running and pid != self.last_pid:
+                # Fresh JD process (replaced, or started after being seen
+                # stopped): it may have reverted to its cfg values
+                if self.last_pid is not None or self.seen_stopped:
+                    force = True
+                self.last_pid = pid
+                self.seen_stopped = False
+            elif not running:
+                self.last_pid = None
+                self.seen_stopped = True
+
+        if force or self.applied.get("cfg") != limits:
+            if self.apply_to_cfg(limits):
+                self.applied["cfg"] = limits
+                result["applied"].append("cfg")
+
+        if session is not None:
+            try:
+                for device in session.get_devices():
+                    if not force and self.applied.get(device.device_id) == limits:
+                        continue
+                    try:
+                        self.apply_to_device(device, limits)
+                        self.applied[device.device_id] = limits
+                        result["applied"].append(device.name)
+                    except Exception as e:
+                        result["errors"].append(f"{device.name}: {str(e)}")
+            except Exception as e:
+                result["errors"].append(f"cloud: {str(e)}")
+
+        if result["applied"]:
+            self.last_applied_at = datetime.now().timestamp()
+        return result
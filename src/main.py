@@ -14,6 +14,21 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 
+def bind_unix_socket(path, mode=0o660):
+    """Bind a listening Unix socket, replacing a stale one"""
+    import socket
+    
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        path.unlink()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(str(path))
+    os.chmod(path, mode)
+    sock.set_inheritable(True)
+    return sock
+
+
 def start_api(dev_mode=False, host="0.0.0.0", port=8001):
     """Start FastAPI server"""
     import uvicorn
@@ -24,6 +39,8 @@ def start_api(dev_mode=False, host="0.0.0.0", port=8001):
     # Get settings from environment
     api_host = os.getenv("API_HOST", host)
     api_port = int(os.getenv("API_PORT", port))
+    api_socket = os.getenv("API_SOCKET", "")
+    socket_mode = int(os.getenv("API_SOCKET_MODE", "660"), 8)
     
     print("=" * 70)
     print("JDownloader Controller API Server".center(70))
@@ -36,6 +53,22 @@ def start_api(dev_mode=False, host="0.0.0.0", port=8001):
     if dev_mode:
         print(f"👀 Watching files for changes...")
         print(f"💡 Press Ctrl+C to stop\n")
+        if api_socket:
+            print(f"ℹ️  API_SOCKET is ignored in development mode")
+    
+    if api_socket and not dev_mode:
+        # Serve TCP and the Unix socket from one process
+        config = uvicorn.Config(
+            "src.api.api:app",
+            host=api_host,
+            port=api_port,
+            log_level="warning"
+        )
+        sockets = [config.bind_socket(), bind_unix_socket(api_socket, socket_mode)]
+        print(f"🔌 Socket: unix:{api_socket} (mode {socket_mode:o})")
+        # The API removes the socket file on shutdown
+        uvicorn.Server(config).run(sockets=sockets)
+        return
     
     # Start uvicorn
     uvicorn.run(
@@ -74,73 +107,126 @@ def start_headless():
     sys.exit(result.returncode)
 
 
-def show_status():
-    """Show comprehensive status"""
+def control_socket_path():
+    """Resolve the controller's control socket like the API does"""
+    path = os.getenv("CONTROL_SOCKET", "")
+    if path.lower() == "off":
+        return None
+    if not path:
+        path = Path(os.getenv("DATA_DIR") or "data") / "control.sock"
+    path = Path(path)
+    return str(path if path.is_absolute() else project_root / path)
+
+
+def direct_cloud_devices():
+    """Log in to MyJDownloader directly (used when no controller is running)"""
+    from src.jdownloader.jd_auth_config import JDownloaderConfig
+    from src.jdownloader.jd_cloud_session import RateLimitedMyjdapi
+    
+    email = os.getenv("JDOWNLOADER_EMAIL")
+    password = os.getenv("JDOWNLOADER_PASSWORD")
+    if not email or not password:
+        config = JDownloaderConfig().read_config()
+        email = email or config.get("email")
+        password = password or config.get("password")
+    if not email or not password:
+        raise RuntimeError("No credentials configured")
+    
+    jd_api = RateLimitedMyjdapi()
+    jd_api.set_app_key("jd2controller")
+    jd_api.connect(email, password)
+    jd_api.update_devices()
+    return jd_api.list_devices() or []
+
+
+def show_status(as_json=False):
+    """Show comprehensive status (probes run concurrently)"""
+    import json
+    from dotenv import load_dotenv
+    from src.utils.status_collector import StatusCollector, default_probes
+    
+    load_dotenv()
+    data_dir = Path(os.getenv("DATA_DIR") or "data")
+    if not data_dir.is_absolute():
+        data_dir = project_root / data_dir
+    
+    collector = StatusCollector(
+        default_probes(
+            jd_home=os.getenv("JDOWNLOADER_HOME", "/opt/jd2"),
+            data_dir=str(data_dir),
+            api_host=os.getenv("API_HOST", "127.0.0.1"),
+            api_port=int(os.getenv("API_PORT", "8001")),
+            control_socket=control_socket_path(),
+            cloud_fallback=direct_cloud_devices
+        ),
+        cache_file=str(data_dir / "status_cache.json")
+    )
+    report = collector.collect()
+    
+    if as_json:
+        print(json.dumps(report, indent=2, default=str))
+        return report["ok"]
+    
+    probes = report["probes"]
+    
+    def failure(probe):
+        return probe.get("error") or probe.get("data", {}).get("reason") or "unavailable"
+    
     print("\n" + "=" * 70)
     print("JDownloader Controller Status".center(70))
     print("=" * 70 + "\n")
     
-    # Check JDownloader status
+    # JDownloader process
     print("📦 JDownloader Service:")
-    result = subprocess.run(
-        ["pgrep", "-f", "JDownloader.jar"],
-        capture_output=True
-    )
-    
-    if result.returncode == 0:
-        pids = result.stdout.decode().strip().split('\n')
-        print(f"   ✅ Running (PIDs: {', '.join(pids)})")
+    process = probes["process"]
+    if process["ok"]:
+        print(f"   ✅ Running (PIDs: {', '.join(map(str, process['data']['pids']))})")
+    elif "error" in process:
+        print(f"   ⚠️  Unknown ({process['error']})")
     else:
         print(f"   ❌ Not running")
     
-    # Check API status
+    # API server
     print("\n🌐 API Server:")
-    result = subprocess.run(
-        ["pgrep", "-f", "python.*api.py"],
-        capture_output=True
-    )
-    
-    if result.returncode == 0:
-        pids = result.stdout.decode().strip().split('\n')
-        print(f"   ✅ Running (PIDs: {', '.join(pids)})")
-        
-        # Try to get API port
-        from dotenv import load_dotenv
-        load_dotenv()
-        api_port = os.getenv("API_PORT", "8001")
-        print(f"   📍 URL: http://localhost:{api_port}/docs")
+    api = probes["api"]
+    if api["ok"]:
+        print(f"   ✅ Running")
+        print(f"   📍 URL: {api['data']['url']}/docs")
     else:
-        print(f"   ❌ Not running")
+        print(f"   ❌ Not running ({failure(api)})")
     
-    # Check cloud connection
+    # Cloud connection
     print("\n☁️  Cloud Connection:")
-    verify_script = project_root / "src" / "verification" / "verify_connection_v2.py"
-    venv_python = project_root / "venv" / "bin" / "python"
-    
-    if verify_script.exists() and venv_python.exists():
-        result = subprocess.run(
-            [str(venv_python), str(verify_script)],
-            capture_output=True,
-            timeout=10
-        )
-        if result.returncode == 0:
-            # Extract device name from output
-            output = result.stdout.decode()
-            if "SUCCESS" in output:
-                print(f"   ✅ Connected to MyJDownloader cloud")
-                if "JDownloader@" in output:
-                    import re
-                    match = re.search(r'Name:\s+(\S+)', output)
-                    if match:
-                        print(f"   📱 Device: {match.group(1)}")
-            else:
-                print(f"   ⚠️  Cloud status uncertain")
+    cloud = probes["cloud"]
+    if cloud["ok"]:
+        print(f"   ✅ Connected to MyJDownloader cloud (via {cloud['data']['source']})")
+        for device in cloud["data"].get("devices", []):
+            print(f"   📱 Device: {device.get('name', 'Unknown')}")
+    else:
+        print(f"   ❌ Not connected ({failure(cloud)})")
+    
+    # Disk space
+    print("\n💾 Disk Space:")
+    disk = probes["disk"]
+    for label, info in disk.get("data", {}).get("disks", {}).items():
+        if "error" in info:
+            print(f"   ⚠️  {label}: {info['error']}")
         else:
-            print(f"   ❌ Not connected")
+            print(f"   {label}: {info['free_bytes'] / 1024**3:.1f} GB free ({info['used_percent']}% used) - {info['path']}")
+    if "error" in disk:
+        print(f"   ⚠️  {disk['error']}")
+    
+    # Log file
+    print("\n📝 Log File:")
+    log = probes["log"]
+    if log["ok"]:
+        print(f"   {log['data']['path']}: {log['data']['size_kb']} KB, updated {log['data']['age_seconds']:.0f}s ago")
     else:
-        print(f"   ⚠️  Cannot verify (missing scripts)")
+        print(f"   ⚠️  {failure(log) if 'error' in log else 'Not found'}")
     
+    print(f"\n⏱️  Collected in {report['duration_ms']:.0f} ms")
     print("\n" + "=" * 70 + "\n")
+    return report["ok"]
 
 
 def main():
@@ -168,6 +254,7 @@ Examples:
   
   # Show comprehensive status
   python main.py status
+  python main.py status --json
   
   # Custom API host/port
   python main.py api --dev --host 127.0.0.1 --port 8080
@@ -213,6 +300,12 @@ Examples:
         help='API server port (default: 8001)'
     )
     
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Print status as JSON (only with status command)'
+    )
+    
     args = parser.parse_args()
     
     try:
@@ -232,7 +325,9 @@ Examples:
             run_cli_command(args.subcommand)
         
         elif args.command == 'status':
-            show_status()
+            ok = show_status(as_json=args.json)
+            if args.json:
+                sys.exit(0 if ok else 1)
         
         else:
             parser.print_help()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Call an ASGI app in-process, without a network round trip"""
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+
+async def call_asgi(app, method: str, path: str, params: Optional[Dict] = None,
+                    headers: Optional[List[Tuple[bytes, bytes]]] = None, body: bytes = b"",
+                    base_scope: Optional[Dict] = None) -> Tuple[int, Dict[str, str], bytes]:
+    """Run one HTTP request through app; returns (status, headers, body)
+
+    base_scope supplies connection details (client, server, scheme) so the
+    sub-request is treated like the request that triggered it.
+    """
+    base_scope = base_scope or {}
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": base_scope.get("http_version", "1.1"),
+        "method": method.upper(),
+        "scheme": base_scope.get("scheme", "http"),
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "root_path": base_scope.get("root_path", ""),
+        "query_string": urlencode(params or {}, doseq=True).encode("utf-8"),
+        "headers": list(headers or []) + [(b"content-length", str(len(body)).encode())],
+        "client": base_scope.get("client"),
+        "server": base_scope.get("server"),
+        "state": {}
+    }
+    if "app" in base_scope:
+        scope["app"] = base_scope["app"]
+
+    request_sent = False
+    response_complete = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Like a connected client: no disconnect until the response is done
+        # (middleware watching for one would cancel streaming responses)
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    response = {"status": 500, "headers": {}, "body": bytearray()}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {
+                k.decode("latin-1"): v.decode("latin-1") for k, v in message.get("headers", [])
+            }
+        elif message["type"] == "http.response.body":
+            response["body"].extend(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_complete.set()
+
+    await app(scope, receive, send)
+    return response["status"], response["headers"], bytes(response["body"])
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Compact Bloom filter with a bounded memory budget"""
+import hashlib
+import math
+import struct
+from pathlib import Path
+from typing import Iterable, Optional
+
+
+_HEADER = struct.Struct("<8sQQQ")
+_MAGIC = b"JDBLOOM1"
+
+_blake2b = hashlib.blake2b
+_unpack_pair = struct.Struct("<QQ").unpack
+
+
+class BloomFilter:
+    """Bit-array Bloom filter using double hashing over one blake2b digest
+
+    A negative answer is exact; a positive answer must be confirmed
+    against the authoritative store.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01, max_bytes: Optional[int] = None):
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be > 0 and 0 < error_rate < 1")
+
+        bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        if max_bytes:
+            bits = min(bits, max_bytes * 8)
+        self.num_bits = max(bits, 64)
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str) -> list:
+        h1, h2 = _unpack_pair(_blake2b(key.encode("utf-8"), digest_size=16).digest())
+        h2 |= 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def add(self, key: str) -> bool:
+        """Add a key; returns False if it was (probably) present already"""
+        bits = self.bits
+        new = False
+        for pos in self._positions(key):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def update(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.bits)
+
+    @property
+    def estimated_error_rate(self) -> float:
+        """False positive rate expected at the current fill level"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    def save(self, path: str) -> None:
+        """Write the filter to disk atomically"""
+        path = Path(path)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, self.num_bits, self.num_hashes, self.count))
+            f.write(self.bits)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: str, capacity: int) -> "BloomFilter":
+        """Read a filter written by save()"""
+        with open(path, "rb") as f:
+            magic, num_bits, num_hashes, count = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"Not a Bloom filter file: {path}")
+            bits = bytearray(f.read())
+        if len(bits) != (num_bits + 7) // 8:
+            raise ValueError(f"Truncated Bloom filter file: {path}")
+
+        bloom = cls.__new__(cls)
+        bloom.num_bits = num_bits
+        bloom.num_hashes = num_hashes
+        bloom.capacity = capacity
+        bloom.count = count
+        bloom.bits = bits
+        return bloom
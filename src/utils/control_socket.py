@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Local control socket: one JSON request line in, one JSON response line out"""
+import asyncio
+import inspect
+import json
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Union
+
+Handler = Callable[[Dict], Union[Dict, Awaitable[Dict]]]
+
+
+class ControlServer:
+    """Serve named commands to local clients (jdctl) on a Unix socket
+
+    Requests look like {"command": "status", "args": {...}}; responses are
+    {"ok": true, "result": {...}} or {"ok": false, "error": "..."}. A client
+    may send several requests on one connection.
+    """
+
+    def __init__(self, path: str, handlers: Dict[str, Handler]):
+        self.path = Path(path)
+        self.handlers = handlers
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            # Stale socket from a previous run
+            self.path.unlink()
+        # Create the socket 0660 from the start; a chmod after bind leaves
+        # a window where any local user can connect
+        previous = os.umask(0o117)
+        try:
+            self._server = await asyncio.start_unix_server(self._handle, path=str(self.path))
+        finally:
+            os.umask(previous)
+
+    async def _dispatch(self, line: bytes) -> Dict:
+        try:
+            request = json.loads(line)
+            command = request["command"]
+        except (ValueError, KeyError, TypeError):
+            return {"ok": False, "error": "Malformed request"}
+
+        handler = self.handlers.get(command)
+        if handler is None:
+            return {"ok": False, "error": f"Unknown command: {command}"}
+        try:
+            result = handler(request.get("args") or {})
+            if inspect.isawaitable(result):
+                result = await result
+            return {"ok": True, "result": result}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self._dispatch(line)
+                writer.write(json.dumps(response, default=str).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self.path.unlink(missing_ok=True)
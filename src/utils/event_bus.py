@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""In-process event bus with durable outbox, webhook and Unix-socket delivery"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+
+logger = logging.getLogger(__name__)
+
+
+class EventBus:
+    """Publish controller events to local callbacks, webhooks and socket clients
+
+    Every event is appended to a JSON-lines outbox before delivery. Each
+    webhook keeps its own byte offset into the outbox, so undelivered events
+    survive restarts and are retried with backoff. publish() only queues the
+    event; an event-dispatch thread writes and fsyncs the outbox (once per
+    burst) and runs the listeners, so publishers never wait on the disk.
+    """
+
+    def __init__(self, data_dir: str, batch_size: int = 100, linger: float = 0.2,
+                 max_backoff: float = 60.0, compact_bytes: int = 16 * 1024 * 1024):
+        self.data_dir = Path(data_dir)
+        self.outbox_file = self.data_dir / "events.outbox.jsonl"
+        self.webhooks_file = self.data_dir / "webhooks.json"
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_backoff = max_backoff
+        self.compact_bytes = compact_bytes
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._dispatch_queue: queue.Queue = queue.Queue()
+        self._dispatch_thread: Optional[threading.Thread] = None
+        self._dispatch_cond = threading.Condition()
+        self._queued = 0
+        self._dispatched = 0
+        self._socket_clients: List[socket.socket] = []
+        self._clients_lock = threading.Lock()
+        # Socket fan-out runs on its own thread so a slow client never
+        # stalls the publisher; payloads beyond the bound are dropped
+        self._socket_queue: queue.Queue = queue.Queue(maxsize=10000)
+        self._threads: List[threading.Thread] = []
+        self.webhooks: Dict[str, Dict] = {}
+        self.stats = {"published": 0, "delivered": 0, "failed_attempts": 0, "socket_dropped": 0}
+
+        self._load_webhooks()
+
+    # Webhook registry
+    def _load_webhooks(self) -> None:
+        if self.webhooks_file.exists():
+            with open(self.webhooks_file, "r") as f:
+                self.webhooks = {w["id"]: w for w in json.load(f)}
+
+    def _save_webhooks(self) -> None:
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.webhooks_file.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(list(self.webhooks.values()), f, indent=2)
+        tmp.replace(self.webhooks_file)
+
+    def register_webhook(self, url: str, event_types: Optional[List[str]] = None,
+                         secret: Optional[str] = None, from_start: bool = False) -> Dict:
+        """Register a webhook; it receives events published from now on"""
+        with self._lock:
+            offset = 0
+            if not from_start and self.outbox_file.exists():
+                offset = self.outbox_file.stat().st_size
+            webhook = {
+                "id": uuid.uuid4().hex[:12],
+                "url": url,
+                "event_types": event_types or [],
+                "secret": secret,
+                "offset": offset,
+                "failures": 0,
+                "next_attempt": 0.0,
+                "last_error": None,
+                "delivered": 0
+            }
+            self.webhooks[webhook["id"]] = webhook
+            self._save_webhooks()
+        self._wakeup.set()
+        return webhook
+
+    def remove_webhook(self, webhook_id: str) -> bool:
+        with self._lock:
+            if self.webhooks.pop(webhook_id, None) is None:
+                return False
+            self._save_webhooks()
+            return True
+
+    # Publishing
+    def subscribe(self, callback: Callable[[Dict], None]) -> None:
+        """Call back in-process for every event (must not block)"""
+        self._listeners.append(callback)
+
+    def publish(self, event_type: str, data: Optional[Dict] = None) -> Dict:
+        """Queue an event for recording and delivery (never blocks on I/O)"""
+        event = {
+            "id": uuid.uuid4().hex,
+            "type": event_type,
+            "time": time.time(),
+            "data": data or {}
+        }
+        with self._dispatch_cond:
+            self._queued += 1
+            if self._dispatch_thread is None:
+                self._dispatch_thread = threading.Thread(target=self._dispatch_loop, daemon=True,
+                                                         name="event-dispatch")
+                self._dispatch_thread.start()
+            # Enqueued under the condition so queue order matches the counter
+            self._dispatch_queue.put(event)
+        return event
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every event published so far is recorded and seen by listeners"""
+        with self._dispatch_cond:
+            target = self._queued
+            return self._dispatch_cond.wait_for(lambda: self._dispatched >= target, timeout)
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            event = self._dispatch_queue.get()
+            batch = [event] if event is not None else []
+            while event is not None:
+                try:
+                    event = self._dispatch_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if event is not None:
+                    batch.append(event)
+            if batch:
+                self._dispatch(batch)
+            if event is None:
+                return
+
+    def _dispatch(self, batch: List[Dict]) -> None:
+        lines = [json.dumps(event, separators=(",", ":")) + "\n" for event in batch]
+        try:
+            with self._lock:
+                self.data_dir.mkdir(parents=True, exist_ok=True)
+                with open(self.outbox_file, "a") as f:
+                    f.write("".join(lines))
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.stats["published"] += len(batch)
+        except OSError as e:
+            logger.error("Could not record %d event(s): %s", len(batch), e, extra={"path": str(self.outbox_file)})
+
+        for event, line in zip(batch, lines):
+            for callback in list(self._listeners):
+                try:
+                    callback(event)
+                except Exception as e:
+                    logger.error("Event listener failed: %s", e, extra={"event_type": event["type"]})
+            if self._socket_clients:
+                try:
+                    self._socket_queue.put_nowait(line.encode("utf-8"))
+                except queue.Full:
+                    self.stats["socket_dropped"] += 1
+        self._wakeup.set()
+        with self._dispatch_cond:
+            self._dispatched += len(batch)
+            self._dispatch_cond.notify_all()
+
+    # Webhook delivery
+    def _read_batch(self, offset: int) -> Tuple[List[Dict], int]:
+        """Read up to batch_size events from the outbox starting at offset"""
+        events = []
+        if not self.outbox_file.exists():
+            return events, offset
+        with open(self.outbox_file, "rb") as f:
+            f.seek(offset)
+            while len(events) < self.batch_size:
+                line = f.readline()
+                if not line or not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return events, offset
+
+    def _deliver(self, webhook: Dict) -> bool:
+        """Send the next batch to one webhook; True if anything was sent"""
+        events, new_offset = self._read_batch(webhook["offset"])
+        if new_offset == webhook["offset"]:
+            return False
+
+        wanted = [
+            e for e in events
+            if not webhook["event_types"] or any(
+                e["type"] == t or e["type"].startswith(t.rstrip("*")) for t in webhook["event_types"]
+            )
+        ]
+        if wanted:
+            body = json.dumps({"events": wanted}, separators=(",", ":"))
+            headers = {"Content-Type": "application/json", "User-Agent": "jd2controller"}
+            if webhook.get("secret"):
+                signature = hmac.new(webhook["secret"].encode("utf-8"), body.encode("utf-8"), hashlib.sha256)
+                headers["X-JD-Signature"] = signature.hexdigest()
+            try:
+                response = requests.post(webhook["url"], data=body, headers=headers, timeout=10)
+                if response.status_code >= 300:
+                    raise RuntimeError(f"HTTP {response.status_code}")
+            except Exception as e:
+                webhook["failures"] += 1
+                webhook["last_error"] = str(e)
+                webhook["next_attempt"] = time.time() + min(2 ** webhook["failures"], self.max_backoff)
+                self.stats["failed_attempts"] += 1
+                return False
+
+        with self._lock:
+            webhook["offset"] = new_offset
+            webhook["failures"] = 0
+            webhook["last_error"] = None
+            webhook["next_attempt"] = 0.0
+            webhook["delivered"] += len(wanted)
+            self.stats["delivered"] += len(wanted)
+            self._save_webhooks()
+        return True
+
+    def _compact(self) -> None:
+        """Truncate the outbox once every webhook has consumed it"""
+        with self._lock:
+            if not self.outbox_file.exists():
+                return
+            size = self.outbox_file.stat().st_size
+            if size < self.compact_bytes:
+                return
+            if any(w["offset"] < size for w in self.webhooks.values()):
+                return
+            self.outbox_file.write_bytes(b"")
+            for webhook in self.webhooks.values():
+                webhook["offset"] = 0
+            self._save_webhooks()
+
+    def _delivery_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(timeout=1.0)
+            self._wakeup.clear()
+            # Let bursts accumulate into one batch
+            time.sleep(self.linger)
+
+            busy = True
+            while busy and not self._stop.is_set():
+                busy = False
+                now = time.time()
+                for webhook in list(self.webhooks.values()):
+                    if webhook["next_attempt"] <= now and self._deliver(webhook):
+                        busy = True
+            self._compact()
+
+    # Unix socket subscribers
+    def _broadcast(self, payload: bytes) -> None:
+        with self._clients_lock:
+            clients = list(self._socket_clients)
+        for client in clients:
+            try:
+                client.sendall(payload)
+            except OSError:
+                with self._clients_lock:
+                    if client in self._socket_clients:
+                        self._socket_clients.remove(client)
+                client.close()
+
+    def _fanout_loop(self) -> None:
+        while not self._stop.is_set():
+            payload = self._socket_queue.get()
+            if payload is None:
+                break
+            self._broadcast(payload)
+
+    def _socket_loop(self, server: socket.socket) -> None:
+        while not self._stop.is_set():
+            try:
+                client, _ = server.accept()
+            except OSError:
+                break
+            client.settimeout(1.0)
+            with self._clients_lock:
+                self._socket_clients.append(client)
+
+    def serve_socket(self, path: str) -> None:
+        """Stream live events as JSON lines to clients of a Unix socket"""
+        socket_path = Path(path)
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if socket_path.exists():
+            socket_path.unlink()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        previous = os.umask(0o117)
+        try:
+            server.bind(str(socket_path))
+        finally:
+            os.umask(previous)
+        server.listen(16)
+        for target, name, args in ((self._socket_loop, "event-socket", (server,)),
+                                   (self._fanout_loop, "event-socket-fanout", ())):
+            thread = threading.Thread(target=target, args=args, daemon=True, name=name)
+            thread.start()
+            self._threads.append(thread)
+        self._socket_server = server
+
+    # Lifecycle
+    def start(self) -> None:
+        thread = threading.Thread(target=self._delivery_loop, daemon=True, name="event-delivery")
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        # Record and dispatch what is already queued before stopping
+        with self._dispatch_cond:
+            dispatcher = self._dispatch_thread
+            if dispatcher is not None:
+                self._dispatch_queue.put(None)
+        if dispatcher is not None:
+            dispatcher.join(timeout)
+            with self._dispatch_cond:
+                self._dispatch_thread = None
+        self._stop.set()
+        self._wakeup.set()
+        server = getattr(self, "_socket_server", None)
+        if server is not None:
+            server.close()
+            try:
+                self._socket_queue.put_nowait(None)
+            except queue.Full:
+                pass
+        with self._clients_lock:
+            clients, self._socket_clients = self._socket_clients, []
+        for client in clients:
+            client.close()
+
+    def info(self) -> Dict:
+        size = self.outbox_file.stat().st_size if self.outbox_file.exists() else 0
+        return {
+            "outbox_bytes": size,
+            "socket_clients": len(self._socket_clients),
+            "dispatch_queue": self._dispatch_queue.qsize(),
+            "webhooks": [
+                {
+                    **{k: v for k, v in w.items() if k != "secret"},
+                    "pending_bytes": max(size - w["offset"], 0)
+                }
+                for w in self.webhooks.values()
+            ],
+            **self.stats
+        }
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Streaming file hashing and .sfv/.md5/.sha* checksum file parsing"""
+import hashlib
+import os
+import re
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+
+ALGORITHMS = ("crc32", "md5", "sha1", "sha256", "sha512")
+
+# Checksum file extensions and the algorithm they carry
+CHECKSUM_EXTENSIONS = {
+    ".sfv": "crc32",
+    ".md5": "md5",
+    ".md5sum": "md5",
+    ".sha1": "sha1",
+    ".sha1sum": "sha1",
+    ".sha256": "sha256",
+    ".sha256sum": "sha256",
+    ".sha512": "sha512",
+    ".sha512sum": "sha512"
+}
+
+HEX_LENGTHS = {8: "crc32", 32: "md5", 40: "sha1", 64: "sha256", 128: "sha512"}
+
+READ_SIZE = 8 * 1024 * 1024
+
+_BSD_LINE = re.compile(r"^(MD5|SHA1|SHA256|SHA512|CRC32) ?\((.+)\) ?= ?([0-9a-fA-F]+)$")
+_GNU_LINE = re.compile(r"^([0-9a-fA-F]{32,128}) [ *](.+)$")
+_SFV_LINE = re.compile(r"^(.+?)\s+([0-9a-fA-F]{8})$")
+
+
+def hash_file(path: str, algorithms: Tuple[str, ...] = ("sha256",), read_size: int = READ_SIZE) -> Dict:
+    """Hash a file in one sequential pass; returns hex digests, size and seconds
+
+    Reads into one reused buffer with a sequential-access hint, so the page
+    cache reads ahead and no per-chunk bytes objects are allocated. Runs in
+    worker processes, hence a plain module-level function.
+    """
+    started = time.monotonic()
+    hashers = {name: hashlib.new(name) for name in algorithms if name != "crc32"}
+    crc = 0 if "crc32" in algorithms else None
+    buffer = bytearray(read_size)
+    view = memoryview(buffer)
+    size = 0
+    with open(path, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            chunk = view[:n]
+            for hasher in hashers.values():
+                hasher.update(chunk)
+            if crc is not None:
+                crc = zlib.crc32(chunk, crc)
+            size += n
+    digests = {name: hasher.hexdigest() for name, hasher in hashers.items()}
+    if crc is not None:
+        digests["crc32"] = f"{crc:08x}"
+    return {"path": path, "size": size, "digests": digests, "seconds": time.monotonic() - started}
+
+
+def parse_checksum_file(path: str) -> Dict[str, Tuple[str, str]]:
+    """Map file names to (algorithm, lowercase hex) from an .sfv, md5sum-style or BSD-style file"""
+    default = CHECKSUM_EXTENSIONS.get(Path(path).suffix.lower())
+    entries = {}
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for raw in f:
+            line = raw.strip()
+            if not line or line.startswith((";", "#")):
+                continue
+            match = _BSD_LINE.match(line)
+            if match:
+                entries[match.group(2)] = (match.group(1).lower(), match.group(3).lower())
+                continue
+            if default != "crc32":
+                match = _GNU_LINE.match(line)
+                if match:
+                    digest = match.group(1).lower()
+                    entries[match.group(2)] = (default or HEX_LENGTHS.get(len(digest), "sha256"), digest)
+                    continue
+            match = _SFV_LINE.match(line)
+            if match:
+                entries[match.group(1)] = ("crc32", match.group(2).lower())
+    return entries
+
+
+def find_expected(directories: Iterable[str]) -> Dict[str, Tuple[str, str, str]]:
+    """Collect expected checksums from checksum files in directories
+
+    Keys are absolute file paths; values are (algorithm, hex, source file).
+    """
+    expected = {}
+    for directory in directories:
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if not entry.is_file() or Path(entry.name).suffix.lower() not in CHECKSUM_EXTENSIONS:
+                continue
+            try:
+                parsed = parse_checksum_file(entry.path)
+            except OSError:
+                continue
+            for name, (algorithm, digest) in parsed.items():
+                target = os.path.normpath(os.path.join(directory, name.replace("\\", "/")))
+                expected[target] = (algorithm, digest, entry.path)
+    return expected
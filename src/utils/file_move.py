@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""Move files with rename when possible and kernel-side copies otherwise"""
+import errno
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+COLLISION_POLICIES = ("rename", "skip", "overwrite")
+
+# Bytes per copy_file_range/sendfile call
+COPY_CHUNK = 64 * 1024 * 1024
+
+
+def _copy_kernel(src_fd: int, dst_fd: int, size: int) -> str:
+    """Copy size bytes between fds without user-space buffers; returns the method used"""
+    methods = []
+    if hasattr(os, "copy_file_range"):
+        methods.append("copy_file_range")
+    if hasattr(os, "sendfile"):
+        methods.append("sendfile")
+
+    for method in methods:
+        offset = 0
+        try:
+            while offset < size:
+                if method == "copy_file_range":
+                    sent = os.copy_file_range(src_fd, dst_fd, min(COPY_CHUNK, size - offset), offset, offset)
+                else:
+                    sent = os.sendfile(dst_fd, src_fd, offset, min(COPY_CHUNK, size - offset))
+                if sent == 0:
+                    break
+                offset += sent
+            if offset == size:
+                return method
+        except OSError as e:
+            # EXDEV/ENOSYS/EINVAL/EOPNOTSUPP: not supported for this pair, try the next method
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF):
+                raise
+        os.lseek(dst_fd, 0, os.SEEK_SET)
+        os.ftruncate(dst_fd, 0)
+
+    os.lseek(src_fd, 0, os.SEEK_SET)
+    with os.fdopen(os.dup(src_fd), "rb") as src, os.fdopen(os.dup(dst_fd), "wb") as dst:
+        shutil.copyfileobj(src, dst, COPY_CHUNK)
+    return "copy"
+
+
+def same_contents(a: Path, b: Path, chunk: int = 1024 * 1024) -> bool:
+    """Byte-for-byte comparison of two files"""
+    if a.stat().st_size != b.stat().st_size:
+        return False
+    with open(a, "rb") as fa, open(b, "rb") as fb:
+        while True:
+            block = fa.read(chunk)
+            if block != fb.read(chunk):
+                return False
+            if not block:
+                return True
+
+
+def _candidates(dst: Path, rename: bool):
+    yield dst
+    if rename:
+        n = 1
+        while True:
+            yield dst.with_name(f"{dst.stem} ({n}){dst.suffix}")
+            n += 1
+
+
+def _place(staged: Path, dst: Path, rename: bool) -> Optional[Path]:
+    """Move staged to dst (or its first free ' (n)' name) without replacing anything
+
+    The name is claimed atomically: hard link and unlink, or where hard links
+    are unsupported an O_EXCL placeholder that is then replaced. Returns the
+    final path, or None when dst exists and rename is False. Raises EXDEV when
+    staged and dst are on different filesystems.
+    """
+    for candidate in _candidates(dst, rename):
+        try:
+            os.link(staged, candidate)
+        except FileExistsError:
+            if not rename:
+                return None
+            continue
+        except OSError as e:
+            if e.errno not in (errno.EPERM, errno.EOPNOTSUPP, errno.EMLINK, errno.ENOSYS):
+                raise
+            try:
+                os.close(os.open(candidate, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600))
+            except FileExistsError:
+                if not rename:
+                    return None
+                continue
+            try:
+                os.replace(staged, candidate)
+            except OSError:
+                candidate.unlink(missing_ok=True)
+                raise
+            return candidate
+        staged.unlink()
+        return candidate
+
+
+def _copy_to_temp(src: Path, dst: Path, st: os.stat_result) -> Tuple[Path, str]:
+    """Kernel-side copy of src into a hidden temp file next to dst; returns (temp, method)"""
+    tmp = dst.with_name(f".{dst.name}.part")
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        dst_fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, st.st_mode & 0o777)
+        try:
+            method = _copy_kernel(src_fd, dst_fd, st.st_size)
+            os.fsync(dst_fd)
+        finally:
+            os.close(dst_fd)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    finally:
+        os.close(src_fd)
+    os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+    return tmp, method
+
+
+def move_file(source: str, destination: str, collision: str = "rename") -> Dict:
+    """Move source to destination, creating parent folders
+
+    Same filesystem: a hard link (or rename). Across filesystems: copy with
+    copy_file_range (or sendfile) into a temporary name, fsync, move into
+    place, then unlink the source. collision decides what happens when the
+    destination exists: rename (add " (n)"), skip (the source is left
+    alone), or overwrite. Under rename and overwrite, an existing destination
+    with identical contents counts as already moved. Names are claimed
+    atomically, so concurrent moves never replace each other's files.
+    """
+    if collision not in COLLISION_POLICIES:
+        raise ValueError(f"Unknown collision policy: {collision}")
+    src = Path(source)
+    dst = Path(destination)
+    st = src.stat()
+    result = {"source": str(src), "destination": str(dst), "size": st.st_size, "collision": None}
+
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.exists():
+        if os.path.samefile(src, dst):
+            return {**result, "status": "skipped", "method": None, "collision": "same-file"}
+        if collision == "skip":
+            return {**result, "status": "skipped", "method": None, "collision": "exists"}
+        if same_contents(src, dst):
+            src.unlink()
+            return {**result, "status": "deduplicated", "method": None, "collision": "identical"}
+
+    rename = collision == "rename"
+    staged, method = src, "rename"
+    try:
+        final = _place(src, dst, rename)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        staged, method = _copy_to_temp(src, dst, st)
+        try:
+            final = _place(staged, dst, rename)
+        except BaseException:
+            staged.unlink(missing_ok=True)
+            raise
+
+    if final is None:
+        # dst exists and we may not pick another name
+        if collision == "skip":
+            if staged is not src:
+                staged.unlink(missing_ok=True)
+            return {**result, "status": "skipped", "method": None, "collision": "exists"}
+        os.replace(staged, dst)
+        final = dst
+        result["collision"] = "overwritten"
+    elif final != dst:
+        result.update(destination=str(final), collision="renamed")
+
+    if staged is not src:
+        src.unlink()
+    return {**result, "status": "moved", "method": method}
+
+
+def device_of(path: str) -> Optional[int]:
+    """st_dev of path or of its nearest existing parent"""
+    current = Path(path)
+    while not current.exists():
+        if current.parent == current:
+            return None
+        current = current.parent
+    return current.stat().st_dev
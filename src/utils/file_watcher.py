@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Lightweight file watcher: inotify via watchfiles when available, mtime polling otherwise"""
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, Set, Tuple
+
+try:
+    import watchfiles
+except ImportError:  # pragma: no cover - depends on uvicorn[standard]
+    watchfiles = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class FileWatcher:
+    """Report changes to specific files and to *.json files in directories
+
+    Hidden files (such as our own .name.tmp staging files) are ignored.
+    """
+
+    def __init__(self, files: Iterable[str], dirs: Iterable[str],
+                 callback: Callable[[Set[str]], Awaitable[None]],
+                 poll_interval: float = 2.0, force_polling: bool = False):
+        self.files = {Path(f).resolve() for f in files}
+        self.dirs = {Path(d).resolve() for d in dirs}
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.force_polling = force_polling or watchfiles is None
+        self._stop = asyncio.Event()
+
+    @property
+    def backend(self) -> str:
+        return "polling" if self.force_polling else "inotify"
+
+    def _wanted(self, path: Path) -> bool:
+        if path.name.startswith(".") and path not in self.files:
+            return False
+        return path in self.files or (path.parent in self.dirs and path.suffix == ".json")
+
+    def _snapshot(self) -> Dict[Path, Tuple[int, int, int]]:
+        """Stat every watched path (used by the polling backend)"""
+        snapshot = {}
+        candidates = set(self.files)
+        for directory in self.dirs:
+            try:
+                with os.scandir(directory) as entries:
+                    candidates.update(Path(e.path) for e in entries if e.is_file())
+            except OSError:
+                continue
+        for path in candidates:
+            if not self._wanted(path):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (st.st_ino, st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    async def _run_polling(self) -> None:
+        previous = await asyncio.to_thread(self._snapshot)
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            current = await asyncio.to_thread(self._snapshot)
+            changed = {
+                str(path) for path in set(previous) | set(current)
+                if previous.get(path) != current.get(path)
+            }
+            previous = current
+            if changed:
+                await self._notify(changed)
+
+    async def _run_inotify(self) -> None:
+        roots = {str(d) for d in self.dirs if d.exists()}
+        roots.update(str(f.parent) for f in self.files if f.parent.exists())
+        if not roots:
+            return await self._run_polling()
+
+        async for changes in watchfiles.awatch(
+            *roots,
+            watch_filter=lambda _, path: self._wanted(Path(path)),
+            recursive=False,
+            debounce=300,
+            stop_event=self._stop
+        ):
+            await self._notify({path for _, path in changes})
+
+    async def _notify(self, changed: Set[str]) -> None:
+        try:
+            await self.callback(changed)
+        except Exception as e:
+            logger.error("Config watcher callback failed: %s", e, extra={"paths": sorted(changed)})
+
+    async def run(self) -> None:
+        if self.force_polling:
+            await self._run_polling()
+        else:
+            await self._run_inotify()
+
+    def stop(self) -> None:
+        self._stop.set()
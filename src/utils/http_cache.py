@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""ETag helpers for cheap conditional GETs"""
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+from fastapi import Request, Response
+from starlette.datastructures import MutableHeaders
+
+
+def compute_etag(*parts) -> str:
+    """Build a weak ETag from data version parts (offsets, mtimes, counters)
+
+    Weak because the same version is served gzipped or as identity by the
+    compression middleware, so the bytes differ while the data does not.
+    """
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+
+def file_version(path) -> Optional[Tuple[int, int, int]]:
+    """Identify a file's current content by inode, size and mtime"""
+    try:
+        st = os.stat(Path(path))
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match against an ETag (weak comparison)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def vary_on_encoding(headers: MutableHeaders) -> None:
+    """Add Vary: Accept-Encoding to a response carrying an ETag (once)"""
+    if "etag" in headers and "accept-encoding" not in headers.get("vary", "").lower():
+        headers.add_vary_header("Accept-Encoding")
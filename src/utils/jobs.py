@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""Durable background jobs: SQLite-backed queue served by a bounded worker pool"""
+import json
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once cancellation was requested"""
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused for a different operation"""
+
+
+class JobContext:
+    """Handed to job functions: progress, log lines and cooperative cancellation"""
+
+    def __init__(self, jobs: "JobQueue", job_id: str, attempt: int, cancel: threading.Event):
+        self.jobs = jobs
+        self.job_id = job_id
+        self.attempt = attempt
+        self._cancel = cancel
+
+    @property
+    def resumed(self) -> bool:
+        """True when an API restart interrupted an earlier attempt"""
+        return self.attempt > 1
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check(self) -> None:
+        """Raise JobCancelled if the job should stop"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def sleep(self, seconds: float) -> None:
+        """time.sleep that wakes up (raising JobCancelled) on cancellation"""
+        if self._cancel.wait(seconds):
+            raise JobCancelled()
+
+    def progress(self, fraction: Optional[float] = None, message: Optional[str] = None) -> None:
+        self.jobs._set_progress(self.job_id, fraction, message)
+        if message:
+            self.log(message)
+
+    def log(self, message: str) -> None:
+        self.jobs._append_log(self.job_id, message)
+
+
+class JobQueue:
+    """Jobs are rows in SQLite, so they survive restarts and client disconnects
+
+    Functions are registered per kind and called as fn(ctx, **params) on one
+    of `workers` threads; their return value (JSON) becomes the job result.
+    Jobs found running at start were interrupted by a restart and are queued
+    again (ctx.resumed tells the function), up to max_attempts.
+    """
+
+    def __init__(self, db_path: str, workers: int = 2, retention_days: float = 7,
+                 max_attempts: int = 3):
+        self.db_path = Path(db_path)
+        self.workers = max(workers, 1)
+        self.retention = retention_days * 86400
+        self.max_attempts = max_attempts
+        self._handlers: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        self._cancel: Dict[str, threading.Event] = {}
+        self._threads: List[threading.Thread] = []
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                idempotency_key TEXT UNIQUE,
+                progress REAL NOT NULL DEFAULT 0,
+                message TEXT,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS job_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                at REAL NOT NULL,
+                message TEXT NOT NULL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS job_log_job ON job_log (job_id, seq)")
+        self._db.commit()
+
+    def register(self, kind: str, fn: Callable) -> None:
+        self._handlers[kind] = fn
+
+    # Lifecycle
+    def start(self) -> Dict:
+        """Prune old jobs, requeue interrupted and pending ones, start the workers"""
+        now = time.time()
+        resumed = abandoned = 0
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM job_log WHERE job_id IN "
+                f"(SELECT id FROM jobs WHERE status IN ({','.join('?' * len(FINISHED))}) AND finished_at < ?)",
+                (*FINISHED, now - self.retention)
+            )
+            self._db.execute(
+                f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(FINISHED))}) AND finished_at < ?",
+                (*FINISHED, now - self.retention)
+            )
+            for row in self._db.execute("SELECT id, attempts, cancel_requested FROM jobs WHERE status = ?",
+                                        (RUNNING,)).fetchall():
+                if row["cancel_requested"]:
+                    self._finish(row["id"], CANCELLED, error="Cancelled while the API was down")
+                elif row["attempts"] >= self.max_attempts:
+                    self._finish(row["id"], FAILED, error=f"Interrupted by restarts {row['attempts']} times")
+                    abandoned += 1
+                else:
+                    self._db.execute("UPDATE jobs SET status = ? WHERE id = ?", (QUEUED, row["id"]))
+                    self._log(row["id"], "Resumed after API restart")
+                    resumed += 1
+            pending = [row["id"] for row in self._db.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            )]
+            self._db.commit()
+        for job_id in pending:
+            self._queue.put(job_id)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return {"queued": len(pending), "resumed": resumed, "abandoned": abandoned}
+
+    def close(self) -> None:
+        """Stop taking jobs; running ones stay 'running' and resume on the next start"""
+        for _ in self._threads:
+            self._queue.put(None)
+        self._threads = []
+
+    # Submission and control
+    def submit(self, kind: str, params: Dict, idempotency_key: Optional[str] = None) -> Tuple[Dict, bool]:
+        """Queue a job; returns (job, created). A known key returns its existing job"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        encoded = json.dumps(params, sort_keys=True)
+        with self._lock:
+            if idempotency_key:
+                row = self._db.execute("SELECT * FROM jobs WHERE idempotency_key = ?",
+                                       (idempotency_key,)).fetchone()
+                if row is not None:
+                    if row["kind"] != kind or row["params"] != encoded:
+                        raise IdempotencyConflict(
+                            f"Idempotency key already used for a different {row['kind']} job"
+                        )
+                    return self._to_dict(row), False
+            job_id = uuid.uuid4().hex
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, params, status, idempotency_key, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, encoded, QUEUED, idempotency_key or None, time.time())
+            )
+            self._db.commit()
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        self._queue.put(job_id)
+        return self._to_dict(row), True
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """Cancel a queued job now, or ask a running one to stop at its next check"""
+        with self._lock:
+            row = self._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row["status"] == QUEUED:
+                self._finish(job_id, CANCELLED)
+            elif row["status"] == RUNNING:
+                self._db.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+                self._log(job_id, "Cancellation requested")
+                event = self._cancel.get(job_id)
+                if event is not None:
+                    event.set()
+            self._db.commit()
+        return self.get(job_id)
+
+    # Queries
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def list(self, status: Optional[str] = None, kind: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Newest first"""
+        query, args = "SELECT * FROM jobs WHERE 1 = 1", []
+        if status:
+            query += " AND status = ?"
+            args.append(status)
+        if kind:
+            query += " AND kind = ?"
+            args.append(kind)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            rows = self._db.execute(query, args).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def log(self, job_id: str, after: int = 0, limit: int = 500) -> List[Dict]:
+        """Log lines with seq > after (pass the last seq seen to follow a job)"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, at, message FROM job_log WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (job_id, after, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def info(self) -> Dict:
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {"workers": self.workers, "waiting": self._queue.qsize(), "running": len(self._cancel),
+                "counts": counts}
+
+    # Workers
+    def _worker(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            try:
+                self._run(job_id)
+            except Exception as e:
+                print(f"⚠️  Job {job_id} crashed the worker: {str(e)}")
+
+    def _run(self, job_id: str) -> None:
+        cancel = threading.Event()
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["status"] != QUEUED:
+                return
+            attempt = row["attempts"] + 1
+            self._db.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, started_at = ? WHERE id = ?",
+                (RUNNING, attempt, time.time(), job_id)
+            )
+            self._db.commit()
+            self._cancel[job_id] = cancel
+        ctx = JobContext(self, job_id, attempt, cancel)
+        try:
+            result = self._handlers[row["kind"]](ctx, **json.loads(row["params"]))
+            outcome = (SUCCEEDED, result, None)
+        except JobCancelled:
+            outcome = (CANCELLED, None, None)
+        except Exception as e:
+            outcome = (FAILED, None, str(e) or type(e).__name__)
+        with self._lock:
+            self._cancel.pop(job_id, None)
+            self._finish(job_id, outcome[0], outcome[1], outcome[2])
+            self._db.commit()
+
+    # Storage (callers hold the lock and commit)
+    def _finish(self, job_id: str, status: str, result=None, error: Optional[str] = None) -> None:
+        self._db.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, "
+            "progress = CASE WHEN ? = 'succeeded' THEN 1 ELSE progress END WHERE id = ?",
+            (status, json.dumps(result) if result is not None else None, error, time.time(), status, job_id)
+        )
+        self._log(job_id, f"Job {status}" + (f": {error}" if error else ""))
+
+    def _log(self, job_id: str, message: str) -> None:
+        self._db.execute("INSERT INTO job_log (job_id, at, message) VALUES (?, ?, ?)",
+                         (job_id, time.time(), message))
+
+    def _append_log(self, job_id: str, message: str) -> None:
+        with self._lock:
+            self._log(job_id, message)
+            self._db.commit()
+
+    def _set_progress(self, job_id: str, fraction: Optional[float], message: Optional[str]) -> None:
+        with self._lock:
+            if fraction is not None:
+                self._db.execute("UPDATE jobs SET progress = ? WHERE id = ?",
+                                 (min(max(fraction, 0.0), 1.0), job_id))
+            if message is not None:
+                self._db.execute("UPDATE jobs SET message = ? WHERE id = ?", (message, job_id))
+            self._db.commit()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Per-account token buckets with priority queueing for upstream API calls"""
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+
+# Lower rank is served first
+PRIORITIES = {"interactive": 0, "normal": 1, "background": 2}
+
+# Priority of upstream calls made from the current request/task
+upstream_priority: ContextVar[str] = ContextVar("upstream_priority", default="normal")
+
+# Per-request accumulator ({"calls": n, "wait": seconds}), set by the API middleware
+upstream_usage: ContextVar[Optional[Dict]] = ContextVar("upstream_usage", default=None)
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call waited longer than the limiter's max_wait
+
+    retry_after estimates the seconds until the bucket could serve the
+    queue that was ahead of the call.
+    """
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@contextmanager
+def priority(name: str):
+    """Run upstream calls in this block with the given priority class"""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {name}")
+    token = upstream_priority.set(name)
+    try:
+        yield
+    finally:
+        upstream_priority.reset(token)
+
+
+class TokenBucket:
+    """Token bucket whose waiters are served by priority, then arrival"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+        self.stats = {
+            name: {"calls": 0, "waited": 0, "total_wait": 0.0, "max_wait": 0.0, "timeouts": 0}
+            for name in PRIORITIES
+        }
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority: str = "normal", timeout: Optional[float] = None) -> float:
+        """Take one token, blocking behind higher-priority waiters; returns seconds waited"""
+        entry = (PRIORITIES[priority], next(self._seq))
+        started = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            while True:
+                self._refill()
+                at_head = self._waiters[0] == entry
+                if at_head and self.tokens >= 1:
+                    self.tokens -= 1
+                    heapq.heappop(self._waiters)
+                    self._cond.notify_all()
+                    break
+
+                delay = (1 - self.tokens) / self.rate if at_head else None
+                if timeout is not None:
+                    remaining = timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._waiters.remove(entry)
+                        heapq.heapify(self._waiters)
+                        self._cond.notify_all()
+                        self.stats[priority]["timeouts"] += 1
+                        retry_after = (len(self._waiters) + 1 - self.tokens) / self.rate
+                        raise RateLimitTimeout(f"Upstream rate limit: waited more than {timeout:g}s",
+                                               max(retry_after, 1.0))
+                    delay = remaining if delay is None else min(delay, remaining)
+                self._cond.wait(delay)
+
+            waited = time.monotonic() - started
+            stats = self.stats[priority]
+            stats["calls"] += 1
+            stats["total_wait"] += waited
+            stats["max_wait"] = max(stats["max_wait"], waited)
+            if waited > 0.001:
+                stats["waited"] += 1
+        return waited
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            self._refill()
+            queued = {name: 0 for name in PRIORITIES}
+            names = {rank: name for name, rank in PRIORITIES.items()}
+            for rank, _ in self._waiters:
+                queued[names[rank]] += 1
+            return {
+                "rate_per_second": self.rate,
+                "burst": self.burst,
+                "tokens": round(self.tokens, 2),
+                "queued": queued,
+                "priorities": {
+                    name: {
+                        "calls": s["calls"],
+                        "waited": s["waited"],
+                        "timeouts": s["timeouts"],
+                        "avg_wait_ms": round(s["total_wait"] / s["calls"] * 1000, 1) if s["calls"] else 0.0,
+                        "max_wait_ms": round(s["max_wait"] * 1000, 1)
+                    }
+                    for name, s in self.stats.items()
+                }
+            }
+
+
+class RateLimiterRegistry:
+    """One bucket per account, shared by every upstream call path in the process"""
+
+    def __init__(self, rate: float = 2.0, burst: int = 10, max_wait: Optional[float] = 30.0):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, rate: float, burst: int, max_wait: Optional[float]) -> None:
+        with self._lock:
+            self.rate, self.burst, self.max_wait = rate, burst, max_wait
+            for bucket in self._buckets.values():
+                with bucket._cond:
+                    bucket.rate, bucket.burst = rate, burst
+                    bucket.tokens = min(bucket.tokens, burst)
+                    bucket._cond.notify_all()
+
+    def get(self, account: str) -> TokenBucket:
+        key = (account or "").lower()
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(self.rate, self.burst)
+            return self._buckets[key]
+
+    def acquire(self, account: str, priority: Optional[str] = None) -> float:
+        """Wait for a call slot for account; the wait is added to the current request's usage"""
+        waited = self.get(account).acquire(priority or upstream_priority.get(), self.max_wait)
+        usage = upstream_usage.get()
+        if usage is not None:
+            usage["calls"] += 1
+            usage["wait"] += waited
+        return waited
+
+    def stats(self) -> Dict:
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {account: bucket.snapshot() for account, bucket in buckets.items()}
+
+
+# Process-wide registry used for MyJDownloader accounts
+account_limiter = RateLimiterRegistry()
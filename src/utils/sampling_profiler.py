@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""In-process sampling profiler: periodic stack snapshots of every thread"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running"""
+
+
+# Leaf frames that mean a thread is parked, not working (file name, function)
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("socket.py", "accept"),
+    ("socketserver.py", "serve_forever")
+}
+
+_lock = threading.Lock()
+
+
+def _label(code) -> str:
+    parts = code.co_filename.split(os.sep)
+    return f"{code.co_name} ({'/'.join(parts[-2:])}:{code.co_firstlineno})"
+
+
+def profile(seconds: float, hz: int = 100, include_idle: bool = False,
+            loop_thread: Optional[int] = None) -> Dict:
+    """Sample every thread's Python stack hz times a second for seconds
+
+    Returns collapsed stacks ("thread;outer;...;inner count", the input
+    format of flamegraph.pl and speedscope) and per-function self/total
+    sample counts. Only one profile runs at a time (ProfilerBusy otherwise).
+    Stacks whose innermost frame is a known wait are dropped unless
+    include_idle is set; loop_thread names the event loop's thread.
+    """
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        interval = 1.0 / hz
+        own = threading.get_ident()
+        stacks: Counter = Counter()
+        labels: Dict = {}
+        names: Dict[int, str] = {}
+        samples = idle = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        next_tick = started
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+                if loop_thread is not None:
+                    names[loop_thread] = "event-loop"
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if not include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    idle += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = _label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                stacks[tuple(reversed(stack))] += 1
+            samples += 1
+            # Fixed-rate ticks; a late tick is not made up with a burst
+            next_tick = max(next_tick + interval, time.perf_counter())
+            time.sleep(max(next_tick - time.perf_counter(), 0))
+        elapsed = time.perf_counter() - started
+    finally:
+        _lock.release()
+
+    return {
+        "seconds": round(elapsed, 2),
+        "hz": hz,
+        "ticks": samples,
+        "stacks_sampled": sum(stacks.values()),
+        "idle_dropped": idle,
+        "stacks": stacks
+    }
+
+
+def collapsed(stacks: Counter) -> str:
+    """flamegraph.pl / speedscope collapsed-stack text"""
+    return "".join(f"{';'.join(stack)} {count}\n" for stack, count in stacks.most_common())
+
+
+def top_functions(stacks: Counter, limit: int = 30) -> List[Dict]:
+    """Functions by samples spent in them (self) and under them (total)"""
+    own: Counter = Counter()
+    total: Counter = Counter()
+    for stack, count in stacks.items():
+        own[stack[-1]] += count
+        # Recursion counts once per sample
+        for label in set(stack[1:]):
+            total[label] += count
+    sampled = sum(stacks.values()) or 1
+    return [
+        {
+            "function": label,
+            "self": own[label],
+            "total": count,
+            "self_pct": round(own[label] * 100 / sampled, 1),
+            "total_pct": round(count * 100 / sampled, 1)
+        }
+        for label, count in sorted(total.items(), key=lambda item: (-own[item[0]], -item[1]))[:limit]
+    ]
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""Concurrent status probes with per-probe deadlines and result caching"""
+import contextvars
+import http.client
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from src.utils.tracing import run, span
+
+
+class Probe:
+    """A named status check with its own deadline and cache lifetime"""
+
+    def __init__(self, name: str, fn: Callable[[], Dict], deadline: float = 2.0, ttl: float = 0.0):
+        self.name = name
+        self.fn = fn
+        self.deadline = deadline
+        self.ttl = ttl
+
+
+class StatusCollector:
+    """Run probes concurrently; a slow probe only costs its own deadline
+
+    Results younger than a probe's ttl are reused. With cache_file, results
+    are also shared between short-lived CLI invocations.
+    """
+
+    def __init__(self, probes: Iterable[Probe], cache_file: Optional[str] = None):
+        self.probes = {probe.name: probe for probe in probes}
+        self.cache_file = Path(cache_file) if cache_file else None
+        self._cache: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._load_cache()
+
+    def _load_cache(self) -> None:
+        if self.cache_file is None or not self.cache_file.exists():
+            return
+        try:
+            with open(self.cache_file, "r") as f:
+                self._cache = json.load(f)
+        except (OSError, ValueError):
+            self._cache = {}
+
+    def _save_cache(self) -> None:
+        if self.cache_file is None:
+            return
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_file.with_name(f".{self.cache_file.name}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(self._cache, f, default=str)
+            os.replace(tmp, self.cache_file)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _run(probe: Probe) -> Dict:
+        started = time.monotonic()
+        try:
+            data = probe.fn()
+            result = {"ok": bool(data.pop("ok", True)), "data": data}
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        result["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+        return result
+
+    def collect(self, names: Optional[List[str]] = None, use_cache: bool = True) -> Dict:
+        """Run the selected probes (all by default) and return their results"""
+        started = time.monotonic()
+        selected = [self.probes[name] for name in (names or self.probes)]
+        results: Dict[str, Dict] = {}
+        pending = []
+
+        now = time.time()
+        with self._lock:
+            for probe in selected:
+                cached = self._cache.get(probe.name)
+                if use_cache and cached and probe.ttl > 0 and now - cached["checked_at"] < probe.ttl:
+                    results[probe.name] = {**cached, "cached": True}
+                else:
+                    pending.append(probe)
+
+        if pending:
+            # Daemon threads: a probe past its deadline is abandoned, not awaited
+            running = {}
+            for probe in pending:
+                holder: Dict = {}
+                # Run in a copy of the caller's context so probe spans join its trace
+                context = contextvars.copy_context()
+                thread = threading.Thread(
+                    target=lambda p=probe, h=holder, c=context: h.update(c.run(self._run, p)),
+                    name=f"status-probe-{probe.name}",
+                    daemon=True
+                )
+                thread.start()
+                running[probe.name] = (probe, thread, holder)
+
+            for name, (probe, thread, holder) in running.items():
+                thread.join(max(probe.deadline - (time.monotonic() - started), 0))
+                if thread.is_alive() or not holder:
+                    result = {"ok": False, "error": f"Timed out after {probe.deadline:g}s",
+                              "duration_ms": round(probe.deadline * 1000, 1)}
+                else:
+                    result = holder
+                result["checked_at"] = time.time()
+                result["cached"] = False
+                results[name] = result
+
+            with self._lock:
+                for name, result in results.items():
+                    # Failed or timed-out probes are retried on the next call
+                    if not result["cached"] and "data" in result:
+                        self._cache[name] = result
+                self._save_cache()
+
+        return {
+            "collected_at": time.time(),
+            "duration_ms": round((time.monotonic() - started) * 1000, 1),
+            "ok": all(r["ok"] for r in results.values()),
+            "probes": {probe.name: results[probe.name] for probe in selected}
+        }
+
+
+# Probes
+def find_pids(pattern: str) -> List[int]:
+    """PIDs whose command line contains pattern (a /proc scan, no pgrep)"""
+    needle = pattern.encode("utf-8")
+    own = os.getpid()
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit() or int(entry) == own:
+            continue
+        try:
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                if needle in f.read():
+                    pids.append(int(entry))
+        except OSError:
+            continue
+    return sorted(pids)
+
+
+def process_probe(pattern: str = "JDownloader.jar") -> Callable[[], Dict]:
+    def probe() -> Dict:
+        pids = find_pids(pattern)
+        if not pids:
+            return {"ok": False, "running": False, "pids": []}
+        info = run(
+            ["ps", "-p", str(pids[0]), "-o", "pid,ppid,%cpu,%mem,etime,cmd", "--no-headers"],
+            capture_output=True,
+            text=True
+        )
+        return {
+            "running": True,
+            "pids": pids,
+            "process_info": info.stdout.strip() if info.returncode == 0 else None
+        }
+    return probe
+
+
+def api_probe(host: str, port: int, timeout: float = 2.0) -> Callable[[], Dict]:
+    """Check the API's /health endpoint"""
+    def probe() -> Dict:
+        target = "127.0.0.1" if host in ("0.0.0.0", "") else host
+        conn = http.client.HTTPConnection(target, port, timeout=timeout)
+        try:
+            conn.request("GET", "/health")
+            response = conn.getresponse()
+            return {
+                "ok": response.status == 200,
+                "url": f"http://{target}:{port}",
+                "http_status": response.status
+            }
+        except OSError as e:
+            return {"ok": False, "url": f"http://{target}:{port}", "reason": str(e)}
+        finally:
+            conn.close()
+    return probe
+
+
+def control_request(path: str, command: str, args: Optional[Dict] = None, timeout: float = 5.0) -> Dict:
+    """Send one command to the controller's control socket"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps({"command": command, "args": args or {}}).encode("utf-8") + b"\n")
+        response = b""
+        while not response.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            response += chunk
+    reply = json.loads(response)
+    if not reply.get("ok"):
+        raise RuntimeError(reply.get("error", "Controller error"))
+    return reply["result"]
+
+
+def cloud_probe(session=None, control_socket: Optional[str] = None,
+                fallback: Optional[Callable[[], List[Dict]]] = None) -> Callable[[], Dict]:
+    """Cloud state from a warm session, the controller's socket, or a fallback login"""
+    def probe() -> Dict:
+        if session is not None:
+            return {"ok": session.connected, "source": "session", "email": session.email,
+                    "devices": session.cached_devices()}
+        if control_socket and os.path.exists(control_socket):
+            try:
+                cloud = control_request(control_socket, "status")["cloud"]
+                return {"ok": cloud["connected"], "source": "controller", **cloud}
+            except (OSError, ValueError, RuntimeError):
+                pass
+        if fallback is None:
+            return {"ok": False, "source": None, "reason": "No controller or credentials"}
+        devices = fallback()
+        return {"ok": bool(devices), "source": "direct", "devices": devices}
+    return probe
+
+
+def disk_probe(paths: Dict[str, str], min_free_bytes: int = 0) -> Callable[[], Dict]:
+    def probe() -> Dict:
+        disks = {}
+        ok = True
+        for label, path in paths.items():
+            try:
+                usage = shutil.disk_usage(path)
+            except OSError as e:
+                disks[label] = {"path": path, "error": str(e)}
+                continue
+            disks[label] = {
+                "path": path,
+                "total_bytes": usage.total,
+                "free_bytes": usage.free,
+                "used_percent": round(usage.used / usage.total * 100, 1) if usage.total else None
+            }
+            ok = ok and usage.free >= min_free_bytes
+        return {"ok": ok, "disks": disks}
+    return probe
+
+
+def log_probe(path: str) -> Callable[[], Dict]:
+    def probe() -> Dict:
+        log_file = Path(path)
+        try:
+            st = log_file.stat()
+        except OSError:
+            return {"ok": False, "path": path, "exists": False}
+        with span("log.read", path=path), open(log_file, "rb") as f:
+            f.seek(max(st.st_size - 4096, 0))
+            lines = f.read().decode("utf-8", errors="replace").splitlines()
+        return {
+            "path": path,
+            "exists": True,
+            "size_kb": round(st.st_size / 1024, 1),
+            "age_seconds": round(time.time() - st.st_mtime, 1),
+            "last_line": lines[-1] if lines else None
+        }
+    return probe
+
+
+def default_probes(jd_home: str, data_dir: str, log_file: str = "/tmp/jd2.log",
+                   api_host: Optional[str] = None, api_port: Optional[int] = None,
+                   session=None, control_socket: Optional[str] = None,
+                   cloud_fallback: Optional[Callable[[], List[Dict]]] = None) -> List[Probe]:
+    """The controller's standard probe set (the API probe only when a port is given)"""
+    disks = {"jd_home": jd_home, "data_dir": data_dir}
+    general_settings = Path(jd_home) / "cfg" / "org.jdownloader.settings.GeneralSettings.json"
+    try:
+        with open(general_settings, "r") as f:
+            download_folder = json.load(f).get("defaultdownloadfolder")
+        if download_folder:
+            disks["downloads"] = download_folder
+    except (OSError, ValueError):
+        pass
+
+    probes = [
+        Probe("process", process_probe(), deadline=2.0, ttl=2.0),
+        Probe("cloud", cloud_probe(session, control_socket, cloud_fallback), deadline=10.0, ttl=30.0),
+        Probe("disk", disk_probe(disks), deadline=2.0, ttl=10.0),
+        Probe("log", log_probe(log_file), deadline=1.0, ttl=2.0)
+    ]
+    if api_port is not None:
+        probes.insert(1, Probe("api", api_probe(api_host or "127.0.0.1", api_port), deadline=2.0, ttl=2.0))
+    return probes
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Queued, non-blocking JSON logging with request ids and debug sampling"""
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+
+# Id of the request being handled (set by the API middleware)
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Loggers routed through the queue besides the root logger
+SERVER_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record; extra= fields are included as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_") and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Attach the request id on the emitting thread and sample debug records
+
+    Runs before the record is queued, where the request's context is still
+    current. Records below INFO are kept with probability debug_sample_rate
+    and carry it as sample_rate so consumers can scale counts back up.
+    """
+
+    def __init__(self, debug_sample_rate: float = 1.0):
+        super().__init__()
+        self.debug_sample_rate = debug_sample_rate
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.INFO and self.debug_sample_rate < 1.0:
+            if random.random() >= self.debug_sample_rate:
+                self.sampled_out += 1
+                return False
+            record.sample_rate = self.debug_sample_rate
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id.get()
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full instead of waiting"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Render the message and traceback now; keep extra fields for the formatter"""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Root/server loggers -> bounded queue -> one writer thread -> the real stdout"""
+
+    def __init__(self, level: str = "INFO", fmt: str = "json", debug_sample_rate: float = 1.0,
+                 queue_size: int = 10000):
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.handler = NonBlockingQueueHandler(self.queue)
+        self.filter = ContextFilter(debug_sample_rate)
+        self.handler.addFilter(self.filter)
+        self.stdout = sys.stdout
+        output = logging.StreamHandler(self.stdout)
+        output.setFormatter(JSONFormatter() if fmt == "json" else logging.Formatter("%(message)s"))
+        self.listener = logging.handlers.QueueListener(self.queue, output, respect_handler_level=False)
+        self.level = logging.getLevelName(level.upper())
+        self._saved = {}
+
+    def start(self) -> "LogPipeline":
+        root = logging.getLogger()
+        for name in ("",) + SERVER_LOGGERS:
+            logger = logging.getLogger(name)
+            self._saved[name] = (logger.handlers[:], logger.propagate, logger.level)
+            if name:
+                # Server loggers log through the root handler only
+                logger.handlers = []
+                logger.propagate = True
+        root.handlers = [self.handler]
+        root.setLevel(self.level)
+        self.listener.start()
+        return self
+
+    def stop(self) -> None:
+        """Restore the previous handlers, then drain the queue"""
+        for name, (handlers, propagate, level) in self._saved.items():
+            logger = logging.getLogger(name)
+            logger.handlers, logger.propagate = handlers, propagate
+            logger.setLevel(level)
+        self._saved = {}
+        self.listener.stop()
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self.queue.qsize(),
+            "capacity": self.queue.maxsize,
+            "dropped": self.handler.dropped,
+            "debug_sampled_out": self.filter.sampled_out,
+            "debug_sample_rate": self.filter.debug_sample_rate,
+            "level": logging.getLevelName(self.level)
+        }
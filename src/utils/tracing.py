@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Lightweight request tracing: nested timed spans kept in a ring and an optional JSONL file"""
+import functools
+import json
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# Innermost open span of the current request/task (None outside a trace)
+current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+# Root span of the current trace (span start offsets are relative to it)
+_roots: ContextVar[Optional["Span"]] = ContextVar("trace_root", default=None)
+
+
+class Span:
+    """A named, timed unit of work with child spans"""
+
+    __slots__ = ("name", "attrs", "started", "start_offset", "duration", "error", "children")
+
+    def __init__(self, name: str, attrs: Dict, root_started: Optional[float] = None):
+        self.name = name
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.start_offset = self.started - root_started if root_started is not None else 0.0
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        # list.append is atomic, so spans from worker threads can attach concurrently
+        self.children: List["Span"] = []
+
+    def to_dict(self) -> Dict:
+        duration = self.duration if self.duration is not None else time.perf_counter() - self.started
+        children = [child.to_dict() for child in self.children]
+        result = {
+            "name": self.name,
+            "start_ms": round(self.start_offset * 1000, 2),
+            "duration_ms": round(duration * 1000, 2),
+            # Time not covered by child spans (framework, serialisation, own code)
+            "self_ms": round(max(duration * 1000 - sum(c["duration_ms"] for c in children), 0), 2)
+        }
+        if self.attrs:
+            result["attrs"] = self.attrs
+        if self.error:
+            result["error"] = self.error
+        if children:
+            result["children"] = children
+        return result
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block as a child of the current span; free when no trace is active"""
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+    root = _roots.get()
+    child = Span(name, attrs, root.started if root else parent.started)
+    parent.children.append(child)
+    token = current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        child.duration = time.perf_counter() - child.started
+        current_span.reset(token)
+
+
+def traced(name: str):
+    """Decorator form of span()"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def run(args: List[str], **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run inside a "subprocess" span named after the command"""
+    with span("subprocess", argv=" ".join(str(a) for a in args[:3])) as current:
+        result = subprocess.run(args, **kwargs)
+        if current is not None:
+            current.attrs["returncode"] = result.returncode
+        return result
+
+
+class Tracer:
+    """Collects finished request traces in memory and, optionally, a rotating JSON-lines file"""
+
+    def __init__(self, capacity: int = 1000, trace_file: Optional[str] = None,
+                 max_bytes: int = 10 * 1024 * 1024, backups: int = 3, min_ms: float = 0.0):
+        self.traces = deque(maxlen=capacity)
+        self.trace_file = Path(trace_file) if trace_file else None
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.min_ms = min_ms
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def trace(self, name: str, **attrs):
+        """Open the root span of a request; nested span() calls attach to it
+
+        Inside an active trace (such as a /batch sub-request) this is a plain span.
+        """
+        if current_span.get() is not None:
+            with span(name, **attrs) as child:
+                yield child
+            return
+        root = Span(name, attrs)
+        root_token = _roots.set(root)
+        token = current_span.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            root.duration = time.perf_counter() - root.started
+            current_span.reset(token)
+            _roots.reset(root_token)
+            if root.duration * 1000 >= self.min_ms:
+                self.record(root)
+
+    def record(self, root: Span) -> None:
+        entry = {"time": time.time() - root.duration, **root.to_dict()}
+        with self._lock:
+            self.traces.append(entry)
+            self.recorded += 1
+            if self.trace_file is not None:
+                try:
+                    self._write(json.dumps(entry, separators=(",", ":"), default=str) + "\n")
+                except OSError as e:
+                    print(f"⚠️  Could not write trace: {str(e)}")
+
+    def _write(self, line: str) -> None:
+        self.trace_file.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            size = self.trace_file.stat().st_size
+        except OSError:
+            size = 0
+        if size and size + len(line) > self.max_bytes:
+            # trace.jsonl -> trace.jsonl.1 -> ... -> trace.jsonl.<backups>
+            for n in range(self.backups - 1, 0, -1):
+                older = self.trace_file.with_name(f"{self.trace_file.name}.{n}")
+                if older.exists():
+                    os.replace(older, self.trace_file.with_name(f"{self.trace_file.name}.{n + 1}"))
+            if self.backups > 0:
+                os.replace(self.trace_file, self.trace_file.with_name(f"{self.trace_file.name}.1"))
+            else:
+                self.trace_file.unlink()
+        with open(self.trace_file, "a") as f:
+            f.write(line)
+
+    def slowest(self, limit: int = 20, since: Optional[float] = None, name: Optional[str] = None) -> List[Dict]:
+        """Slowest recorded traces, optionally only newer than since or whose name contains name"""
+        with self._lock:
+            traces = [
+                t for t in self.traces
+                if (since is None or t["time"] >= since) and (name is None or name in t["name"])
+            ]
+        return sorted(traces, key=lambda t: t["duration_ms"], reverse=True)[:limit]
+
+    def summary(self) -> Dict:
+        """Span-name totals over the retained traces, to see where time goes overall"""
+        totals: Dict[str, Dict] = {}
+
+        def walk(node: Dict) -> None:
+            for child in node.get("children", []):
+                entry = totals.setdefault(child["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+                entry["count"] += 1
+                entry["total_ms"] += child["duration_ms"]
+                entry["max_ms"] = max(entry["max_ms"], child["duration_ms"])
+                walk(child)
+
+        with self._lock:
+            traces = list(self.traces)
+        for trace in traces:
+            walk(trace)
+        return {
+            "traces": len(traces),
+            "recorded": self.recorded,
+            "spans": {
+                name: {**entry, "total_ms": round(entry["total_ms"], 2),
+                       "avg_ms": round(entry["total_ms"] / entry["count"], 2)}
+                for name, entry in sorted(totals.items(), key=lambda item: -item[1]["total_ms"])
+            }
+        }
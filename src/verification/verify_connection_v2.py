@@ -4,6 +4,7 @@ import os
 import sys
 from dotenv import load_dotenv
 from src.jdownloader.jd_auth_config import JDownloaderConfig
+from src.jdownloader.jd_cloud_session import RateLimitedMyjdapi
 import myjdapi
 
 load_dotenv()
@@ -34,7 +35,7 @@ def verify_with_official_api():
     
     try:
         # Create  API client
-        jd_api = myjdapi.Myjdapi()
+        jd_api = RateLimitedMyjdapi()
         jd_api.set_app_key("jd2controller")
         
         # Connect